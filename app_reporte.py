@@ -0,0 +1,180 @@
+"""
+Generador de reportes por lotes (sin Streamlit).
+Corre todos los análisis sobre uno o más datasets y guarda cada resultado como
+tabla Parquet, CSV o JSON. Los datasets se procesan en paralelo, uno por proceso.
+
+Ejecutar: python app_reporte.py data/raw/ data/tienda2/ --salida reportes/ --formato parquet
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from src.analizador import MOTORES, crear_analizador
+from src.data_loader import DataLoader
+from src.fuentes import FUENTES, PYARROW_DISPONIBLE
+
+FORMATOS = ('parquet', 'csv', 'json')
+
+
+def _tabla(resultado, nombre_valor):
+    """Resultado de un análisis como DataFrame plano (los índices pasan a columnas)."""
+    if hasattr(resultado, 'to_frame'):
+        resultado = resultado.to_frame(nombre_valor)
+    if resultado.index.name is not None:
+        resultado = resultado.reset_index()
+    return resultado
+
+
+def _tablas_reporte(analizador, percentil, top_n):
+    """
+    {nombre: DataFrame} con todos los análisis. calcular_metricas los resuelve
+    en lote sobre la misma tabla a nivel venta, que se arma una sola vez.
+    """
+    metricas = analizador.calcular_metricas(percentil=percentil, top_n=top_n)
+    categorias = metricas['ranking_categorias']
+    return {
+        'ventas_por_ciudad': _tabla(metricas['ventas_por_ciudad'], 'importe'),
+        'ranking_categorias_importe': _tabla(categorias['por_importe'], 'importe'),
+        'ranking_categorias_cantidad': _tabla(categorias['por_cantidad'], 'cantidad'),
+        'ticket_promedio_por_ciudad': _tabla(analizador.ticket_promedio_por_ciudad(), 'ticket_promedio'),
+        'segmentacion_clientes': _tabla(metricas['segmentacion_clientes'], 'aov'),
+        'medios_de_pago': _tabla(metricas['medios_de_pago'], 'total_importe'),
+        'tendencia_precios': _tabla(metricas['tendencia_precios'], 'precio_unitario'),
+        'top_productos_cantidad': _tabla(metricas['top_productos_cantidad'], 'cantidad')
+    }
+
+
+def _guardar(df, ruta, formato):
+    if formato == 'parquet':
+        df.to_parquet(ruta, index=False)
+    elif formato == 'csv':
+        df.to_csv(ruta, index=False)
+    else:
+        df.to_json(ruta, orient='records', date_format='iso', force_ascii=False, indent=2)
+
+
+def generar_reporte(raw_path, destino, formatos=('parquet',), fuente=None, motor='pandas',
+                    percentil=90, top_n=10):
+    """
+    Carga un dataset (o un árbol de particiones), corre los análisis y guarda una
+    tabla por análisis y formato en `destino`. Los errores no se propagan: quedan
+    en el resumen, así un dataset roto no corta a los demás workers.
+    Retorna un resumen {dataset, destino, filas, segundos, archivos, error}.
+    """
+    inicio = time.perf_counter()
+    resumen = {'dataset': raw_path, 'destino': destino, 'filas': 0, 'archivos': [], 'error': None}
+    try:
+        # Esquema compacto, pero con montos float64 para no redondear los totales exportados
+        loader = DataLoader(raw_path=raw_path, compacto=True, tipo_moneda='float64', fuente=fuente,
+                            columnas=DataLoader.COLUMNAS_ANALISIS)
+        if loader.particionado():
+            # Árbol de particiones (src.particiones): map-reduce sin armar la tabla maestra
+            analizador = loader.agregar_particiones()
+            resumen['filas'] = analizador.lineas
+        else:
+            if not loader.cargar_datos():
+                raise RuntimeError(f"No se pudieron cargar los datos de {raw_path}")
+            loader.normalizar_datos()
+            analizador = crear_analizador(loader, motor)
+            resumen['filas'] = len(loader.df_detalle)
+
+        os.makedirs(destino, exist_ok=True)
+        for nombre, df in _tablas_reporte(analizador, percentil, top_n).items():
+            for formato in formatos:
+                ruta = os.path.join(destino, f'{nombre}.{formato}')
+                _guardar(df, ruta, formato)
+                resumen['archivos'].append(ruta)
+    except Exception as e:
+        resumen['error'] = f"{type(e).__name__}: {e}"
+    resumen['segundos'] = round(time.perf_counter() - inicio, 4)
+    return resumen
+
+
+def _destinos(rutas, salida):
+    """Subcarpeta de salida por dataset (nombre de su carpeta, sin repetir)."""
+    destinos, usados = [], set()
+    for ruta in rutas:
+        base = os.path.basename(os.path.normpath(ruta)) or 'dataset'
+        nombre, n = base, 2
+        while nombre in usados:
+            nombre, n = f'{base}_{n}', n + 1
+        usados.add(nombre)
+        destinos.append(os.path.join(salida, nombre))
+    return destinos
+
+
+def generar_reportes(rutas, salida, workers=None, **opciones):
+    """
+    Genera el reporte de cada dataset. Con workers > 1 cada dataset corre en un
+    proceso del pool (uno por worker). Retorna los resúmenes en el orden de `rutas`.
+    """
+    trabajos = list(zip(rutas, _destinos(rutas, salida)))
+    workers = min(workers or os.cpu_count() or 1, len(trabajos))
+    if workers <= 1:
+        return [generar_reporte(ruta, destino, **opciones) for ruta, destino in trabajos]
+
+    resumenes = [None] * len(trabajos)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pendientes = {
+            pool.submit(generar_reporte, ruta, destino, **opciones): i
+            for i, (ruta, destino) in enumerate(trabajos)
+        }
+        for futuro in as_completed(pendientes):
+            resumen = futuro.result()
+            resumenes[pendientes[futuro]] = resumen
+            marca = '❌' if resumen['error'] else '✅'
+            print(f"   {marca} {resumen['dataset']} ({resumen['segundos']:.2f} s)")
+    return resumenes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera los reportes de análisis de uno o más datasets")
+    parser.add_argument('rutas', nargs='+', help="Carpetas raw_path de los datasets")
+    parser.add_argument('--salida', default='reportes/', help="Carpeta de salida (una subcarpeta por dataset)")
+    parser.add_argument('--formato', choices=FORMATOS, nargs='+', default=['parquet'])
+    parser.add_argument('--fuente', choices=list(FUENTES), default='excel')
+    parser.add_argument('--motor', choices=MOTORES, default='pandas')
+    parser.add_argument('--workers', type=int, help="Procesos (por defecto, uno por núcleo)")
+    parser.add_argument('--percentil', type=float, default=90, help="Percentil de AOV para clientes VIP")
+    parser.add_argument('--top', type=int, default=10, help="Cantidad de productos del top")
+    args = parser.parse_args()
+
+    if 'parquet' in args.formato and not PYARROW_DISPONIBLE:
+        print("❌ La salida Parquet requiere pyarrow (usar --formato csv o json)")
+        sys.exit(1)
+
+    print(f"\n📊 Generando reportes de {len(args.rutas)} dataset(s)...\n")
+    inicio = time.perf_counter()
+    resumenes = generar_reportes(
+        args.rutas, args.salida, args.workers, formatos=tuple(args.formato),
+        fuente=args.fuente, motor=args.motor, percentil=args.percentil, top_n=args.top
+    )
+    segundos = time.perf_counter() - inicio
+
+    for resumen in resumenes:
+        if resumen['error']:
+            print(f"❌ {resumen['dataset']}: {resumen['error']}")
+    exitosos = sum(1 for r in resumenes if not r['error'])
+    por_minuto = len(resumenes) / segundos * 60 if segundos else 0
+
+    os.makedirs(args.salida, exist_ok=True)
+    with open(os.path.join(args.salida, 'resumen.json'), 'w', encoding='utf-8') as archivo:
+        json.dump({
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'segundos': round(segundos, 4),
+            'datasets_por_minuto': round(por_minuto, 2),
+            'datasets': resumenes
+        }, archivo, indent=2, ensure_ascii=False)
+
+    print(f"\n✅ {exitosos}/{len(resumenes)} datasets en {segundos:.2f} s ({por_minuto:.1f} datasets/min)")
+    print(f"   Resultados en {args.salida}\n")
+    if exitosos < len(resumenes):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
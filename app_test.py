@@ -2,8 +2,121 @@
 Test simple para verificar que la app funciona.
 Ejecutar: python app_test.py
 """
+import os
+import tempfile
+import pandas as pd
 from src.data_loader import DataLoader
-from src.analizador import AnalizadorVentas
+from src.analizador import AnalizadorVentas, crear_analizador
+from src.indices import Filtro
+from src.particiones import periodo
+
+
+def _normalizar(resultado):
+    """Orden canónico de un resultado (los empates pueden salir en otro orden)."""
+    if isinstance(resultado, pd.Series):
+        return resultado.sort_index()
+    if isinstance(resultado.index, pd.RangeIndex):
+        return resultado.sort_values(list(resultado.columns)).reset_index(drop=True)
+    return resultado.sort_index()
+
+
+def iguales(a, b):
+    """True si dos resultados de análisis (Series, DataFrames o dicts) tienen los mismos valores."""
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(iguales(a[k], b[k]) for k in a)
+    a, b = _normalizar(a), _normalizar(b)
+    comparar = pd.testing.assert_series_equal if isinstance(a, pd.Series) else pd.testing.assert_frame_equal
+    try:
+        comparar(a, b, check_dtype=False, check_index_type=False, check_categorical=False,
+                 check_names=False, check_exact=False)
+    except AssertionError:
+        return False
+    return True
+
+
+def _escribir_csv(carpeta, tablas):
+    for nombre, df in tablas.items():
+        df.to_csv(os.path.join(carpeta, f'{nombre}.csv'), index=False)
+
+
+def incremental_igual_a_recarga():
+    """
+    Carga una parte de las fuentes (CSV), agrega el resto al final de los archivos
+    y verifica que la actualización incremental dé lo mismo que recargar todo.
+    El corte cae a mitad de una venta: esa venta recibe líneas nuevas.
+    """
+    origen = DataLoader()
+    if not origen.cargar_datos():
+        return False
+    tablas = {
+        'clientes': origen.df_clientes,
+        'productos': origen.df_productos,
+        'ventas': origen.df_ventas,
+        'detalle_ventas': origen.df_detalle
+    }
+    ids = origen.df_detalle['id_venta'].to_numpy()
+    corte = next(i for i in range(len(ids) * 4 // 5, len(ids)) if ids[i - 1] == ids[i])
+    parte = dict(
+        tablas,
+        ventas=origen.df_ventas[origen.df_ventas['id_venta'] <= ids[corte - 1]],
+        detalle_ventas=origen.df_detalle.iloc[:corte]
+    )
+    
+    with tempfile.TemporaryDirectory() as carpeta:
+        _escribir_csv(carpeta, parte)
+        loader = DataLoader(raw_path=carpeta, fuente='csv', compacto=True)
+        loader.cargar_datos()
+        loader.normalizar_datos()
+        analizador = AnalizadorVentas(loader.obtener_tabla_maestra(), incremental=True)
+        # Estructuras ya armadas: se tienen que extender, no recalcular
+        analizador.calcular_metricas()
+        analizador.calcular_metricas(desde='2024-03-01')
+        filtro = Filtro(ciudad=analizador.valores('ciudad')[:2], desde='2024-02-01')
+        
+        _escribir_csv(carpeta, tablas)
+        nuevas = loader.cargar_incremental()
+        if nuevas is None or len(nuevas) != len(ids) - corte:
+            return False
+        analizador.agregar_ventas(nuevas)
+        
+        completo = DataLoader(raw_path=carpeta, fuente='csv', compacto=True)
+        completo.cargar_datos()
+        completo.normalizar_datos()
+        recarga = AnalizadorVentas(completo.obtener_tabla_maestra(), incremental=True)
+    
+    return (
+        iguales(analizador.calcular_metricas(), recarga.calcular_metricas())
+        and iguales(analizador.calcular_metricas(desde='2024-03-01'), recarga.calcular_metricas(desde='2024-03-01'))
+        and iguales(analizador.calcular_metricas(filtro=filtro), recarga.calcular_metricas(filtro=filtro))
+        and iguales(analizador.ticket_promedio_por_ciudad(), recarga.ticket_promedio_por_ciudad())
+        and iguales(analizador.tabla_ventas(), recarga.tabla_ventas())
+    )
+
+
+def particiones_sin_fecha_no_se_podan():
+    """
+    Un número en el nombre de una partición (tienda_1023) no es un año: esa partición
+    no tiene período y sigue en cualquier rango, mientras que 2023 sí se poda.
+    """
+    origen = DataLoader()
+    if not origen.cargar_datos():
+        return False
+    if periodo('tienda_1023') != (None, None) or periodo('anio=2024/mes=02') != (
+            pd.Timestamp('2024-02-01'), pd.Timestamp('2024-02-29')):
+        return False
+    
+    with tempfile.TemporaryDirectory() as raiz:
+        _escribir_csv(raiz, {
+            'clientes': origen.df_clientes,
+            'productos': origen.df_productos,
+            'ventas': origen.df_ventas
+        })
+        for carpeta in ('tienda_1023', '2023'):
+            os.makedirs(os.path.join(raiz, carpeta))
+            _escribir_csv(os.path.join(raiz, carpeta), {'detalle_ventas': origen.df_detalle})
+        loader = DataLoader(raw_path=raiz, fuente='csv')
+        encontradas = loader.particiones(desde='2024-01-01', hasta='2024-12-31')
+    return [os.path.basename(p.ruta) for p in encontradas] == ['tienda_1023']
 
 
 def run_tests():
@@ -31,13 +144,62 @@ def run_tests():
         analizador.segmentacion_clientes(),
         analizador.medios_de_pago(),
         analizador.tendencia_precios(),
-        analizador.top_productos_cantidad()
+        analizador.top_productos_cantidad(),
+        analizador.calcular_metricas()
     ]
     
     if any(t is None or (hasattr(t, '__len__') and len(t) == 0) for t in tests):
         print("❌ Error en funciones de análisis")
         return False
     
+    # Test motor SQL: mismos resultados que pandas, sin filtro y con filtro cruzado
+    analizador_sql = crear_analizador(loader, 'sql')
+    
+    # Test top con k <= 0: resultado vacío en los dos motores (como nlargest)
+    vacios = [
+        motor.top_productos_cantidad(0) for motor in (analizador, analizador_sql)
+    ] + [
+        motor.top('cantidad', k, por=por) for motor in (analizador, analizador_sql) for k in (0, -1) for por in (None, 'ciudad')
+    ]
+    if any(len(resultado) for resultado in vacios):
+        print("❌ El top con k <= 0 no está vacío")
+        return False
+    filtro = Filtro(ciudad=analizador.valores('ciudad')[:2], desde='2024-02-01', hasta='2024-05-31')
+    if not (iguales(analizador.calcular_metricas(), analizador_sql.calcular_metricas())
+            and iguales(analizador.calcular_metricas(filtro=filtro), analizador_sql.calcular_metricas(filtro=filtro))
+            and iguales(analizador.ticket_promedio_por_ciudad(), analizador_sql.ticket_promedio_por_ciudad())
+            and abs(analizador.umbral_vip(80, filtro) - analizador_sql.umbral_vip(80, filtro)) < 1e-6):
+        print("❌ El motor SQL no coincide con pandas")
+        return False
+    
+    # Test cubo: un rango de fechas da lo mismo que recorrer solo las filas del rango
+    desde, hasta = pd.Timestamp('2024-02-01'), pd.Timestamp('2024-05-31')
+    en_rango = (df_master['fecha'] >= desde) & (df_master['fecha'] < hasta + pd.Timedelta(days=1))
+    recorrido = AnalizadorVentas(df_master[en_rango].reset_index(drop=True))
+    if not (iguales(analizador.calcular_metricas(desde=desde, hasta=hasta), recorrido.calcular_metricas())
+            and iguales(analizador.ticket_promedio_por_ciudad(desde, hasta), recorrido.ticket_promedio_por_ciudad())):
+        print("❌ El cubo no coincide con el recorrido completo del rango")
+        return False
+
+    # Test cubo con precios nulos: el promedio se divide solo por los precios presentes
+    con_nulos = df_master.copy()
+    con_nulos.loc[con_nulos.index[::7], 'precio_unitario'] = float('nan')
+    analizador_nulos = AnalizadorVentas(con_nulos)
+    if not iguales(analizador_nulos.tendencia_precios(con_nulos['fecha'].min(), con_nulos['fecha'].max()),
+                   analizador_nulos.tendencia_precios()):
+        print("❌ El cubo cuenta los precios nulos en el promedio")
+        return False
+
+    # Test actualización incremental: agregar filas nuevas equivale a recargar todo
+    if not incremental_igual_a_recarga():
+        print("❌ La actualización incremental no coincide con la recarga completa")
+        return False
+    
+    # Test particiones: solo se podan las que indican un período sin ambigüedad
+    if not particiones_sin_fecha_no_se_podan():
+        print("❌ Se podó una partición cuyo nombre no indica un período")
+        return False
+    
     print(f"✅ Todo funciona correctamente")
     print(f"   {len(loader.df_clientes)} clientes | {len(loader.df_ventas)} ventas")
     print(f"\nEjecutar: streamlit run app_web.py\n")
@@ -4,8 +4,9 @@ Ejecutar: streamlit run app_web.py
 """
 import streamlit as st
 from src.data_loader import DataLoader
-from src.analizador import AnalizadorVentas
-from src.ui import documentacion, prompts, resumen, ventas_ciudad, categorias, clientes_vip, medios_pago, tendencia_precios, top_productos
+from src import instrumentacion
+from src.ui.contexto import ContextoDatos, proyeccion
+from src.ui import rendimiento, filtros, documentacion, prompts, resumen, ventas_ciudad, categorias, clientes_vip, medios_pago, tendencia_precios, top_productos
 
 # Configuración de la página
 st.set_page_config(
@@ -30,72 +31,103 @@ st.title("📊 Sistema de Análisis de Ventas")
 st.markdown("**Proyecto Aurelion - Inteligencia de Negocio**")
 st.divider()
 
-# Cargar datos (con caché para mejor rendimiento)
-@st.cache_data
-def cargar_y_procesar_datos():
-    """Carga y procesa los datos una sola vez."""
-    loader = DataLoader()
-    if not loader.cargar_datos():
-        return None, None
-    loader.normalizar_datos()
-    df_master = loader.obtener_tabla_maestra()
-    analizador = AnalizadorVentas(df_master)
-    return loader, analizador
-
-# Cargar datos
-with st.spinner('⏳ Cargando datos...'):
-    loader, analizador = cargar_y_procesar_datos()
+# Vistas disponibles (etiqueta del menú → módulo)
+PAGINAS = {
+    "📋 Documentación": documentacion,
+    "💬 Prompts Utilizados": prompts,
+    "🏠 Resumen General": resumen,
+    "🏙️ Ventas por Ciudad": ventas_ciudad,
+    "📦 Ranking de Categorías": categorias,
+    "👥 Segmentación de Clientes VIP": clientes_vip,
+    "💳 Medios de Pago": medios_pago,
+    "📈 Tendencia de Precios": tendencia_precios,
+    "🔝 Top 10 Productos": top_productos
+}
+
+# Precálculo en segundo plano: Resumen primero y después el resto en orden del menú
+PRECALCULO = sorted(
+    [(etiqueta, pagina.precalcular) for etiqueta, pagina in PAGINAS.items() if hasattr(pagina, 'precalcular')],
+    key=lambda tarea: tarea[1] is not resumen.precalcular
+)
+
+# Contexto de datos perezoso: cada vista carga solo lo que declara en REQUIERE.
+# cache_resource lo comparte entre todas las sesiones sin copiarlo (cache_data
+# serializaba el loader y el analizador completos en cada sesión y rerun).
+# Al descartarlo (recarga o fuentes modificadas) se cancela su precálculo.
+@st.cache_resource(on_release=ContextoDatos.cerrar)
+def contexto_compartido():
+    """Loader configurado; no lee nada hasta que una vista lo pide."""
+    # Se leen solo las columnas que declaran las vistas (ver src.ui.contexto.proyeccion)
+    columnas = proyeccion(pagina.REQUIERE for pagina in PAGINAS.values())
+    loader = DataLoader(cache_dir='data/cache/', compacto=True, columnas=columnas)
+    return ContextoDatos(loader, precalculo=PRECALCULO)
+
+datos = contexto_compartido()
+
+# Instrumentación por sesión: el proceso (y el analizador) se comparte entre usuarios,
+# así que cada sesión mide solo sus propias ejecuciones y guarda sus registros
+if 'registros_rendimiento' not in st.session_state:
+    st.session_state['registros_rendimiento'] = instrumentacion.nuevos_registros()
+instrumentacion.usar_registros(
+    st.session_state['registros_rendimiento'] if st.session_state.get('ver_rendimiento') else None
+)
 
-if loader is None:
+# Si cambió algún archivo de origen se suman solo las filas nuevas; si no se puede
+# (filas ya leídas modificadas, motor sin modo incremental) se descarta el contexto
+if datos.desactualizado() and not datos.actualizar():
+    contexto_compartido.clear()
+    datos = contexto_compartido()
+
+try:
+    conteos = datos.conteos()
+except Exception:
     st.error("❌ Error al cargar los datos. Verifica que existan en data/raw/")
     st.stop()
 
-st.success(f"✅ {len(loader.df_clientes)} clientes | {len(loader.df_productos)} productos | {len(loader.df_ventas)} ventas")
+st.success(f"✅ {conteos['clientes']} clientes | {conteos['productos']} productos | {conteos['ventas']} ventas")
 
 # Sidebar para navegación
 st.sidebar.title("📋 Menú de Análisis")
-opcion = st.sidebar.radio(
-    "Selecciona un análisis:",
-    [
-        "📋 Documentación",
-        "💬 Prompts Utilizados",
-        "🏠 Resumen General",
-        "🏙️ Ventas por Ciudad",
-        "📦 Ranking de Categorías",
-        "👥 Segmentación de Clientes VIP",
-        "💳 Medios de Pago",
-        "📈 Tendencia de Precios",
-        "🔝 Top 10 Productos"
-    ]
-)
-
-# Contenido principal según opción seleccionada
-if opcion == "📋 Documentación":
-    documentacion.render(loader, analizador)
-
-elif opcion == "💬 Prompts Utilizados":
-    prompts.render(loader, analizador)
-
-elif opcion == "🏠 Resumen General":
-    resumen.render(loader, analizador)
-
-elif opcion == "🏙️ Ventas por Ciudad":
-    ventas_ciudad.render(loader, analizador)
+if st.sidebar.button("🔄 Recargar datos"):
+    # Recarga completa explícita (la actualización incremental es solo para fuentes que crecen)
+    contexto_compartido.clear()
+    st.rerun()
+opcion = st.sidebar.radio("Selecciona un análisis:", list(PAGINAS))
+pagina = PAGINAS[opcion]
+
+# Cargar solo lo que usa la vista elegida
+with st.spinner('⏳ Cargando datos...'):
+    preparado = datos.preparar(pagina.REQUIERE)
 
-elif opcion == "📦 Ranking de Categorías":
-    categorias.render(loader, analizador)
+if preparado is None:
+    st.error("❌ Error al cargar los datos. Verifica que existan en data/raw/")
+    st.stop()
+loader, analizador = preparado
 
-elif opcion == "👥 Segmentación de Clientes VIP":
-    clientes_vip.render(loader, analizador)
+# Filtros cruzados (fecha, ciudad, categoría, medio de pago) en las vistas de análisis
+filtro = filtros.filtro_sidebar(analizador) if pagina.REQUIERE.analisis else None
 
-elif opcion == "💳 Medios de Pago":
-    medios_pago.render(loader, analizador)
+# Avance del precálculo de las demás vistas
+if datos.precalculo is not None and not datos.precalculo.terminado():
+    hechas, total = datos.precalculo.progreso()
+    st.sidebar.progress(hechas / total, text=f"⚙️ Precalculando análisis ({hechas}/{total})")
 
-elif opcion == "📈 Tendencia de Precios":
-    tendencia_precios.render(loader, analizador)
+# Panel de rendimiento opcional: la sesión solo mide mientras está activo
+st.sidebar.divider()
+ver_rendimiento = st.sidebar.checkbox("⏱️ Panel de rendimiento", key='ver_rendimiento')
 
-elif opcion == "🔝 Top 10 Productos":
-    top_productos.render(loader, analizador)
+# Contenido principal según opción seleccionada
+if pagina.REQUIERE.analisis:
+    # Sin filtros la vista usa lo precalculado: solo espera si su tarea no terminó
+    if filtro is None:
+        with st.spinner('⏳ Calculando...'):
+            datos.esperar(opcion)
+    pagina.render(loader, analizador, filtro)
+else:
+    pagina.render(loader, analizador)
+
+if ver_rendimiento:
+    rendimiento.render()
 
 # Footer
 st.divider()
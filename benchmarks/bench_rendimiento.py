@@ -0,0 +1,276 @@
+"""
+Benchmark de rendimiento de la carga y de los análisis sobre datos sintéticos.
+Mide tiempo (mejor de N repeticiones) y pico de memoria (tracemalloc) de cada
+etapa de DataLoader y de cada método de AnalizadorVentas, informa la memoria por
+columna de la tabla maestra y guarda un JSON que se puede comparar entre
+versiones para detectar regresiones.
+
+Uso:
+  python benchmarks/bench_rendimiento.py --tamanos 10000 100000 1000000
+  python benchmarks/bench_rendimiento.py --tamanos 10000000 --formato parquet --proyectar
+  python benchmarks/bench_rendimiento.py --comparar base.json --tolerancia 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, RAIZ)
+from benchmarks.generador import MAX_FILAS_EXCEL, escribir, generar_tablas
+from src.analizador import AnalizadorVentas
+from src.data_loader import DataLoader
+from src.esquema import reporte_memoria
+from src.fuentes import FUENTES, crear_fuente
+from src.indices import Filtro
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+VERSION_FORMATO = 1
+
+
+def _medir(funcion, repeticiones=3, memoria=True):
+    """
+    Ejecuta funcion y devuelve (resultado, segundos, pico_mb).
+    El tiempo es el mejor de `repeticiones`; el pico se mide en una corrida aparte
+    porque tracemalloc encarece las asignaciones.
+    """
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    pico_mb = None
+    if memoria:
+        tracemalloc.start()
+        try:
+            funcion()
+            pico_mb = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        finally:
+            tracemalloc.stop()
+    return resultado, min(tiempos), pico_mb
+
+
+def _rss_maximo_mb():
+    """Pico de memoria residente del proceso (None si no está disponible)."""
+    if resource is None:
+        return None
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB, macOS bytes
+    return maximo / 1024 ** 2 if sys.platform == 'darwin' else maximo / 1024
+
+
+def _entorno():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'commit': commit
+    }
+
+
+def _preparar_fuente(tablas, datos, lineas, semilla, formato):
+    """Escribe el dataset en el formato pedido una sola vez y lo reutiliza en corridas siguientes."""
+    destino = os.path.join(datos, f'{lineas}_{semilla}', formato)
+    os.makedirs(destino, exist_ok=True)
+    fuente = crear_fuente(formato, destino)
+    if not all(os.path.exists(fuente.ruta(n)) for n in DataLoader.TABLAS):
+        print(f"   📝 Escribiendo {formato} en {destino}...")
+        escribir(tablas, fuente)
+    return destino
+
+
+def _cargar_en_memoria(tablas):
+    """DataLoader con las tablas ya asignadas, con los tipos que produce la lectura de Excel."""
+    loader = DataLoader()
+    for nombre, atributo in DataLoader.TABLAS.items():
+        df = tablas[nombre].copy()
+        for columna in df.columns[df.dtypes == 'category']:
+            df[columna] = df[columna].astype(str)
+        setattr(loader, atributo, df)
+    return loader
+
+
+def _etapas_analizador(df_master):
+    """(nombre, función) de cada método a medir, siempre con la caché vacía."""
+    analizador = AnalizadorVentas(df_master)
+    ciudad = df_master['ciudad'].dropna().iloc[0]
+    desde, hasta = df_master['fecha'].quantile([0.25, 0.75])
+    filtro = Filtro(ciudad=ciudad, medio_pago='efectivo')
+    ids_cliente = df_master['id_cliente'].dropna().unique()[:10]
+
+    def frio(metodo, *args, **kwargs):
+        def llamar():
+            analizador.invalidar_cache()
+            return metodo(*args, **kwargs)
+        return llamar
+
+    return [
+        ('AnalizadorVentas', lambda: AnalizadorVentas(df_master)),
+        ('ventas_por_ciudad', frio(analizador.ventas_por_ciudad)),
+        ('ranking_categorias', frio(analizador.ranking_categorias)),
+        ('ticket_promedio_por_ciudad', frio(analizador.ticket_promedio_por_ciudad)),
+        ('segmentacion_clientes', frio(analizador.segmentacion_clientes)),
+        ('medios_de_pago', frio(analizador.medios_de_pago)),
+        ('tendencia_precios', frio(analizador.tendencia_precios)),
+        ('tendencia_precios[ponderado]', frio(analizador.tendencia_precios, ponderado=True)),
+        ('top_productos_cantidad', frio(analizador.top_productos_cantidad)),
+        ('top[por categoria]', frio(analizador.top, 'cantidad', 10, por='categoria')),
+        ('productos_por_cliente', frio(analizador.productos_por_cliente, ids_cliente=ids_cliente)),
+        ('calcular_metricas', frio(analizador.calcular_metricas)),
+        ('ventas_por_ciudad[fechas]', frio(analizador.ventas_por_ciudad, desde=desde, hasta=hasta)),
+        ('filtrar', frio(analizador.filtrar, filtro)),
+    ]
+
+
+def _informar_memoria(df_master):
+    """Imprime la memoria por columna de la tabla maestra y la devuelve como {columna: {...}}."""
+    reporte = reporte_memoria(df_master)
+    print(f"   🧠 Tabla maestra: {reporte['bytes'].sum() / 1024 ** 2:.1f} MB")
+    for columna, fila in reporte.iterrows():
+        print(f"      {columna:<20}{fila['dtype']:<16}{fila['bytes'] / 1024 ** 2:>9.1f} MB{fila['porcentaje']:>7.1f} %")
+    return {columna: {'dtype': fila['dtype'], 'bytes': int(fila['bytes'])} for columna, fila in reporte.iterrows()}
+
+
+def medir_tamano(lineas, args):
+    """
+    Mide todas las etapas para un tamaño de dataset. Devuelve la lista de registros
+    y la memoria por columna de la tabla maestra.
+    """
+    print(f"\n📊 {lineas:,} líneas de detalle")
+    tablas = generar_tablas(lineas, args.semilla)
+    registros = []
+
+    def registrar(etapa, funcion, repeticiones=args.repeticiones):
+        resultado, segundos, pico_mb = _medir(funcion, repeticiones, not args.sin_memoria)
+        registros.append({'lineas': lineas, 'etapa': etapa, 'segundos': segundos, 'pico_mb': pico_mb})
+        pico = '' if pico_mb is None else f"{pico_mb:>10.1f} MB"
+        print(f"   {etapa:<36}{segundos:>10.4f} s{pico}")
+        return resultado
+
+    # Carga desde la fuente (Excel solo si la hoja entra en el formato)
+    if not args.sin_excel and (args.formato != 'excel' or lineas <= MAX_FILAS_EXCEL):
+        destino = _preparar_fuente(tablas, args.datos, lineas, args.semilla, args.formato)
+        columnas = DataLoader.COLUMNAS_ANALISIS if args.proyectar else None
+
+        def cargar():
+            loader = DataLoader(raw_path=destino, fuente=args.formato, columnas=columnas)
+            if not loader.cargar_datos():
+                raise RuntimeError(f"No se pudo cargar {destino}")
+            return loader
+        loader = registrar('cargar_datos', cargar, repeticiones=1)
+    else:
+        print(f"   ⚠️ cargar_datos omitido (Excel admite hasta {MAX_FILAS_EXCEL:,} filas; usar --formato parquet/csv/sqlite)")
+        loader = _cargar_en_memoria(tablas)
+    del tablas
+
+    originales = {atributo: getattr(loader, atributo) for atributo in DataLoader.TABLAS.values()}
+
+    def normalizar():
+        for atributo, df in originales.items():
+            setattr(loader, atributo, df)
+        loader.normalizar_datos()
+    registrar('normalizar_datos', normalizar)
+    df_master = registrar('obtener_tabla_maestra', loader.obtener_tabla_maestra)
+    del loader, originales
+    memoria = _informar_memoria(df_master)
+
+    for etapa, funcion in _etapas_analizador(df_master):
+        registrar(etapa, funcion)
+    return registros, memoria
+
+
+def comparar(actual, base, tolerancia):
+    """Imprime la relación de tiempos actual/base y devuelve las etapas que empeoraron."""
+    previos = {(r['lineas'], r['etapa']): r for r in base['resultados']}
+    regresiones = []
+    print(f"\n🔎 Comparación con {base['fecha']} (commit {base['entorno'].get('commit')})")
+    for registro in actual['resultados']:
+        previo = previos.get((registro['lineas'], registro['etapa']))
+        if previo is None or previo['segundos'] == 0:
+            continue
+        relacion = registro['segundos'] / previo['segundos']
+        marca = ''
+        # Se ignoran diferencias de menos de 1 ms (ruido de medición)
+        if relacion > 1 + tolerancia and registro['segundos'] - previo['segundos'] > 1e-3:
+            marca = ' ⚠️'
+            regresiones.append(registro)
+        print(f"   {registro['lineas']:>12,} {registro['etapa']:<36}{relacion:>7.2f}x{marca}")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carga y análisis")
+    parser.add_argument('--tamanos', type=int, nargs='+', default=[10_000, 100_000],
+                        help="Líneas de detalle de cada dataset sintético")
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--datos', default=os.path.join(RAIZ, 'data', 'sintetico'),
+                        help="Carpeta donde se guardan los datasets generados")
+    parser.add_argument('--formato', choices=list(FUENTES), default='excel',
+                        help="Formato de origen para medir cargar_datos")
+    parser.add_argument('--proyectar', action='store_true',
+                        help="Leer solo DataLoader.COLUMNAS_ANALISIS")
+    parser.add_argument('--sin-excel', action='store_true', help="No medir la lectura de la fuente")
+    parser.add_argument('--sin-memoria', action='store_true', help="No medir picos con tracemalloc")
+    parser.add_argument('--salida', help="Archivo JSON de resultados")
+    parser.add_argument('--comparar', help="JSON de una corrida anterior")
+    parser.add_argument('--tolerancia', type=float, default=0.2,
+                        help="Empeoramiento relativo tolerado al comparar (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    resultados = []
+    memoria = {}
+    for lineas in args.tamanos:
+        registros, memoria[str(lineas)] = medir_tamano(lineas, args)
+        resultados.extend(registros)
+
+    informe = {
+        'version': VERSION_FORMATO,
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'entorno': _entorno(),
+        'parametros': {
+            'tamanos': args.tamanos, 'repeticiones': args.repeticiones, 'semilla': args.semilla,
+            'formato': args.formato, 'proyectar': args.proyectar
+        },
+        'rss_maximo_mb': _rss_maximo_mb(),
+        'memoria_tabla_maestra': memoria,
+        'resultados': resultados
+    }
+    salida = args.salida or os.path.join(
+        RAIZ, 'benchmarks', 'resultados', f"bench_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, 'w', encoding='utf-8') as archivo:
+        json.dump(informe, archivo, indent=2, ensure_ascii=False)
+    print(f"\n✅ Resultados en {salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as archivo:
+            base = json.load(archivo)
+        if comparar(informe, base, args.tolerancia):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
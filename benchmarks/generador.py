@@ -0,0 +1,141 @@
+"""
+Generador de datos sintéticos con el mismo esquema de 4 tablas que data/raw/.
+Reproduce sesgos realistas: pocas ciudades concentran la mayoría de los clientes,
+algunas categorías y productos venden mucho más que otros, el efectivo domina
+los medios de pago y una minoría de clientes concentra las compras repetidas.
+
+Uso: python benchmarks/generador.py 100000 --destino data/sintetico/100k [--formato parquet]
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from src.fuentes import FUENTES, FuenteExcel, crear_fuente
+
+CIUDADES = ('Rio Cuarto', 'Alta Gracia', 'Carlos Paz', 'Villa Maria', 'Cordoba', 'Mendiolaza')
+CATEGORIAS = ('Alimentos', 'Limpieza', 'Bebidas', 'Perfumeria', 'Almacen')
+MEDIOS_PAGO = ('efectivo', 'qr', 'transferencia', 'tarjeta')
+PESOS_MEDIOS_PAGO = (0.31, 0.25, 0.22, 0.22)
+
+# Proporciones del ejemplo original: ~2.9 líneas por venta, ~1.8 ventas por cliente
+LINEAS_POR_VENTA = 3
+VENTAS_POR_CLIENTE = 2
+
+# Excel admite como máximo 1.048.576 filas por hoja (incluido el encabezado)
+MAX_FILAS_EXCEL = 1_048_575
+
+
+def _zipf(cantidad, exponente=1.0):
+    """Pesos normalizados 1/rango^exponente (el primero es el más frecuente)."""
+    pesos = 1 / np.arange(1, cantidad + 1) ** exponente
+    return pesos / pesos.sum()
+
+
+def generar_tablas(lineas, semilla=0, productos=None):
+    """
+    Devuelve {'clientes', 'productos', 'ventas', 'detalle_ventas'} con exactamente
+    `lineas` filas de detalle. Mismas columnas y tipos que los Excel de ejemplo
+    (los textos repetidos van como category para que escalen en memoria).
+    """
+    rng = np.random.default_rng(semilla)
+    num_ventas = max(1, -(-lineas // LINEAS_POR_VENTA))
+    num_clientes = max(1, num_ventas // VENTAS_POR_CLIENTE)
+    num_productos = productos or int(min(10_000, max(100, np.sqrt(lineas))))
+
+    # Clientes: ciudades con sesgo Zipf
+    ids_cliente = np.arange(1, num_clientes + 1)
+    ciudades = pd.Categorical.from_codes(
+        rng.choice(len(CIUDADES), num_clientes, p=_zipf(len(CIUDADES), 0.8)), CIUDADES
+    )
+    nombres = pd.Series(ids_cliente).map('Cliente {}'.format)
+    df_clientes = pd.DataFrame({
+        'id_cliente': ids_cliente,
+        'nombre_cliente': nombres,
+        'email': nombres.str.lower().str.replace(' ', '.', regex=False) + '@mail.com',
+        'ciudad': ciudades,
+        'fecha_alta': pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 365, num_clientes), unit='D')
+    })
+
+    # Productos: categorías sesgadas, precio fijo por producto
+    ids_producto = np.arange(1, num_productos + 1)
+    df_productos = pd.DataFrame({
+        'id_producto': ids_producto,
+        'nombre_producto': pd.Series(ids_producto).map('Producto {}'.format),
+        'categoria': pd.Categorical.from_codes(
+            rng.choice(len(CATEGORIAS), num_productos, p=_zipf(len(CATEGORIAS), 0.7)), CATEGORIAS
+        ),
+        'precio_unitario': rng.integers(200, 5000, num_productos)
+    })
+
+    # Ventas: clientes recurrentes (pocos clientes concentran muchas compras)
+    ids_venta = np.arange(1, num_ventas + 1)
+    clientes_venta = rng.choice(num_clientes, num_ventas, p=_zipf(num_clientes, 0.6))
+    df_ventas = pd.DataFrame({
+        'id_venta': ids_venta,
+        'fecha': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 366, num_ventas), unit='D'),
+        'id_cliente': ids_cliente[clientes_venta],
+        'nombre_cliente': df_clientes['nombre_cliente'].to_numpy()[clientes_venta],
+        'email': df_clientes['email'].to_numpy()[clientes_venta],
+        'medio_pago': pd.Categorical.from_codes(
+            rng.choice(len(MEDIOS_PAGO), num_ventas, p=PESOS_MEDIOS_PAGO), MEDIOS_PAGO
+        )
+    })
+
+    # Detalle: 1 a 5 líneas por venta, recortado a `lineas` exactas
+    items = rng.integers(1, 2 * LINEAS_POR_VENTA, num_ventas)
+    venta_linea = np.repeat(ids_venta, items)
+    faltan = lineas - len(venta_linea)
+    if faltan > 0:
+        venta_linea = np.concatenate([venta_linea, rng.choice(ids_venta, faltan)])
+    venta_linea = np.sort(venta_linea[:lineas])
+    producto_linea = rng.choice(num_productos, lineas, p=_zipf(num_productos, 0.9))
+    cantidad = rng.integers(1, 6, lineas)
+    precio = df_productos['precio_unitario'].to_numpy()[producto_linea]
+    df_detalle = pd.DataFrame({
+        'id_venta': venta_linea,
+        'id_producto': ids_producto[producto_linea],
+        'nombre_producto': pd.Categorical.from_codes(producto_linea, df_productos['nombre_producto']),
+        'cantidad': cantidad,
+        'precio_unitario': precio,
+        'importe': cantidad * precio
+    })
+
+    return {
+        'clientes': df_clientes,
+        'productos': df_productos,
+        'ventas': df_ventas,
+        'detalle_ventas': df_detalle
+    }
+
+
+def escribir(tablas, fuente):
+    """Guarda las tablas en una fuente de src.fuentes (Excel, CSV, Parquet o SQLite)."""
+    if isinstance(fuente, FuenteExcel) and len(tablas['detalle_ventas']) > MAX_FILAS_EXCEL:
+        raise ValueError(f"Excel admite hasta {MAX_FILAS_EXCEL:,} filas por hoja")
+    for nombre, df in tablas.items():
+        fuente.escribir(nombre, df)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera un dataset sintético de ventas")
+    parser.add_argument('lineas', type=int, help="Filas de detalle de ventas")
+    parser.add_argument('--destino', required=True)
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--formato', choices=list(FUENTES), default='excel')
+    args = parser.parse_args()
+
+    tablas = generar_tablas(args.lineas, args.semilla)
+    try:
+        escribir(tablas, crear_fuente(args.formato, args.destino))
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print(f"✅ {args.lineas:,} líneas generadas en {args.destino}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+"""
+Agregados parciales combinables para procesar el detalle de ventas por bloques.
+Permiten calcular los análisis principales sin materializar la tabla maestra completa.
+"""
+import numpy as np
+import pandas as pd
+from src.esquema import concatenar, concatenar_todos, montos_para_sumar
+
+
+def _sumar(acumulado, parcial):
+    """Suma dos agregados alineando por índice (conserva dtypes enteros)."""
+    if acumulado is None:
+        return parcial
+    return _sumar_todos([acumulado, parcial])
+
+
+def _sumar_todos(partes):
+    """Suma varios agregados alineando por índice, con una sola concatenación."""
+    partes = [p for p in partes if p is not None]
+    if len(partes) <= 1:
+        return partes[0] if partes else None
+    return pd.concat(partes).groupby(level=list(range(partes[0].index.nlevels))).sum()
+
+
+def posiciones_ventas(ids, ids_nuevos):
+    """
+    Posición de cada id de ids_nuevos en ids (ordenados, sin repetir) por búsqueda
+    binaria y máscara de los que no estaban. No rehashea los ids existentes.
+    """
+    ids = np.asarray(ids)
+    ids_nuevos = np.asarray(ids_nuevos)
+    posiciones = np.searchsorted(ids, ids_nuevos)
+    existe = posiciones < len(ids)
+    existe[existe] = ids[posiciones[existe]] == ids_nuevos[existe]
+    return posiciones, ~existe
+
+
+def insertar_ordenado(tabla, nuevas, ids, ids_nuevos):
+    """
+    Agrega filas nuevas a una tabla ordenada por id manteniendo el orden. Si todos
+    los ids nuevos son mayores (el caso habitual) solo se concatena.
+    """
+    combinada = concatenar(tabla, nuevas, ignore_index=False)
+    if len(ids) == 0 or len(ids_nuevos) == 0 or ids_nuevos[0] > ids[-1]:
+        return combinada
+    # Destino de cada fila nueva en el resultado (ambas listas están ordenadas)
+    destino = np.searchsorted(ids, ids_nuevos) + np.arange(len(ids_nuevos))
+    orden = np.empty(len(combinada), dtype=np.intp)
+    es_nueva = np.zeros(len(combinada), dtype=bool)
+    es_nueva[destino] = True
+    orden[~es_nueva] = np.arange(len(tabla))
+    orden[es_nueva] = len(tabla) + np.arange(len(nuevas))
+    return combinada.take(orden)
+
+
+def _combinar_ventas(partes):
+    """
+    Une agregados por venta con una sola concatenación: una venta repartida entre
+    partes suma su importe. El resultado queda ordenado por id_venta.
+    """
+    partes = [p for p in partes if p is not None]
+    if len(partes) <= 1:
+        return partes[0] if partes else None
+    return concatenar_todos(partes, ignore_index=False).groupby(level=0).agg(
+        importe=('importe', 'sum'),
+        id_cliente=('id_cliente', 'first'),
+        medio_pago=('medio_pago', 'first'),
+        ciudad=('ciudad', 'first')
+    )
+
+
+class AgregadosVentas:
+    """
+    Acumula sumas y conteos por bloque de la tabla maestra.
+    Expone la misma interfaz de análisis que AnalizadorVentas, con memoria
+    proporcional a las dimensiones (ciudades, categorías, ventas) y no al detalle.
+    """
+
+    def __init__(self):
+        self.importe_ciudad = None
+        self.por_categoria = None
+        self.cantidad_producto = None
+        # Por venta: (agregado, parciales de bloque pendientes de unir). Una sola
+        # tupla para que quien lea (ver por_venta) vea siempre un par coherente
+        self._ventas = (None, ())
+        self.precio_mes_categoria = None
+        self.lineas = 0
+
+    @classmethod
+    def desde_bloques(cls, bloques):
+        """Construye los agregados consumiendo un iterable de bloques de la tabla maestra."""
+        agregados = cls()
+        for bloque in bloques:
+            agregados.actualizar(bloque)
+        return agregados
+
+    def actualizar(self, bloque):
+        """Incorpora un bloque de la tabla maestra (detalle ya unido a las dimensiones)."""
+        # Sumas en float64 aunque el bloque use montos float32 (esquema compacto)
+        bloque = montos_para_sumar(bloque)
+        self.lineas += len(bloque)
+
+        self.importe_ciudad = _sumar(
+            self.importe_ciudad,
+            bloque.groupby('ciudad', observed=True)['importe'].sum()
+        )
+        self.por_categoria = _sumar(
+            self.por_categoria,
+            bloque.groupby('categoria', observed=True)[['importe', 'cantidad']].sum()
+        )
+        self.cantidad_producto = _sumar(
+            self.cantidad_producto,
+            bloque.groupby('nombre_producto', observed=True)['cantidad'].sum()
+        )
+
+        # Por venta: una venta puede quedar repartida entre dos bloques. Los parciales
+        # se juntan y se unen de una vez cuando suman tantas ventas como lo ya unido:
+        # cada venta se copia O(1) veces en promedio y no una vez por bloque
+        parcial_venta = bloque.groupby('id_venta').agg(
+            importe=('importe', 'sum'),
+            id_cliente=('id_cliente', 'first'),
+            medio_pago=('medio_pago', 'first'),
+            ciudad=('ciudad', 'first')
+        )
+        self._sumar_ventas(parcial_venta)
+
+        # Precio promedio por mes y categoría como suma y conteo
+        mes = bloque['fecha'].dt.to_period('M').rename('mes')
+        self.precio_mes_categoria = _sumar(
+            self.precio_mes_categoria,
+            bloque.groupby([mes, 'categoria'], observed=True)['precio_unitario'].agg(['sum', 'count'])
+        )
+        return self
+
+    def _sumar_ventas(self, parcial):
+        por_venta, pendientes = self._ventas
+        pendientes = pendientes + (parcial,)
+        if sum(len(p) for p in pendientes if p is not None) >= (0 if por_venta is None else len(por_venta)):
+            por_venta, pendientes = _combinar_ventas([por_venta, *pendientes]), ()
+        self._ventas = (por_venta, pendientes)
+
+    @property
+    def por_venta(self):
+        """Importe, cliente, medio de pago y ciudad por id_venta (une lo pendiente)."""
+        por_venta, pendientes = self._ventas
+        if pendientes:
+            por_venta = _combinar_ventas([por_venta, *pendientes])
+            self._ventas = (por_venta, ())
+        return por_venta
+
+    @por_venta.setter
+    def por_venta(self, valor):
+        self._ventas = (valor, ())
+
+    def combinar(self, otro):
+        """Combina en este objeto los agregados de otro bloque o partición."""
+        self.lineas += otro.lineas
+        self.importe_ciudad = _sumar(self.importe_ciudad, otro.importe_ciudad)
+        self.por_categoria = _sumar(self.por_categoria, otro.por_categoria)
+        self.cantidad_producto = _sumar(self.cantidad_producto, otro.cantidad_producto)
+        self._sumar_ventas(otro.por_venta)
+        self.precio_mes_categoria = _sumar(self.precio_mes_categoria, otro.precio_mes_categoria)
+        return self
+
+    @classmethod
+    def combinar_todos(cls, partes):
+        """
+        Paso de reducción de un map-reduce: combina los agregados de varias
+        particiones concatenando cada campo una sola vez (no de a pares).
+        """
+        total = cls()
+        total.lineas = sum(parte.lineas for parte in partes)
+        total.importe_ciudad = _sumar_todos([p.importe_ciudad for p in partes])
+        total.por_categoria = _sumar_todos([p.por_categoria for p in partes])
+        total.cantidad_producto = _sumar_todos([p.cantidad_producto for p in partes])
+        total.por_venta = _combinar_ventas([p.por_venta for p in partes])
+        total.precio_mes_categoria = _sumar_todos([p.precio_mes_categoria for p in partes])
+        return total
+
+    def ventas_por_ciudad(self):
+        """Análisis 1: Ventas totales por ciudad."""
+        return self.importe_ciudad.sort_values(ascending=False)
+
+    def ranking_categorias(self):
+        """Análisis 2: Ranking de categorías por importe y cantidad."""
+        return {
+            'por_importe': self.por_categoria['importe'].sort_values(ascending=False),
+            'por_cantidad': self.por_categoria['cantidad'].sort_values(ascending=False)
+        }
+
+    def ticket_promedio_por_ciudad(self):
+        """Ticket promedio (importe medio por venta) de cada ciudad."""
+        resultado = self.por_venta.groupby('ciudad', observed=True)['importe'].mean()
+        return resultado.rename('importe_total_venta').sort_values(ascending=False)
+
+    def metricas_clientes(self):
+        """Gasto, transacciones y AOV por cliente."""
+        metricas = self.por_venta.groupby('id_cliente').agg(
+            total_gasto=('importe', 'sum'),
+            total_transacciones=('importe', 'size')
+        ).reset_index()
+
+        metricas['aov'] = metricas['total_gasto'] / metricas['total_transacciones']
+        return metricas
+
+    def umbral_vip(self, percentil=90):
+        """
+        AOV mínimo para ser VIP. Un cliente puede comprar en varios bloques o
+        particiones: sus ventas se suman en por_venta antes de calcular el AOV.
+        """
+        return self.metricas_clientes()['aov'].quantile(percentil / 100)
+
+    def segmentacion_clientes(self, percentil=90):
+        """Análisis 3: Segmentación de clientes por valor promedio (AOV)."""
+        metricas = self.metricas_clientes()
+        umbral_vip = self.umbral_vip(percentil)
+        metricas['es_vip'] = metricas['aov'] >= umbral_vip
+
+        return metricas.sort_values('aov', ascending=False)
+
+    def medios_de_pago(self):
+        """Análisis 4: Distribución de transacciones por medio de pago."""
+        return self.por_venta.groupby('medio_pago', observed=True).agg(
+            total_importe=('importe', 'sum'),
+            num_transacciones=('importe', 'size')
+        ).sort_values('total_importe', ascending=False)
+
+    def tendencia_precios(self):
+        """Análisis 5: Evolución de precios promedio por categoría y mes."""
+        sumas = self.precio_mes_categoria
+        resultado = (sumas['sum'] / sumas['count']).rename('precio_unitario').reset_index()
+        resultado['mes'] = resultado['mes'].astype(str)
+        return resultado
+
+    def top_productos_cantidad(self, top_n=10):
+        """Análisis adicional: Top N productos por cantidad vendida."""
+        return self.cantidad_producto.nlargest(top_n)
+
+    def calcular_metricas(self, metricas=None, percentil=90, top_n=10):
+        """Métricas del dashboard en lote (mismas claves que AnalizadorVentas.calcular_metricas)."""
+        calculos = {
+            'ventas_por_ciudad': self.ventas_por_ciudad,
+            'ranking_categorias': self.ranking_categorias,
+            'segmentacion_clientes': lambda: self.segmentacion_clientes(percentil),
+            'medios_de_pago': self.medios_de_pago,
+            'tendencia_precios': self.tendencia_precios,
+            'top_productos_cantidad': lambda: self.top_productos_cantidad(top_n)
+        }
+        return {nombre: calculos[nombre]() for nombre in (metricas or calculos)}
@@ -2,109 +2,888 @@
 Módulo de análisis de métricas clave de negocio.
 Implementa los 5 análisis principales identificados en la documentación.
 """
+import copy
+import functools
+import inspect
+import threading
+from collections import OrderedDict
+import numpy as np
 import pandas as pd
+from src.agregados import AgregadosVentas, insertar_ordenado, posiciones_ventas
+from src.cubo import CuboVentas
+from src.esquema import concatenar, tipo_suma
+from src.indices import Filtro, IndiceFiltros
+from src.instrumentacion import instrumentar
+
+
+def _hashable(valor):
+    """Convierte listas/arrays de argumentos en tuplas para usarlos como clave."""
+    if isinstance(valor, (list, tuple, set, np.ndarray, pd.Index, pd.Series)):
+        return tuple(_hashable(v) for v in valor)
+    return valor
+
+
+# Desde pandas 3 copy-on-write está siempre activo
+_PANDAS_3 = int(pd.__version__.split('.')[0]) >= 3
+
+
+def _copiar(resultado):
+    """
+    Copia de un resultado cacheado para que el llamador pueda modificarlo sin tocar la
+    caché. Con copy-on-write alcanza una copia superficial (los datos se copian recién
+    si el llamador los modifica); sin copy-on-write (pandas 2 por defecto) es profunda.
+    """
+    if isinstance(resultado, (pd.Series, pd.DataFrame)):
+        superficial = _PANDAS_3 or pd.get_option('mode.copy_on_write') is True
+        return resultado.copy(deep=not superficial)
+    if isinstance(resultado, dict):
+        return {k: _copiar(v) for k, v in resultado.items()}
+    return resultado
+
+
+def _memoizar(metodo):
+    """
+    Cachea el resultado de un método del analizador con clave
+    (método, argumentos normalizados, versión de datos) en un LRU acotado.
+    El LRU se protege con self._lock_cache: el analizador puede compartirse entre
+    sesiones (hilos); el cálculo en sí corre fuera del lock. Si los datos cambian
+    durante el cálculo, el resultado se devuelve pero no se guarda.
+    """
+    firma = inspect.signature(metodo)
+    
+    @functools.wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        argumentos = firma.bind(self, *args, **kwargs)
+        argumentos.apply_defaults()
+        version = self.version
+        clave = (
+            metodo.__name__,
+            tuple((k, _hashable(v)) for k, v in argumentos.arguments.items() if k != 'self'),
+            version
+        )
+        
+        with self._lock_cache:
+            if clave in self._cache:
+                self._cache.move_to_end(clave)
+                self.aciertos += 1
+                return _copiar(self._cache[clave])
+            self.fallos += 1
+        
+        resultado = metodo(self, *args, **kwargs)
+        with self._lock_cache:
+            if self.version != version:
+                return _copiar(resultado)
+            self._cache[clave] = resultado
+            if len(self._cache) > self.tamano_cache:
+                self._cache.popitem(last=False)
+        return _copiar(resultado)
+    
+    return envoltura
+
+
+def _filas_df(analizador):
+    return len(analizador.df)
+
+
+# Dimensiones y métricas admitidas por AnalizadorVentas.top
+DIMENSIONES_TOP = ('nombre_producto', 'categoria', 'ciudad', 'medio_pago', 'id_cliente')
+METRICAS_TOP = ('cantidad', 'importe')
+
+
+def _posiciones_top(valores, k, grupos=None):
+    """
+    Posiciones de los k mayores valores (de cada grupo si se indican códigos de grupo),
+    ordenadas por valor descendente. Los empates se resuelven por posición, así que
+    el resultado es determinista; los NaN (y los grupos -1) no se seleccionan.
+    Con k <= 0 no se selecciona nada (como nlargest).
+    - Sin grupos: selección parcial (np.partition) y orden solo de los candidatos.
+    - Con grupos: un único lexsort (grupo, valor, posición) y corte por rango dentro
+      del grupo, sin recorrer los grupos en Python.
+    """
+    if k <= 0:
+        return np.empty(0, dtype='int64')
+    valores = np.asarray(valores, dtype='float64')
+    validos = ~np.isnan(valores)
+    if grupos is not None:
+        validos &= grupos >= 0
+    posiciones = np.flatnonzero(validos)
+    
+    if grupos is None:
+        if k < len(posiciones):
+            candidatos = valores[posiciones]
+            umbral = np.partition(candidatos, len(candidatos) - k)[len(candidatos) - k]
+            posiciones = posiciones[candidatos >= umbral]
+        orden = np.lexsort((posiciones, -valores[posiciones]))
+        return posiciones[orden][:k]
+    
+    orden = np.lexsort((posiciones, -valores[posiciones], grupos[posiciones]))
+    posiciones = posiciones[orden]
+    codigos = grupos[posiciones]
+    inicios = np.flatnonzero(np.r_[True, codigos[1:] != codigos[:-1]])
+    rango = np.arange(len(posiciones)) - np.repeat(inicios, np.diff(np.r_[inicios, len(posiciones)]))
+    return posiciones[rango < k]
+
+
+def top_k(datos, k=10, columna=None, por=None):
+    """
+    Los k mayores de una Series o de la columna `columna` de un DataFrame, sin ordenar
+    todo el resultado (semántica de nlargest). Con `por`, los k mayores de cada grupo
+    de esa columna, ordenados por grupo y luego por valor. Empates: gana la fila que
+    aparece primero (los agregados por dimensión están ordenados por su etiqueta).
+    """
+    valores = datos if columna is None else datos[columna]
+    grupos = None if por is None else pd.factorize(datos[por], sort=True)[0]
+    return datos.iloc[_posiciones_top(valores.to_numpy(dtype='float64', na_value=np.nan), k, grupos)]
+
+
+def _bincount(codigos, grupos, pesos=None):
+    """Suma de pesos (o conteo) por código de grupo; los códigos -1 (nulos) no cuentan."""
+    validos = codigos >= 0
+    return np.bincount(codigos[validos], weights=None if pesos is None else pesos[validos], minlength=grupos)
+
+
+def _armar_tabla_ventas(df, codigos, ids):
+    """Tabla a nivel venta de df a partir de los códigos (ordenados) de id_venta."""
+    importe = df['importe'].to_numpy(dtype='float64', na_value=0)
+    
+    # Posición de la primera línea de cada venta (los atributos de venta se repiten en sus líneas)
+    _, primera = np.unique(codigos, return_index=True)
+    primera = primera[len(primera) - len(ids):]
+    
+    tabla = {'id_venta': ids}
+    for columna in ['id_cliente', 'fecha', 'medio_pago', 'ciudad']:
+        tabla[columna] = df[columna].array.take(primera)
+    tabla['importe_total_venta'] = _bincount(codigos, len(ids), importe).astype(tipo_suma(df['importe'].dtype))
+    tabla['num_items'] = _bincount(codigos, len(ids))
+    return pd.DataFrame(tabla)
+
+
+def _extender_claves(codigos, unicos, columna_nuevas, tipo):
+    """
+    Extiende una clave factorizada (códigos ordenados y únicos) con filas nuevas sin
+    volver a hashear las existentes: los valores nuevos se buscan en los únicos y,
+    si aparece alguno que no estaba, los códigos anteriores se remapean con un take.
+    """
+    valores = pd.Index(np.asarray(unicos))
+    nuevas = np.asarray(columna_nuevas)
+    nulos = pd.isna(nuevas)
+    faltantes = pd.Index(pd.unique(nuevas[~nulos])).difference(valores)
+    if len(faltantes) and len(valores):
+        union = valores.union(faltantes)
+        mapa = union.get_indexer(valores)
+        codigos = np.where(codigos >= 0, mapa[codigos], -1)
+        valores = union
+    elif len(faltantes):
+        valores = faltantes.sort_values()
+    codigos_nuevas = np.where(nulos, -1, valores.get_indexer(nuevas))
+    # Únicos con el mismo tipo que daría factorizar la columna completa
+    unicos = pd.factorize(pd.Series(np.asarray(valores), dtype=tipo), sort=True)[1]
+    return np.concatenate([codigos, codigos_nuevas]).astype(codigos.dtype, copy=False), unicos
+
+
+def _meses_enteros(fechas):
+    """Meses desde 1970 de las fechas válidas y la máscara de válidas."""
+    fechas = fechas.to_numpy(dtype='datetime64[ns]')
+    validas = ~np.isnat(fechas)
+    return fechas[validas].astype('datetime64[M]').astype('int64'), validas
+
+
+def _extender_meses(codigos, unicos, fechas_nuevas):
+    """Clave de mes extendida con las fechas nuevas (ver _EstadoDatos.meses)."""
+    meses, validas = _meses_enteros(fechas_nuevas)
+    union = np.union1d(unicos, meses)
+    if len(union) > len(unicos) > 0:
+        mapa = union.searchsorted(unicos)
+        codigos = np.where(codigos >= 0, mapa[codigos], -1)
+    codigos_nuevas = np.full(len(validas), -1, dtype='int64')
+    codigos_nuevas[validas] = union.searchsorted(meses)
+    return np.concatenate([codigos, codigos_nuevas]), union
+
+
+def _fusionar_tabla_ventas(tabla, parcial):
+    """
+    Suma a la tabla a nivel venta el parcial de las líneas nuevas: las ventas que ya
+    estaban suman importe e ítems y las nuevas se insertan por id_venta.
+    Retorna la tabla nueva y la máscara de ventas nuevas del parcial.
+    """
+    ids = tabla['id_venta'].to_numpy()
+    ids_parcial = parcial['id_venta'].to_numpy()
+    posiciones, nuevas = posiciones_ventas(ids, ids_parcial)
+    existentes = ~nuevas
+    if existentes.any():
+        sumas = {}
+        for columna in ['importe_total_venta', 'num_items']:
+            valores = tabla[columna].to_numpy(copy=True)
+            valores[posiciones[existentes]] += parcial[columna].to_numpy()[existentes]
+            sumas[columna] = valores
+        tabla = tabla.assign(**sumas)
+    if nuevas.any():
+        tabla = insertar_ordenado(tabla, parcial[nuevas], ids, ids_parcial[nuevas]).reset_index(drop=True)
+    return tabla, nuevas
+
+
+def _suavizar(tendencia, ventana):
+    """
+    Media móvil de `ventana` meses del precio de cada categoría. Se calcula sobre la
+    tabla mes × categoría (todas las categorías a la vez) con los meses calendario
+    completos; los meses sin ventas no aportan a la ventana ni aparecen en el resultado.
+    """
+    if len(tendencia) == 0:
+        return tendencia
+    ancho = tendencia.pivot(index='mes', columns='categoria', values='precio_unitario')
+    meses = pd.PeriodIndex(ancho.index, freq='M')
+    completo = ancho.set_axis(meses).reindex(pd.period_range(meses.min(), meses.max(), freq='M'))
+    suavizado = completo.rolling(ventana, min_periods=1).mean()
+    suavizado.index = suavizado.index.astype(str)
+    
+    resultado = tendencia.copy()
+    claves = pd.MultiIndex.from_frame(tendencia[['mes', 'categoria']])
+    resultado['precio_unitario'] = suavizado.stack().reindex(claves).to_numpy()
+    return resultado
+
+
+def _pivotar_tendencia(tendencia):
+    """Tendencia en formato ancho: una fila por mes ('YYYY-MM') y una columna por categoría."""
+    ancho = tendencia.pivot(index='mes', columns='categoria', values='precio_unitario')
+    ancho.columns = ancho.columns.astype(str)
+    return ancho.dropna(axis=1, how='all')
+
+
+class _EstadoDatos:
+    """
+    Una versión de los datos del analizador: la tabla maestra y lo que se deriva de
+    ella (claves factorizadas, tabla a nivel venta, pasada, cubo, índices y agregados).
+    Las estructuras derivadas se arman al primer uso y ya no cambian; incorporar filas
+    arma un estado nuevo (ver extender), nunca modifica este.
+    """
+    
+    def __init__(self, df, version=0, agregados=None, max_filtros=64):
+        self.df = df
+        self.version = version
+        self.agregados = agregados
+        self.claves = {}
+        self._tabla_ventas = None
+        self._pasada = None
+        self._cubo = None
+        self._indices = None
+        # Posiciones de fila por filtro (ver filas): son de esta versión de los datos
+        self._filas = OrderedDict()
+        self.max_filtros = max_filtros
+        # Un lock por estructura: armar el cubo no frena a quien pide los índices.
+        # El cubo toma el de la tabla a nivel venta y esta el de las claves, siempre
+        # en ese orden, así que no hay esperas cruzadas
+        self._locks = {nombre: threading.Lock()
+                       for nombre in ('claves', '_tabla_ventas', '_pasada', '_cubo', '_indices', '_filas')}
+    
+    def _construir(self, atributo, armar):
+        """Valor de `atributo`, armándolo una sola vez aunque lo pidan varios hilos."""
+        valor = getattr(self, atributo)
+        if valor is None:
+            with self._locks[atributo]:
+                valor = getattr(self, atributo)
+                if valor is None:
+                    valor = armar()
+                    setattr(self, atributo, valor)
+        return valor
+    
+    def factorizar(self, columna):
+        """Códigos enteros (ordenados) y valores únicos de una columna de agrupación."""
+        clave = self.claves.get(columna)
+        if clave is None:
+            with self._locks['claves']:
+                clave = self.claves.get(columna)
+                if clave is None:
+                    clave = self.claves[columna] = pd.factorize(self.df[columna], sort=True)
+        return clave
+    
+    def meses(self):
+        """
+        Clave entera de mes por línea (código en los meses distintos, -1 sin fecha)
+        y los meses distintos como meses desde 1970. Se calcula una vez desde fecha.
+        """
+        clave = self.claves.get('mes')
+        if clave is None:
+            with self._locks['claves']:
+                clave = self.claves.get('mes')
+                if clave is None:
+                    meses, validas = _meses_enteros(self.df['fecha'])
+                    codigos = np.full(len(validas), -1, dtype='int64')
+                    unicos, codigos[validas] = np.unique(meses, return_inverse=True)
+                    clave = self.claves['mes'] = (codigos, unicos)
+        return clave
+    
+    def sumar_por(self, columna, valores):
+        """
+        Equivale a df.groupby(columna)[valores].sum(), pero con bincount sobre los
+        códigos compartidos: no vuelve a hashear la clave en cada análisis.
+        """
+        codigos, grupos = self.factorizar(columna)
+        serie = self.df[valores]
+        sumas = _bincount(codigos, len(grupos), serie.to_numpy(dtype='float64', na_value=0))
+        return pd.Series(sumas.astype(tipo_suma(serie.dtype)), index=pd.Index(grupos, name=columna), name=valores)
+    
+    def tabla_ventas(self):
+        """Tabla a nivel venta (ver AnalizadorVentas.tabla_ventas)."""
+        return self._construir('_tabla_ventas', self._armar_tabla_ventas)
+    
+    def pasada(self):
+        """Sumas base de las métricas sin filtros (ver AnalizadorVentas.pasada)."""
+        return self._construir('_pasada', self._armar_pasada)
+    
+    def cubo(self):
+        """Cubo de agregados por día (ver CuboVentas)."""
+        return self._construir('_cubo', self._armar_cubo)
+    
+    def indices(self):
+        """Índices por dimensión y fecha (ver IndiceFiltros)."""
+        return self._construir('_indices', self._armar_indices)
+    
+    def filas(self, filtro):
+        """Posiciones de fila que cumplen el filtro, con un LRU chico por estado."""
+        with self._locks['_filas']:
+            if filtro in self._filas:
+                self._filas.move_to_end(filtro)
+                return self._filas[filtro]
+        filas = self.indices().resolver(filtro)
+        with self._locks['_filas']:
+            self._filas[filtro] = filas
+            if len(self._filas) > self.max_filtros:
+                self._filas.popitem(last=False)
+        return filas
+    
+    # Solo se miden las construcciones: pedir una estructura ya armada no es una etapa
+    @instrumentar('AnalizadorVentas.tabla_ventas', entrada=_filas_df)
+    def _armar_tabla_ventas(self):
+        return _armar_tabla_ventas(self.df, *self.factorizar('id_venta'))
+    
+    @instrumentar('AnalizadorVentas.cubo', entrada=_filas_df)
+    def _armar_cubo(self):
+        return CuboVentas(self.df, self.tabla_ventas())
+    
+    @instrumentar('AnalizadorVentas.indices', entrada=_filas_df)
+    def _armar_indices(self):
+        return IndiceFiltros(self.df)
+    
+    @instrumentar('AnalizadorVentas.pasada', entrada=_filas_df)
+    def _armar_pasada(self):
+        importe = self.df['importe'].to_numpy(dtype='float64', na_value=0)
+        cantidad = self.df['cantidad'].to_numpy(dtype='float64', na_value=0)
+        tipo_importe = tipo_suma(self.df['importe'].dtype)
+        tipo_cantidad = tipo_suma(self.df['cantidad'].dtype)
+        
+        def sumas(columna, pesos, nombre, tipo):
+            codigos, grupos = self.factorizar(columna)
+            return pd.Series(_bincount(codigos, len(grupos), pesos).astype(tipo),
+                             index=pd.Index(grupos, name=columna), name=nombre)
+        
+        # Nivel venta: cada fila es una venta (una transacción)
+        ventas = self.tabla_ventas()
+        total_venta = ventas['importe_total_venta'].to_numpy(dtype='float64', na_value=0)
+        codigos_medio, medios = pd.factorize(ventas['medio_pago'], sort=True)
+        codigos_ciudad, ciudades = pd.factorize(ventas['ciudad'], sort=True)
+        codigos_cliente, clientes = pd.factorize(ventas['id_cliente'], sort=True)
+        ventas_ciudad = _bincount(codigos_ciudad, len(ciudades))
+        gasto = _bincount(codigos_cliente, len(clientes), total_venta)
+        transacciones = _bincount(codigos_cliente, len(clientes))
+        
+        return {
+            'ciudad': sumas('ciudad', importe, 'importe', tipo_importe),
+            'categoria': pd.DataFrame({
+                'importe': sumas('categoria', importe, 'importe', tipo_importe),
+                'cantidad': sumas('categoria', cantidad, 'cantidad', tipo_cantidad)
+            }),
+            'producto': sumas('nombre_producto', cantidad, 'cantidad', tipo_cantidad),
+            'medio_pago': pd.DataFrame({
+                'total_importe': _bincount(codigos_medio, len(medios), total_venta).astype(tipo_importe),
+                'num_transacciones': _bincount(codigos_medio, len(medios)).astype('int64')
+            }, index=pd.Index(medios, name='medio_pago')),
+            'ticket_ciudad': pd.Series(
+                _bincount(codigos_ciudad, len(ciudades), total_venta) / ventas_ciudad,
+                index=pd.Index(ciudades, name='ciudad'), name='importe_total_venta'
+            ),
+            'clientes': pd.DataFrame({
+                'id_cliente': clientes,
+                'total_gasto': gasto.astype(tipo_importe),
+                'total_transacciones': transacciones.astype('int64'),
+                'aov': gasto / transacciones
+            })
+        }
+    
+    def extender(self, df_nuevas):
+        """
+        Estado siguiente con las líneas nuevas: la tabla a nivel venta suma solo las
+        ventas tocadas (las nuevas se insertan en orden), el cubo reagrupa solo los
+        últimos días, los índices y las claves factorizadas se extienden y los
+        agregados (modo incremental) se actualizan con las filas nuevas. Lo que aún
+        no se había armado (y la pasada) se arma al primer uso sobre el estado nuevo.
+        """
+        df = concatenar(self.df, df_nuevas)
+        agregados = self.agregados
+        if agregados is not None:
+            agregados = copy.copy(agregados).actualizar(df_nuevas)
+        estado = _EstadoDatos(df, self.version + 1, agregados, self.max_filtros)
+        
+        # Se extiende lo que ya estaba armado al empezar (lo que se arme mientras tanto
+        # se arma de nuevo sobre el estado nuevo cuando se pida)
+        with self._locks['claves']:
+            claves = dict(self.claves)
+        tabla_ventas, cubo, indices = self._tabla_ventas, self._cubo, self._indices
+        for columna, (codigos, unicos) in claves.items():
+            if columna == 'mes':
+                estado.claves['mes'] = _extender_meses(codigos, unicos, df_nuevas['fecha'])
+            else:
+                estado.claves[columna] = _extender_claves(codigos, unicos, df_nuevas[columna], df[columna].dtype)
+        
+        if tabla_ventas is not None:
+            codigos, ids = pd.factorize(df_nuevas['id_venta'], sort=True)
+            parcial = _armar_tabla_ventas(df_nuevas, codigos, ids)
+            estado._tabla_ventas, es_nueva = _fusionar_tabla_ventas(tabla_ventas, parcial)
+            if cubo is not None:
+                estado._cubo = copy.copy(cubo).agregar(df_nuevas, parcial, es_nueva.astype('int64'))
+        if indices is not None:
+            estado._indices = copy.copy(indices).agregar(df_nuevas)
+        return estado
 
 
 class AnalizadorVentas:
     """Realiza análisis descriptivos sobre los datos de ventas."""
     
-    def __init__(self, df_master):
-        self.df = df_master
+    # Métricas que calcula calcular_metricas() (todas leen de pasada() o del cubo)
+    METRICAS = (
+        'ventas_por_ciudad',
+        'ranking_categorias',
+        'segmentacion_clientes',
+        'medios_de_pago',
+        'tendencia_precios',
+        'top_productos_cantidad'
+    )
     
-    def _calcular_ventas_totales(self):
-        """Calcula importe total por venta (método auxiliar)."""
-        ventas = self.df.groupby('id_venta')['importe'].sum().reset_index()
-        ventas.rename(columns={'importe': 'importe_total_venta'}, inplace=True)
-        return ventas
+    def __init__(self, df_master, tamano_cache=64, incremental=False, max_filtrados=4):
+        # Modo incremental: agregados combinables que se actualizan solo con las filas nuevas
+        agregados = AgregadosVentas().actualizar(df_master) if incremental else None
+        # Datos y estructuras derivadas: cada análisis toma el estado una vez al entrar
+        # y trabaja sobre él; agregar_ventas publica uno nuevo con una sola asignación
+        self._estado = _EstadoDatos(df_master, 0, agregados, tamano_cache)
         
-    def ventas_por_ciudad(self):
+        # Caché LRU de resultados (ver _memoizar); la versión cambia si cambian los datos.
+        # _lock_cache solo protege los LRU (se toma por instantes); _lock_escritura
+        # ordena a quienes arman un estado nuevo, que puede tardar
+        self._cache = OrderedDict()
+        self._lock_cache = threading.Lock()
+        self._lock_escritura = threading.Lock()
+        self.tamano_cache = tamano_cache
+        self.aciertos = 0
+        self.fallos = 0
+        # Analizadores filtrados (ver filtrar): cada uno copia sus filas, así que
+        # tienen su propio LRU, mucho más chico que el de resultados
+        self._filtrados = OrderedDict()
+        self.max_filtrados = max_filtrados
+    
+    @property
+    def df(self):
+        """Tabla maestra del estado actual."""
+        return self._estado.df
+    
+    @property
+    def agregados(self):
+        """Agregados combinables del estado actual (None fuera del modo incremental)."""
+        return self._estado.agregados
+    
+    @property
+    def version(self):
+        """Versión de los datos: cambia con cada agregar_ventas o invalidar_cache."""
+        return self._estado.version
+    
+    def invalidar_cache(self):
+        """Descarta resultados e intermedios cacheados."""
+        with self._lock_escritura, self._lock_cache:
+            estado = self._estado
+            self._estado = _EstadoDatos(estado.df, estado.version + 1, estado.agregados, self.tamano_cache)
+            self._cache.clear()
+            self._filtrados.clear()
+    
+    def agregar_ventas(self, df_nuevas):
+        """
+        Incorpora líneas nuevas de la tabla maestra (ver DataLoader.cargar_incremental)
+        sin recalcular desde cero (ver _EstadoDatos.extender). El estado nuevo se
+        publica con una sola asignación: un análisis en curso termina sobre el anterior.
+        """
+        if len(df_nuevas) == 0:
+            return
+        df_nuevas = df_nuevas.reset_index(drop=True)
+        with self._lock_escritura:
+            estado = self._estado.extender(df_nuevas)
+            with self._lock_cache:
+                self._estado = estado
+                self._cache.clear()
+                self._filtrados.clear()
+    
+    def estadisticas_cache(self):
+        """Aciertos, fallos y ocupación de la caché de resultados."""
+        return {
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'entradas': len(self._cache),
+            'tamano_maximo': self.tamano_cache,
+            'filtrados': len(self._filtrados)
+        }
+    
+    def tabla_ventas(self):
+        """
+        Tabla a nivel venta (una fila por id_venta), calculada una sola vez y reutilizada
+        por todos los análisis por venta. Columnas: id_venta, id_cliente, fecha,
+        medio_pago, ciudad, importe_total_venta y num_items (líneas de detalle).
+        No modificar el resultado: es compartido.
+        """
+        return self._estado.tabla_ventas()
+        
+    def pasada(self):
+        """
+        Sumas base de todas las métricas sin filtros, calculadas juntas y una sola vez:
+        importe y cantidad se convierten una vez y se suman con bincount sobre los
+        códigos compartidos de ciudad, categoría y producto; medios de pago, ticket y
+        clientes salen con bincount de la tabla a nivel venta. Cada análisis solo
+        ordena su parte. No modificar el resultado: es compartido.
+        """
+        return self._estado.pasada()
+    
+    def cubo(self):
+        """
+        Cubo de agregados por día × ciudad × categoría × medio de pago (ver CuboVentas).
+        Los análisis con desde/hasta se responden sumando celdas del cubo.
+        """
+        return self._estado.cubo()
+    
+    def indices(self):
+        """Índices por dimensión y fecha para resolver filtros (ver IndiceFiltros)."""
+        return self._estado.indices()
+    
+    def valores(self, dimension):
+        """Valores distintos (ordenados) de una dimensión filtrable."""
+        return self.indices().valores(dimension)
+    
+    @instrumentar(entrada=_filas_df)
+    def filtrar(self, filtro):
+        """
+        Analizador sobre las filas que cumplen el filtro (src.indices.Filtro).
+        Las filas se obtienen intersectando índices. Se conservan los últimos
+        max_filtrados analizadores (cada uno es una copia de sus filas); de los
+        demás filtros solo quedan cacheadas las posiciones.
+        """
+        estado = self._estado
+        clave = (filtro, estado.version)
+        with self._lock_cache:
+            if clave in self._filtrados:
+                self._filtrados.move_to_end(clave)
+                return self._filtrados[clave]
+        filas = estado.filas(filtro)
+        analizador = AnalizadorVentas(estado.df.take(filas).reset_index(drop=True), self.tamano_cache)
+        with self._lock_cache:
+            if self._estado is not estado:
+                return analizador
+            self._filtrados[clave] = analizador
+            while len(self._filtrados) > self.max_filtrados:
+                self._filtrados.popitem(last=False)
+        return analizador
+    
+    def rango_fechas(self):
+        """Primer y último día con ventas."""
+        return self.cubo().rango_fechas()
+    
+    @instrumentar(entrada=_filas_df)
+    @_memoizar
+    def ventas_por_ciudad(self, desde=None, hasta=None, filtro=None):
         """
         Análisis 1: Ventas totales por ciudad.
         Métrica clave: ¿Dónde vendemos más?
         """
-        resultado = self.df.groupby('ciudad')['importe'].sum().sort_values(ascending=False)
-        return resultado
+        if filtro is not None and not filtro.solo_fechas():
+            return self.filtrar(filtro).ventas_por_ciudad()
+        if filtro is not None:
+            desde, hasta = filtro.desde, filtro.hasta
+        estado = self._estado
+        if desde is not None or hasta is not None:
+            return estado.cubo().ventas_por_ciudad(desde, hasta)
+        if estado.agregados is not None:
+            return estado.agregados.ventas_por_ciudad()
+        return estado.pasada()['ciudad'].sort_values(ascending=False)
     
-    def ranking_categorias(self):
+    @instrumentar(entrada=_filas_df)
+    @_memoizar
+    def ranking_categorias(self, desde=None, hasta=None, filtro=None):
         """
         Análisis 2: Ranking de categorías por importe y cantidad.
         Métrica clave: ¿Qué productos generan más ingresos y rotación?
         """
-        por_importe = self.df.groupby('categoria')['importe'].sum().sort_values(ascending=False)
-        por_cantidad = self.df.groupby('categoria')['cantidad'].sum().sort_values(ascending=False)
-        
+        if filtro is not None and not filtro.solo_fechas():
+            return self.filtrar(filtro).ranking_categorias()
+        if filtro is not None:
+            desde, hasta = filtro.desde, filtro.hasta
+        estado = self._estado
+        if desde is not None or hasta is not None:
+            return estado.cubo().ranking_categorias(desde, hasta)
+        if estado.agregados is not None:
+            return estado.agregados.ranking_categorias()
+        por_categoria = estado.pasada()['categoria']
         return {
-            'por_importe': por_importe,
-            'por_cantidad': por_cantidad
+            'por_importe': por_categoria['importe'].sort_values(ascending=False),
+            'por_cantidad': por_categoria['cantidad'].sort_values(ascending=False)
         }
     
-    def segmentacion_clientes(self, percentil=90):
+    @instrumentar(entrada=_filas_df)
+    @_memoizar
+    def ticket_promedio_por_ciudad(self, desde=None, hasta=None, filtro=None):
+        """
+        Ticket promedio (importe medio por venta) de cada ciudad.
+        Métrica clave: ¿Dónde compran más por visita?
+        """
+        if filtro is not None and not filtro.solo_fechas():
+            return self.filtrar(filtro).ticket_promedio_por_ciudad()
+        if filtro is not None:
+            desde, hasta = filtro.desde, filtro.hasta
+        estado = self._estado
+        if desde is not None or hasta is not None:
+            return estado.cubo().ticket_promedio_por_ciudad(desde, hasta)
+        if estado.agregados is not None:
+            return estado.agregados.ticket_promedio_por_ciudad()
+        return estado.pasada()['ticket_ciudad'].sort_values(ascending=False)
+    
+    @_memoizar
+    def _metricas_clientes(self):
+        """Gasto, transacciones y AOV por cliente (independiente del percentil VIP)."""
+        estado = self._estado
+        if estado.agregados is not None:
+            return estado.agregados.metricas_clientes()
+        return estado.pasada()['clientes']
+    
+    @instrumentar(entrada=_filas_df)
+    def segmentacion_clientes(self, percentil=90, filtro=None, ordenar=True):
         """
         Análisis 3: Segmentación de clientes por valor promedio (AOV).
         Métrica clave: ¿Quiénes son nuestros clientes VIP?
+        Mover el percentil solo recalcula el umbral: las métricas por cliente se cachean.
+        ordenar=False devuelve los clientes por id, sin ordenar por AOV (ver top_k).
         """
-        ventas_totales = self._calcular_ventas_totales()
+        if filtro is not None:
+            return self.filtrar(filtro).segmentacion_clientes(percentil, ordenar=ordenar)
+        metricas = self._metricas_clientes()
         
-        # Unir con información de cliente
-        df_aov = ventas_totales.merge(
-            self.df[['id_venta', 'id_cliente']].drop_duplicates(),
-            on='id_venta'
-        )
+        # Identificar clientes VIP (percentil especificado), con el umbral de las mismas métricas
+        metricas['es_vip'] = metricas['aov'] >= metricas['aov'].quantile(percentil / 100)
         
-        # Calcular métricas por cliente
-        metricas = df_aov.groupby('id_cliente').agg(
-            total_gasto=('importe_total_venta', 'sum'),
-            total_transacciones=('id_venta', 'nunique')
-        ).reset_index()
+        return metricas.sort_values('aov', ascending=False) if ordenar else metricas
+    
+    def umbral_vip(self, percentil=90, filtro=None):
+        """
+        AOV mínimo para ser VIP: cuantil exacto sobre todos los clientes o, con un
+        filtro, sobre los clientes de las filas que lo cumplen (mismo umbral que usa
+        segmentacion_clientes con ese filtro).
+        """
+        if filtro is not None:
+            return self.filtrar(filtro).umbral_vip(percentil)
+        return self._metricas_clientes()['aov'].quantile(percentil / 100)
+    
+    @instrumentar(entrada=_filas_df)
+    @_memoizar
+    def productos_por_cliente(self, max_productos=3, ids_cliente=None, filtro=None):
+        """
+        Primeros `max_productos` productos distintos de cada cliente (en orden de compra),
+        separados por coma y con '...' si compró más. Con ids_cliente se calcula solo
+        para esos clientes. Vectorizado: dedup + cumcount, sin funciones por cliente.
+        """
+        estado = self._estado
+        if max_productos <= 0:
+            return pd.DataFrame({'id_cliente': estado.df['id_cliente'][:0], 'productos_comprados': pd.Series(dtype=object)})
+        if filtro is not None:
+            return self.filtrar(filtro).productos_por_cliente(max_productos, ids_cliente)
+        df = estado.df[['id_cliente', 'nombre_producto']].dropna()
+        if ids_cliente is not None:
+            df = df[df['id_cliente'].isin(list(ids_cliente))]
         
-        metricas['aov'] = metricas['total_gasto'] / metricas['total_transacciones']
+        # Productos distintos por cliente en orden de aparición y su posición
+        distintos = df.drop_duplicates()
+        posicion = distintos.groupby('id_cliente').cumcount().to_numpy()
+        total = distintos.groupby('id_cliente').size()
         
-        # Identificar clientes VIP (percentil especificado)
-        umbral_vip = metricas['aov'].quantile(percentil / 100)
-        metricas['es_vip'] = metricas['aov'] >= umbral_vip
+        # Concatenar por posición (una operación vectorizada por producto mostrado)
+        texto = None
+        for k in range(max_productos):
+            parte = distintos.loc[posicion == k].set_index('id_cliente')['nombre_producto'].astype(str)
+            if texto is None:
+                texto = parte.sort_index()
+            else:
+                texto.loc[parte.index] = texto.loc[parte.index] + ', ' + parte
         
-        return metricas.sort_values('aov', ascending=False)
+        texto = texto.where(total.reindex(texto.index) <= max_productos, texto + '...')
+        return pd.DataFrame({'id_cliente': texto.index, 'productos_comprados': texto.to_numpy()})
     
-    def medios_de_pago(self):
+    @instrumentar(entrada=_filas_df)
+    @_memoizar
+    def medios_de_pago(self, desde=None, hasta=None, filtro=None):
         """
         Análisis 4: Distribución de transacciones por medio de pago.
         Métrica clave: ¿Cómo prefieren pagar nuestros clientes?
         """
-        ventas_totales = self._calcular_ventas_totales()
-        
-        # Unir con medio de pago
-        df_pagos = ventas_totales.merge(
-            self.df[['id_venta', 'medio_pago']].drop_duplicates(),
-            on='id_venta'
-        )
-        
-        # Agrupar por medio de pago
-        resultado = df_pagos.groupby('medio_pago').agg(
-            total_importe=('importe_total_venta', 'sum'),
-            num_transacciones=('id_venta', 'count')
-        ).sort_values('total_importe', ascending=False)
-        
-        return resultado
+        if filtro is not None and not filtro.solo_fechas():
+            return self.filtrar(filtro).medios_de_pago()
+        if filtro is not None:
+            desde, hasta = filtro.desde, filtro.hasta
+        estado = self._estado
+        if desde is not None or hasta is not None:
+            return estado.cubo().medios_de_pago(desde, hasta)
+        if estado.agregados is not None:
+            return estado.agregados.medios_de_pago()
+        return estado.pasada()['medio_pago'].sort_values('total_importe', ascending=False)
     
-    def tendencia_precios(self):
+    @instrumentar(entrada=_filas_df)
+    @_memoizar
+    def tendencia_precios(self, desde=None, hasta=None, filtro=None, ponderado=False, ventana=None):
         """
         Análisis 5: Evolución de precios promedio por categoría y mes.
         Métrica clave: ¿Cómo varían los precios en el tiempo?
+        - ponderado=True: precio ponderado por cantidad (Σimporte / Σcantidad).
+        - ventana: media móvil de n meses por categoría (ver _suavizar).
+        Retorna columnas mes ('YYYY-MM'), categoria y precio_unitario.
         """
-        # Extraer mes de la fecha
-        df_temp = self.df.copy()
-        df_temp['mes'] = df_temp['fecha'].dt.to_period('M')
+        if ventana is not None and ventana > 1:
+            return _suavizar(self.tendencia_precios(desde, hasta, filtro, ponderado), ventana)
+        if filtro is not None and not filtro.solo_fechas():
+            return self.filtrar(filtro).tendencia_precios(ponderado=ponderado)
+        if filtro is not None:
+            desde, hasta = filtro.desde, filtro.hasta
+        estado = self._estado
+        if desde is not None or hasta is not None:
+            return estado.cubo().tendencia_precios(desde, hasta, ponderado)
+        if estado.agregados is not None and not ponderado:
+            return estado.agregados.tendencia_precios()
         
-        # Calcular precio promedio por categoría y mes
-        resultado = df_temp.groupby(['mes', 'categoria'])['precio_unitario'].mean().reset_index()
-        resultado['mes'] = resultado['mes'].astype(str)
+        # Sumas por (mes, categoría) con bincount sobre claves enteras: sin copiar la tabla
+        codigos_mes, meses = estado.meses()
+        codigos_cat, categorias = estado.factorizar('categoria')
+        validos = (codigos_mes >= 0) & (codigos_cat >= 0)
+        clave = codigos_mes[validos] * len(categorias) + codigos_cat[validos]
+        celdas = len(meses) * len(categorias)
+        if ponderado:
+            numerador = estado.df['importe'].to_numpy(dtype='float64', na_value=np.nan)[validos]
+            denominador = estado.df['cantidad'].to_numpy(dtype='float64', na_value=np.nan)[validos]
+            numerador = np.where(np.isnan(denominador), np.nan, numerador)
+        else:
+            numerador = estado.df['precio_unitario'].to_numpy(dtype='float64', na_value=np.nan)[validos]
+            denominador = np.ones(len(numerador))
+        # Los nulos no cuentan (como en mean)
+        nulos = np.isnan(numerador)
+        sumas = np.bincount(clave, weights=np.where(nulos, 0, numerador), minlength=celdas)
+        pesos = np.bincount(clave, weights=np.where(nulos, 0, denominador), minlength=celdas)
+        presentes = np.flatnonzero(np.bincount(clave, minlength=celdas))
         
-        return resultado
+        with np.errstate(divide='ignore', invalid='ignore'):
+            precio = np.where(pesos[presentes] > 0, sumas[presentes] / pesos[presentes], np.nan)
+        return pd.DataFrame({
+            'mes': meses[presentes // len(categorias)].astype('datetime64[M]').astype(str),
+            'categoria': categorias.take(presentes % len(categorias)),
+            'precio_unitario': precio
+        })
+    
+    def tendencia_por_categoria(self, desde=None, hasta=None, filtro=None, ponderado=False, ventana=None):
+        """tendencia_precios pivoteada: una fila por mes y una columna por categoría."""
+        return _pivotar_tendencia(self.tendencia_precios(desde, hasta, filtro, ponderado, ventana))
     
-    def top_productos_cantidad(self, top_n=10):
+    @instrumentar(entrada=_filas_df)
+    def top_productos_cantidad(self, top_n=10, filtro=None):
         """
         Análisis adicional: Top N productos por cantidad vendida.
         Métrica clave: ¿Qué productos tienen mayor rotación?
         """
-        resultado = self.df.groupby('nombre_producto')['cantidad'].sum().sort_values(ascending=False).head(top_n)
+        if filtro is not None:
+            return self.filtrar(filtro).top_productos_cantidad(top_n)
+        resultado = top_k(self._cantidad_por_producto(), top_n)
         return resultado
+    
+    @_memoizar
+    def _cantidad_por_producto(self):
+        """Cantidad vendida por producto, por nombre (base cacheada para cualquier top_n)."""
+        estado = self._estado
+        if estado.agregados is not None:
+            return estado.agregados.cantidad_producto
+        return estado.pasada()['producto']
+    
+    @instrumentar(entrada=_filas_df)
+    @_memoizar
+    def top(self, metrica='cantidad', k=10, dimension='nombre_producto', por=None, filtro=None):
+        """
+        Los k valores de `dimension` con mayor suma de `metrica` ('cantidad' o 'importe').
+        Con `por`, los k de cada grupo (ej. top 10 productos por categoría o top clientes
+        por ciudad) en una sola pasada vectorizada. Empates: por orden de `dimension`.
+        Retorna un DataFrame [por,] dimension, metrica ordenado por grupo y métrica.
+        """
+        if metrica not in METRICAS_TOP:
+            raise ValueError(f"Métrica desconocida: {metrica} (opciones: {', '.join(METRICAS_TOP)})")
+        for columna in (dimension, por):
+            if columna is not None and columna not in DIMENSIONES_TOP:
+                raise ValueError(f"Dimensión desconocida: {columna} (opciones: {', '.join(DIMENSIONES_TOP)})")
+        if filtro is not None:
+            return self.filtrar(filtro).top(metrica, k, dimension, por)
+        estado = self._estado
+        if por is None:
+            return top_k(estado.sumar_por(dimension, metrica), k).reset_index()
+        
+        # Suma por (grupo, valor) sobre los códigos ya factorizados, solo de los pares presentes
+        codigos_dim, valores_dim = estado.factorizar(dimension)
+        codigos_por, valores_por = estado.factorizar(por)
+        validos = (codigos_dim >= 0) & (codigos_por >= 0)
+        pares, celdas = pd.factorize(codigos_por[validos] * len(valores_dim) + codigos_dim[validos], sort=True)
+        datos = estado.df[metrica].to_numpy(dtype='float64', na_value=0)[validos]
+        sumas = np.bincount(pares, weights=datos, minlength=len(celdas))
+        
+        seleccion = _posiciones_top(sumas, k, celdas // len(valores_dim))
+        celdas = celdas[seleccion]
+        return pd.DataFrame({
+            por: valores_por.take(celdas // len(valores_dim)),
+            dimension: valores_dim.take(celdas % len(valores_dim)),
+            metrica: sumas[seleccion].astype(tipo_suma(estado.df[metrica].dtype))
+        })
+    
+    @instrumentar(entrada=_filas_df)
+    def calcular_metricas(self, metricas=None, percentil=90, top_n=10, desde=None, hasta=None, filtro=None):
+        """
+        Calcula en lote las métricas del dashboard (todas o las indicadas en `metricas`).
+        Sin rango de fechas todas leen las sumas de pasada(), que se calcula una vez;
+        con desde/hasta las que admiten rango se responden desde el cubo y el resto
+        (segmentación y top de productos) sobre las filas del rango.
+        Un filtro (src.indices.Filtro) se aplica a todas; sus fechas reemplazan a desde/hasta.
+        Retorna un dict {nombre_metrica: resultado}.
+        """
+        if filtro is None and (desde is not None or hasta is not None):
+            filtro = Filtro(desde=desde, hasta=hasta)
+        if filtro is not None and not filtro.solo_fechas():
+            return self.filtrar(filtro).calcular_metricas(metricas, percentil, top_n)
+        if filtro is not None:
+            desde, hasta = filtro.desde, filtro.hasta
+        metricas = self.METRICAS if metricas is None else metricas
+        calculos = {
+            'ventas_por_ciudad': lambda: self.ventas_por_ciudad(desde, hasta),
+            'ranking_categorias': lambda: self.ranking_categorias(desde, hasta),
+            'segmentacion_clientes': lambda: self.segmentacion_clientes(percentil, filtro),
+            'medios_de_pago': lambda: self.medios_de_pago(desde, hasta),
+            'tendencia_precios': lambda: self.tendencia_precios(desde, hasta),
+            'top_productos_cantidad': lambda: self.top_productos_cantidad(top_n, filtro)
+        }
+        return {nombre: calculos[nombre]() for nombre in metricas}
+
+
+# Motores de análisis seleccionables al construir el analizador
+MOTORES = ('pandas', 'sql')
+
+
+def crear_analizador(loader, motor='pandas', ruta_db=':memory:', **opciones):
+    """
+    Analizador sobre las tablas normalizadas del loader.
+    - 'pandas': AnalizadorVentas sobre la tabla maestra en memoria.
+    - 'sql': AnalizadorSQL (src.analizador_sql) en SQLite, sin materializar la tabla maestra.
+    """
+    if motor == 'pandas':
+        return AnalizadorVentas(loader.obtener_tabla_maestra(), **opciones)
+    if motor == 'sql':
+        from src.analizador_sql import AnalizadorSQL
+        return AnalizadorSQL.desde_loader(loader, ruta_db, **opciones)
+    raise ValueError(f"Motor desconocido: {motor} (opciones: {', '.join(MOTORES)})")
@@ -0,0 +1,367 @@
+"""
+Motor SQL embebido para los análisis de negocio.
+Las 4 tablas normalizadas viven en una base SQLite (en memoria o en disco) y
+cada análisis es una consulta de agregación con los joins resueltos por el
+motor: no hace falta materializar la tabla maestra en memoria de pandas.
+Devuelve los mismos DataFrames/Series que AnalizadorVentas.
+"""
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from src.analizador import (
+    DIMENSIONES_TOP, METRICAS_TOP, AnalizadorVentas, _memoizar, _pivotar_tendencia, _suavizar
+)
+from src.indices import DIMENSIONES, Filtro
+from src.instrumentacion import instrumentar
+
+# Índices sobre las claves de unión y de filtro
+INDICES = {
+    'detalle_ventas': ['id_venta', 'id_producto'],
+    'ventas': ['id_venta', 'id_cliente', 'fecha'],
+    'clientes': ['id_cliente'],
+    'productos': ['id_producto']
+}
+
+# Claves únicas de cada dimensión: con índice UNIQUE el motor omite los joins que
+# una consulta no usa (ej. productos en ventas_por_ciudad)
+CLAVES = {'ventas': 'id_venta', 'clientes': 'id_cliente', 'productos': 'id_producto'}
+
+# Tabla de dimensión de cada columna filtrable (alias en la consulta base)
+ALIAS_DIMENSION = {
+    'ciudad': 'c',
+    'categoria': 'p',
+    'medio_pago': 'v',
+    'id_cliente': 'v'
+}
+
+# Equivalente SQL de la tabla maestra (detalle unido con ventas, clientes y productos)
+CONSULTA_BASE = """
+WITH m AS (
+    SELECT d.rowid AS fila, d.id_venta, d.cantidad, d.precio_unitario, d.importe,
+           v.fecha, v.id_cliente, v.medio_pago, c.ciudad, p.nombre_producto, p.categoria
+    FROM detalle_ventas d
+    LEFT JOIN ventas v ON v.id_venta = d.id_venta
+    LEFT JOIN clientes c ON c.id_cliente = v.id_cliente
+    LEFT JOIN productos p ON p.id_producto = d.id_producto
+    {donde}
+)"""
+
+# Tabla a nivel venta (una fila por id_venta) sobre la base anterior
+CONSULTA_VENTAS = """,
+pv AS (
+    SELECT id_venta, id_cliente, medio_pago, ciudad, SUM(importe) AS importe_total_venta
+    FROM m
+    WHERE id_venta IS NOT NULL
+    GROUP BY id_venta, id_cliente, medio_pago, ciudad
+)"""
+
+FORMATO_FECHA = '%Y-%m-%d %H:%M:%S'
+
+
+class AnalizadorSQL:
+    """
+    Misma interfaz que AnalizadorVentas, resuelta con SQLite.
+    Uso:
+        AnalizadorSQL.desde_loader(loader)        # copia las tablas normalizadas
+        AnalizadorSQL('data/raw/aurelion.db')     # trabaja sobre una base existente
+    En disco, los datos no necesitan entrar en memoria: solo los resultados.
+    """
+
+    METRICAS = AnalizadorVentas.METRICAS
+
+    def __init__(self, ruta_db=':memory:', tamano_cache=64):
+        self.ruta_db = ruta_db
+        # Una conexión compartida entre hilos (Streamlit), serializada con un lock
+        self._conexion = sqlite3.connect(ruta_db, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        self._cache = OrderedDict()
+        self._lock_cache = threading.Lock()
+        self.tamano_cache = tamano_cache
+        self.version = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self._crear_indices()
+
+    @classmethod
+    def desde_loader(cls, loader, ruta_db=':memory:', tamano_cache=64):
+        """Crea el analizador copiando las tablas normalizadas del loader a la base."""
+        analizador = cls(ruta_db, tamano_cache)
+        analizador.cargar_tablas({
+            nombre: getattr(loader, atributo) for nombre, atributo in loader.TABLAS.items()
+        })
+        return analizador
+
+    def cargar_tablas(self, tablas):
+        """Reemplaza las tablas de la base ({nombre: DataFrame}) y vuelve a indexar."""
+        with self._lock:
+            for nombre, df in tablas.items():
+                df.to_sql(nombre, self._conexion, if_exists='replace', index=False)
+        self._crear_indices()
+        self.invalidar_cache()
+
+    def _crear_indices(self):
+        with self._lock:
+            existentes = {fila[0] for fila in self._conexion.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            )}
+            for tabla, columnas in INDICES.items():
+                if tabla not in existentes:
+                    continue
+                for columna in columnas:
+                    unico = 'UNIQUE ' if CLAVES.get(tabla) == columna else ''
+                    self._conexion.execute(
+                        f'CREATE {unico}INDEX IF NOT EXISTS "idx_{tabla}_{columna}" ON "{tabla}" ("{columna}")'
+                    )
+            self._conexion.commit()
+
+    def invalidar_cache(self):
+        """Descarta resultados cacheados (llamar si cambian las tablas de la base)."""
+        with self._lock_cache:
+            self.version += 1
+            self._cache.clear()
+
+    def estadisticas_cache(self):
+        """Aciertos, fallos y ocupación de la caché de resultados."""
+        return {
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'entradas': len(self._cache),
+            'tamano_maximo': self.tamano_cache
+        }
+
+    def _consultar(self, sql, parametros=()):
+        with self._lock:
+            return pd.read_sql_query(sql, self._conexion, params=parametros)
+
+    @staticmethod
+    def _donde(desde=None, hasta=None, filtro=None):
+        """Cláusula WHERE y parámetros para un filtro (las fechas del filtro mandan)."""
+        if filtro is not None:
+            desde, hasta = filtro.desde, filtro.hasta
+        condiciones, parametros = [], []
+        if filtro is not None:
+            for dimension in DIMENSIONES:
+                valores = getattr(filtro, dimension)
+                if valores:
+                    marcas = ', '.join('?' * len(valores))
+                    condiciones.append(f'{ALIAS_DIMENSION[dimension]}.{dimension} IN ({marcas})')
+                    parametros.extend(v.item() if hasattr(v, 'item') else v for v in valores)
+        if desde is not None:
+            condiciones.append('v.fecha >= ?')
+            parametros.append(pd.Timestamp(desde).strftime(FORMATO_FECHA))
+        if hasta is not None:
+            # Día de `hasta` inclusive
+            condiciones.append('v.fecha < ?')
+            parametros.append((pd.Timestamp(hasta) + pd.Timedelta(days=1)).strftime(FORMATO_FECHA))
+        donde = 'WHERE ' + ' AND '.join(condiciones) if condiciones else ''
+        return donde, parametros
+
+    def _base(self, desde=None, hasta=None, filtro=None, por_venta=False):
+        donde, parametros = self._donde(desde, hasta, filtro)
+        sql = CONSULTA_BASE.format(donde=donde)
+        if por_venta:
+            sql += CONSULTA_VENTAS
+        return sql, parametros
+
+    def valores(self, dimension):
+        """Valores distintos (ordenados) de una dimensión filtrable."""
+        tabla = {'c': 'clientes', 'p': 'productos', 'v': 'ventas'}[ALIAS_DIMENSION[dimension]]
+        df = self._consultar(
+            f'SELECT DISTINCT "{dimension}" FROM "{tabla}" WHERE "{dimension}" IS NOT NULL ORDER BY 1'
+        )
+        return df[dimension].tolist()
+
+    @_memoizar
+    def rango_fechas(self):
+        """Primer y último día con ventas."""
+        sql, parametros = self._base()
+        df = self._consultar(sql + ' SELECT MIN(fecha) AS desde, MAX(fecha) AS hasta FROM m', parametros)
+        return tuple(pd.Timestamp(df.at[0, columna]).floor('D') for columna in ('desde', 'hasta'))
+
+    @instrumentar()
+    @_memoizar
+    def ventas_por_ciudad(self, desde=None, hasta=None, filtro=None):
+        """Análisis 1: Ventas totales por ciudad."""
+        sql, parametros = self._base(desde, hasta, filtro)
+        df = self._consultar(sql + """
+            SELECT ciudad, COALESCE(SUM(importe), 0) AS importe
+            FROM m WHERE ciudad IS NOT NULL
+            GROUP BY ciudad ORDER BY importe DESC""", parametros)
+        return df.set_index('ciudad')['importe']
+
+    @instrumentar()
+    @_memoizar
+    def ranking_categorias(self, desde=None, hasta=None, filtro=None):
+        """Análisis 2: Ranking de categorías por importe y cantidad."""
+        sql, parametros = self._base(desde, hasta, filtro)
+        df = self._consultar(sql + """
+            SELECT categoria, COALESCE(SUM(importe), 0) AS importe, COALESCE(SUM(cantidad), 0) AS cantidad
+            FROM m WHERE categoria IS NOT NULL
+            GROUP BY categoria""", parametros).set_index('categoria')
+        return {
+            'por_importe': df['importe'].sort_values(ascending=False),
+            'por_cantidad': df['cantidad'].sort_values(ascending=False)
+        }
+
+    @instrumentar()
+    @_memoizar
+    def ticket_promedio_por_ciudad(self, desde=None, hasta=None, filtro=None):
+        """Ticket promedio (importe medio por venta) de cada ciudad."""
+        sql, parametros = self._base(desde, hasta, filtro, por_venta=True)
+        df = self._consultar(sql + """
+            SELECT ciudad, AVG(importe_total_venta) AS importe_total_venta
+            FROM pv WHERE ciudad IS NOT NULL
+            GROUP BY ciudad ORDER BY importe_total_venta DESC""", parametros)
+        return df.set_index('ciudad')['importe_total_venta']
+
+    @_memoizar
+    def _metricas_clientes(self, filtro=None):
+        """Gasto, transacciones y AOV por cliente."""
+        sql, parametros = self._base(filtro=filtro, por_venta=True)
+        metricas = self._consultar(sql + """
+            SELECT id_cliente, SUM(importe_total_venta) AS total_gasto,
+                   COUNT(DISTINCT id_venta) AS total_transacciones
+            FROM pv WHERE id_cliente IS NOT NULL
+            GROUP BY id_cliente ORDER BY id_cliente""", parametros)
+        metricas['aov'] = metricas['total_gasto'] / metricas['total_transacciones']
+        return metricas
+
+    @instrumentar()
+    def segmentacion_clientes(self, percentil=90, filtro=None, ordenar=True):
+        """Análisis 3: Segmentación de clientes por valor promedio (AOV)."""
+        metricas = self._metricas_clientes(filtro)
+        metricas['es_vip'] = metricas['aov'] >= self.umbral_vip(percentil, filtro)
+        return metricas.sort_values('aov', ascending=False) if ordenar else metricas
+
+    def umbral_vip(self, percentil=90, filtro=None):
+        """AOV mínimo para ser VIP: cuantil exacto (ver AnalizadorVentas.umbral_vip)."""
+        return self._metricas_clientes(filtro)['aov'].quantile(percentil / 100)
+
+    @instrumentar()
+    @_memoizar
+    def productos_por_cliente(self, max_productos=3, ids_cliente=None, filtro=None):
+        """
+        Primeros `max_productos` productos distintos de cada cliente (en orden de compra),
+        separados por coma y con '...' si compró más.
+        """
+        sql, parametros = self._base(filtro=filtro)
+        clientes = ''
+        if ids_cliente is not None:
+            ids = [i.item() if hasattr(i, 'item') else i for i in ids_cliente]
+            clientes = f"AND id_cliente IN ({', '.join('?' * len(ids))})"
+            parametros = parametros + ids
+        df = self._consultar(sql + f""",
+            distintos AS (
+                SELECT id_cliente, nombre_producto, MIN(fila) AS orden
+                FROM m WHERE id_cliente IS NOT NULL AND nombre_producto IS NOT NULL {clientes}
+                GROUP BY id_cliente, nombre_producto
+            ),
+            posiciones AS (
+                SELECT id_cliente, nombre_producto,
+                       ROW_NUMBER() OVER (PARTITION BY id_cliente ORDER BY orden) AS posicion,
+                       COUNT(*) OVER (PARTITION BY id_cliente) AS total
+                FROM distintos
+            )
+            SELECT id_cliente, nombre_producto, total FROM posiciones
+            WHERE posicion <= ? ORDER BY id_cliente, posicion""", parametros + [max_productos])
+
+        agrupado = df.groupby('id_cliente', sort=True)
+        texto = agrupado['nombre_producto'].agg(', '.join)
+        texto = texto.where(agrupado['total'].first() <= max_productos, texto + '...')
+        return pd.DataFrame({'id_cliente': texto.index, 'productos_comprados': texto.to_numpy()})
+
+    @instrumentar()
+    @_memoizar
+    def medios_de_pago(self, desde=None, hasta=None, filtro=None):
+        """Análisis 4: Distribución de transacciones por medio de pago."""
+        sql, parametros = self._base(desde, hasta, filtro, por_venta=True)
+        df = self._consultar(sql + """
+            SELECT medio_pago, SUM(importe_total_venta) AS total_importe,
+                   COUNT(id_venta) AS num_transacciones
+            FROM pv WHERE medio_pago IS NOT NULL
+            GROUP BY medio_pago ORDER BY total_importe DESC""", parametros)
+        return df.set_index('medio_pago')
+
+    @instrumentar()
+    @_memoizar
+    def tendencia_precios(self, desde=None, hasta=None, filtro=None, ponderado=False, ventana=None):
+        """
+        Análisis 5: Evolución de precios promedio por categoría y mes
+        (ponderado=True: Σimporte / Σcantidad; ventana: media móvil de n meses).
+        """
+        if ventana is not None and ventana > 1:
+            return _suavizar(self.tendencia_precios(desde, hasta, filtro, ponderado), ventana)
+        sql, parametros = self._base(desde, hasta, filtro)
+        precio = (
+            "SUM(importe) * 1.0 / NULLIF(SUM(cantidad), 0)" if ponderado else "AVG(precio_unitario)"
+        )
+        return self._consultar(sql + f"""
+            SELECT strftime('%Y-%m', fecha) AS mes, categoria, {precio} AS precio_unitario
+            FROM m WHERE fecha IS NOT NULL AND categoria IS NOT NULL
+            GROUP BY mes, categoria ORDER BY mes, categoria""", parametros)
+
+    def tendencia_por_categoria(self, desde=None, hasta=None, filtro=None, ponderado=False, ventana=None):
+        """tendencia_precios pivoteada: una fila por mes y una columna por categoría."""
+        return _pivotar_tendencia(self.tendencia_precios(desde, hasta, filtro, ponderado, ventana))
+
+    @instrumentar()
+    @_memoizar
+    def top_productos_cantidad(self, top_n=10, filtro=None):
+        """Análisis adicional: Top N productos por cantidad vendida."""
+        sql, parametros = self._base(filtro=filtro)
+        df = self._consultar(sql + """
+            SELECT nombre_producto, SUM(cantidad) AS cantidad
+            FROM m WHERE nombre_producto IS NOT NULL
+            GROUP BY nombre_producto ORDER BY cantidad DESC, nombre_producto LIMIT ?""",
+            parametros + [max(top_n, 0)])
+        return df.set_index('nombre_producto')['cantidad']
+
+    @instrumentar()
+    @_memoizar
+    def top(self, metrica='cantidad', k=10, dimension='nombre_producto', por=None, filtro=None):
+        """Top k de `dimension` por suma de `metrica`, opcionalmente dentro de cada grupo `por`."""
+        if metrica not in METRICAS_TOP:
+            raise ValueError(f"Métrica desconocida: {metrica} (opciones: {', '.join(METRICAS_TOP)})")
+        for columna in (dimension, por):
+            if columna is not None and columna not in DIMENSIONES_TOP:
+                raise ValueError(f"Dimensión desconocida: {columna} (opciones: {', '.join(DIMENSIONES_TOP)})")
+        sql, parametros = self._base(filtro=filtro)
+        # Los nombres de columna salen de las listas permitidas de arriba
+        grupo = '' if por is None else f'{por}, '
+        particion = '' if por is None else f'PARTITION BY {por} '
+        no_nulos = f'{dimension} IS NOT NULL' + ('' if por is None else f' AND {por} IS NOT NULL')
+        return self._consultar(sql + f"""
+            , t AS (
+                SELECT {grupo}{dimension}, COALESCE(SUM({metrica}), 0) AS {metrica}
+                FROM m WHERE {no_nulos}
+                GROUP BY {grupo}{dimension}
+            )
+            SELECT {grupo}{dimension}, {metrica} FROM (
+                SELECT *, ROW_NUMBER() OVER ({particion}ORDER BY {metrica} DESC, {dimension}) AS puesto
+                FROM t
+            ) WHERE puesto <= ? ORDER BY {grupo}puesto""", parametros + [k])
+
+    @instrumentar()
+    def calcular_metricas(self, metricas=None, percentil=90, top_n=10, desde=None, hasta=None, filtro=None):
+        """
+        Calcula en lote las métricas del dashboard (una consulta por métrica).
+        Mismo contrato que AnalizadorVentas.calcular_metricas.
+        """
+        if filtro is None and (desde is not None or hasta is not None):
+            filtro = Filtro(desde=desde, hasta=hasta)
+        # Las fechas del filtro reemplazan a desde/hasta y se aplican a todas las métricas
+        desde = hasta = None
+        metricas = self.METRICAS if metricas is None else metricas
+        calculos = {
+            'ventas_por_ciudad': lambda: self.ventas_por_ciudad(desde, hasta, filtro),
+            'ranking_categorias': lambda: self.ranking_categorias(desde, hasta, filtro),
+            'segmentacion_clientes': lambda: self.segmentacion_clientes(percentil, filtro),
+            'medios_de_pago': lambda: self.medios_de_pago(desde, hasta, filtro),
+            'tendencia_precios': lambda: self.tendencia_precios(desde, hasta, filtro),
+            'top_productos_cantidad': lambda: self.top_productos_cantidad(top_n, filtro)
+        }
+        return {nombre: calculos[nombre]() for nombre in metricas}
@@ -0,0 +1,96 @@
+"""
+Caché columnar en disco para las tablas de origen.
+Cada hoja Excel se convierte una sola vez a Feather y se reutiliza mientras
+el archivo fuente no cambie (mtime, tamaño y hash de contenido).
+"""
+import hashlib
+import json
+import os
+
+try:
+    from pyarrow import feather
+    PYARROW_DISPONIBLE = True
+except ImportError:
+    PYARROW_DISPONIBLE = False
+
+# Incrementar si cambia la forma de leer o guardar las tablas
+VERSION_CACHE = 1
+
+
+class CacheColumnar:
+    """Guarda y recupera DataFrames en Feather según la huella del archivo fuente."""
+
+    def __init__(self, cache_dir='data/cache/'):
+        self.cache_dir = cache_dir
+
+    def _rutas(self, nombre):
+        """Rutas del archivo de datos y de su metadato."""
+        base = os.path.join(self.cache_dir, nombre)
+        return base + '.feather', base + '.json'
+
+    @staticmethod
+    def calcular_hash(ruta, bloque=1 << 20):
+        """Hash SHA-256 del contenido del archivo (leído por bloques)."""
+        h = hashlib.sha256()
+        with open(ruta, 'rb') as f:
+            for parte in iter(lambda: f.read(bloque), b''):
+                h.update(parte)
+        return h.hexdigest()
+
+    def huella(self, ruta):
+        """Huella completa del archivo fuente: mtime, tamaño y hash."""
+        stat = os.stat(ruta)
+        return {
+            'version': VERSION_CACHE,
+            'mtime_ns': stat.st_mtime_ns,
+            'tamano': stat.st_size,
+            'sha256': self.calcular_hash(ruta)
+        }
+
+    def leer(self, nombre, ruta_fuente):
+        """
+        Retorna la tabla cacheada si sigue vigente, o None si hay que releer la fuente.
+        Si solo cambió el mtime pero el contenido es idéntico, se reutiliza la caché.
+        """
+        ruta_datos, ruta_meta = self._rutas(nombre)
+        stat = os.stat(ruta_fuente)
+        if not (os.path.exists(ruta_datos) and os.path.exists(ruta_meta)):
+            return None
+
+        with open(ruta_meta, encoding='utf-8') as f:
+            meta = json.load(f)
+
+        if meta.get('version') != VERSION_CACHE or meta.get('tamano') != stat.st_size:
+            return None
+
+        if meta.get('mtime_ns') != stat.st_mtime_ns:
+            # Archivo tocado: validar por contenido antes de descartar
+            if meta.get('sha256') != self.calcular_hash(ruta_fuente):
+                return None
+            meta['mtime_ns'] = stat.st_mtime_ns
+            self._escribir_meta(ruta_meta, meta)
+
+        return feather.read_table(ruta_datos, memory_map=True).to_pandas()
+
+    def guardar(self, nombre, huella, df):
+        """Escribe la tabla en caché junto con la huella de la fuente."""
+        ruta_datos, ruta_meta = self._rutas(nombre)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        try:
+            temporal = ruta_datos + '.tmp'
+            df.reset_index(drop=True).to_feather(temporal, compression='uncompressed')
+            os.replace(temporal, ruta_datos)
+        except Exception as e:
+            print(f"⚠️ No se pudo cachear '{nombre}': {e}")
+            return False
+
+        self._escribir_meta(ruta_meta, huella)
+        return True
+
+    @staticmethod
+    def _escribir_meta(ruta_meta, meta):
+        temporal = ruta_meta + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(temporal, ruta_meta)
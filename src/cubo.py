@@ -0,0 +1,134 @@
+"""
+Cubo de agregados materializado por día × ciudad × categoría × medio de pago.
+Permite responder los análisis para cualquier rango de fechas sumando celdas
+del cubo, sin volver a recorrer la tabla maestra.
+"""
+import pandas as pd
+from src.esquema import concatenar, montos_para_sumar
+
+
+def _celdas_lineas(df_master):
+    """Celdas día × ciudad × categoría × medio de pago de un conjunto de líneas."""
+    # Montos en float64: un total float32 pierde los centavos pasados ~16,7 millones
+    df_master = montos_para_sumar(df_master)
+    dia = df_master['fecha'].dt.floor('D')
+    return df_master.groupby(
+        [dia, 'ciudad', 'categoria', 'medio_pago'], observed=True, dropna=False
+    ).agg(
+        importe=('importe', 'sum'),
+        cantidad=('cantidad', 'sum'),
+        lineas=('importe', 'size'),
+        precio_suma=('precio_unitario', 'sum'),
+        precio_n=('precio_unitario', 'count')
+    ).reset_index().sort_values('fecha', kind='stable', ignore_index=True)
+
+
+def _celdas_ventas(tabla_ventas, ventas_nuevas=None):
+    """
+    Celdas día × ciudad × medio de pago de una tabla a nivel venta. ventas_nuevas
+    indica cuántas transacciones cuenta cada fila (todas 1 si no se indica; 0 para
+    líneas agregadas a una venta que ya estaba en el cubo).
+    """
+    tabla = tabla_ventas.assign(ventas=1 if ventas_nuevas is None else ventas_nuevas)
+    dia = tabla['fecha'].dt.floor('D')
+    return tabla.groupby(
+        [dia, 'ciudad', 'medio_pago'], observed=True, dropna=False
+    ).agg(
+        importe_total=('importe_total_venta', 'sum'),
+        ventas=('ventas', 'sum')
+    ).reset_index().sort_values('fecha', kind='stable', ignore_index=True)
+
+
+def _fusionar(tabla, parcial, claves):
+    """
+    Suma las celdas de un parcial a una tabla ordenada por fecha: solo se reagrupan
+    las celdas desde el primer día del parcial (con datos nuevos, los últimos días).
+    """
+    if len(parcial) == 0:
+        return tabla
+    corte = tabla['fecha'].to_numpy().searchsorted(parcial['fecha'].min().to_datetime64(), 'left')
+    cola = concatenar(tabla.iloc[corte:], parcial).groupby(
+        claves, observed=True, dropna=False, sort=False
+    ).sum().reset_index().sort_values('fecha', kind='stable')
+    return concatenar(tabla.iloc[:corte], cola)
+
+
+class CuboVentas:
+    """
+    Dos tablas ordenadas por fecha:
+    - lineas: día × ciudad × categoría × medio_pago → importe, cantidad, lineas,
+      precio_suma y precio_n (precios no nulos, divisor del promedio).
+    - ventas: día × ciudad × medio_pago → importe_total y ventas. Cada venta cae en
+      una sola celda, así que los conteos de transacciones sí se pueden sumar.
+    """
+
+    def __init__(self, df_master, tabla_ventas):
+        self.lineas = _celdas_lineas(df_master)
+        self.ventas = _celdas_ventas(tabla_ventas)
+
+    def agregar(self, df_nuevas, ventas_parcial, ventas_nuevas):
+        """
+        Suma líneas nuevas al cubo sin recorrer las anteriores. ventas_parcial es la
+        tabla a nivel venta de esas líneas y ventas_nuevas marca (1/0) las ventas que
+        no estaban, para no contar dos veces una transacción que sumó líneas.
+        Usar sobre una copia (copy.copy): las tablas de celdas se reasignan.
+        """
+        self.lineas = _fusionar(self.lineas, _celdas_lineas(df_nuevas), ['fecha', 'ciudad', 'categoria', 'medio_pago'])
+        self.ventas = _fusionar(self.ventas, _celdas_ventas(ventas_parcial, ventas_nuevas), ['fecha', 'ciudad', 'medio_pago'])
+        return self
+
+    @staticmethod
+    def _rango(tabla, desde=None, hasta=None):
+        """Celdas con fecha en [desde, hasta] (ambos inclusive) por búsqueda binaria."""
+        fechas = tabla['fecha'].to_numpy()
+        inicio = 0 if desde is None else fechas.searchsorted(pd.Timestamp(desde).to_datetime64(), 'left')
+        fin = len(tabla) if hasta is None else fechas.searchsorted(
+            (pd.Timestamp(hasta) + pd.Timedelta(days=1)).to_datetime64(), 'left'
+        )
+        return tabla.iloc[inicio:fin]
+
+    def rango_fechas(self):
+        """Primer y último día con ventas."""
+        return self.lineas['fecha'].min(), self.lineas['fecha'].max()
+
+    def ventas_por_ciudad(self, desde=None, hasta=None):
+        """Análisis 1 sobre el rango: importe total por ciudad."""
+        celdas = self._rango(self.lineas, desde, hasta)
+        return celdas.groupby('ciudad', observed=True)['importe'].sum().sort_values(ascending=False)
+
+    def ranking_categorias(self, desde=None, hasta=None):
+        """Análisis 2 sobre el rango: importe y cantidad por categoría."""
+        celdas = self._rango(self.lineas, desde, hasta)
+        por_categoria = celdas.groupby('categoria', observed=True)[['importe', 'cantidad']].sum()
+        return {
+            'por_importe': por_categoria['importe'].sort_values(ascending=False),
+            'por_cantidad': por_categoria['cantidad'].sort_values(ascending=False)
+        }
+
+    def ticket_promedio_por_ciudad(self, desde=None, hasta=None):
+        """Importe medio por venta de cada ciudad en el rango."""
+        celdas = self._rango(self.ventas, desde, hasta)
+        sumas = celdas.groupby('ciudad', observed=True)[['importe_total', 'ventas']].sum()
+        resultado = (sumas['importe_total'] / sumas['ventas']).rename('importe_total_venta')
+        return resultado.sort_values(ascending=False)
+
+    def medios_de_pago(self, desde=None, hasta=None):
+        """Análisis 4 sobre el rango: importe y transacciones por medio de pago."""
+        celdas = self._rango(self.ventas, desde, hasta)
+        return celdas.groupby('medio_pago', observed=True).agg(
+            total_importe=('importe_total', 'sum'),
+            num_transacciones=('ventas', 'sum')
+        ).sort_values('total_importe', ascending=False)
+
+    def tendencia_precios(self, desde=None, hasta=None, ponderado=False):
+        """
+        Análisis 5 sobre el rango: precio unitario promedio por mes y categoría
+        (ponderado=True: Σimporte / Σcantidad).
+        """
+        celdas = self._rango(self.lineas, desde, hasta)
+        mes = celdas['fecha'].dt.to_period('M').rename('mes')
+        numerador, denominador = ('importe', 'cantidad') if ponderado else ('precio_suma', 'precio_n')
+        sumas = celdas.groupby([mes, 'categoria'], observed=True)[[numerador, denominador]].sum()
+        resultado = (sumas[numerador] / sumas[denominador]).rename('precio_unitario').reset_index()
+        resultado['mes'] = resultado['mes'].astype(str)
+        return resultado
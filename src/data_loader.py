@@ -2,27 +2,166 @@
 Módulo de carga y normalización de datos.
 Principios: KISS (Keep It Simple) y DRY (Don't Repeat Yourself)
 """
+import hashlib
 import pandas as pd
 import os
+from concurrent.futures import ProcessPoolExecutor
+from src.cache_columnar import CacheColumnar, PYARROW_DISPONIBLE
+from src.fuentes import FuenteExcel, crear_fuente
+from src import particiones
+from src.esquema import aplicar_esquema, concatenar
+from src.instrumentacion import etapa, instrumentar
+
+
+def _tomar(columna, posiciones):
+    """Gather posicional; las posiciones -1 (id inexistente) quedan como nulos."""
+    return columna.array.take(posiciones, allow_fill=True)
+
+
+def _filas_tablas(loader, resultado=None):
+    """Total de filas de las tablas cargadas (para la instrumentación)."""
+    return sum(len(getattr(loader, a)) for a in loader.TABLAS.values() if getattr(loader, a) is not None)
+
+
+def _hash_prefijo(ruta, corte=None, bloque=1 << 20):
+    """
+    Tamaño y hash del archivo completo y hash de sus primeros `corte` bytes, en una
+    sola lectura. Retorna (tamaño, hash_total, hash_corte); hash_corte es None si el
+    archivo es más corto que `corte`. Sin archivo retorna None.
+    """
+    try:
+        archivo = open(ruta, 'rb')
+    except OSError:
+        return None
+    with archivo:
+        resumen = hashlib.blake2b(digest_size=16)
+        leidos, hash_corte = 0, None
+        while True:
+            if corte is not None and hash_corte is None and leidos == corte:
+                hash_corte = resumen.hexdigest()
+            limite = bloque if corte is None or leidos >= corte else min(bloque, corte - leidos)
+            datos = archivo.read(limite)
+            if not datos:
+                break
+            resumen.update(datos)
+            leidos += len(datos)
+        return leidos, resumen.hexdigest(), hash_corte
+
+
+def _ids_sin_match(ids, posiciones):
+    """Ids distintos (no nulos) cuya posición en la dimensión es -1."""
+    return ids[(posiciones == -1) & ids.notna().to_numpy()].unique()
 
 
 class DataLoader:
-    """Carga y normaliza los datos de ventas desde archivos Excel."""
+    """Carga y normaliza los datos de ventas desde Excel u otra fuente (ver src.fuentes)."""
+    
+    # Archivo de origen (sin extensión) → atributo donde se guarda la tabla
+    TABLAS = {
+        'clientes': 'df_clientes',
+        'productos': 'df_productos',
+        'ventas': 'df_ventas',
+        'detalle_ventas': 'df_detalle'
+    }
     
-    def __init__(self, raw_path='data/raw/'):
+    # Columnas que necesita la tabla maestra (lo demás lo descarta normalizar_datos)
+    COLUMNAS_MAESTRA = {
+        'clientes': ['id_cliente', 'ciudad'],
+        'productos': ['id_producto', 'nombre_producto', 'categoria'],
+        'ventas': ['id_venta', 'fecha', 'id_cliente', 'medio_pago'],
+        'detalle_ventas': ['id_venta', 'id_producto', 'cantidad', 'precio_unitario', 'importe']
+    }
+    # Las de la tabla maestra más las que muestra el dashboard (scripts y reportes)
+    COLUMNAS_ANALISIS = dict(COLUMNAS_MAESTRA, clientes=['id_cliente', 'nombre_cliente', 'ciudad'])
+    
+    def __init__(self, raw_path='data/raw/', cache_dir=None, compacto=False, tipo_moneda='float32',
+                 fuente=None, columnas=None):
         self.raw_path = raw_path
+        # Fuente de las tablas: objeto de src.fuentes o nombre ('excel', 'csv', 'parquet', 'sqlite')
+        if fuente is None:
+            fuente = FuenteExcel(raw_path)
+        elif isinstance(fuente, str):
+            fuente = crear_fuente(fuente, raw_path)
+        self.fuente = fuente
+        # Proyección: {tabla: [columnas]} (ej. COLUMNAS_ANALISIS); None lee todas
+        self.columnas = columnas or {}
+        # Esquema compacto (category, enteros reducidos, montos en tipo_moneda)
+        self.compacto = compacto
+        self.tipo_moneda = tipo_moneda
         self.df_clientes = None
         self.df_productos = None
         self.df_ventas = None
         self.df_detalle = None
+        self.ids_huerfanos = {}
+        self._indices = None
+        # Hasta dónde se leyeron las fuentes: {'id_venta', 'fecha', 'lineas'} (ver cargar_incremental)
+        self.marca_agua = None
+        # Archivo de cada tabla tal como se leyó: {ruta: (tamaño, hash)}
+        self._prefijos = {}
+        # Conteos de filas leídos de la fuente: {tabla: (huella del archivo, filas)}
+        self._conteos = {}
+        
+        # Caché columnar opcional (requiere pyarrow); no aplica a fuentes ya columnares
+        self.cache = None
+        if cache_dir is not None and self.fuente.cacheable:
+            if PYARROW_DISPONIBLE:
+                self.cache = CacheColumnar(cache_dir)
+            else:
+                print("⚠️ pyarrow no está instalado: se desactiva la caché columnar")
         
-    def cargar_datos(self):
-        """Carga los 4 archivos Excel desde data/raw/"""
+    def _ruta(self, nombre):
+        return self.fuente.ruta(nombre)
+    
+    def _nombre_cache(self, nombre):
+        """Con proyección la caché se guarda por tabla y conjunto de columnas."""
+        columnas = self.columnas.get(nombre)
+        return nombre if columnas is None else f"{nombre}__{'-'.join(columnas)}"
+        
+    @instrumentar(salida=_filas_tablas)
+    def cargar_datos(self, workers=1, incluir_detalle=True, tablas=None):
+        """
+        Carga las 4 tablas desde la fuente (o desde la caché si está activa).
+        Con workers > 1 las tablas que haya que parsear se leen en paralelo en un
+        pool de procesos, una tabla por proceso. El resultado es idéntico al de la
+        lectura en serie.
+        Con incluir_detalle=False solo se cargan las dimensiones (ver iterar_detalle);
+        con tablas=[...] solo las tablas indicadas.
+        """
         try:
-            self.df_clientes = pd.read_excel(os.path.join(self.raw_path, 'clientes.xlsx'))
-            self.df_productos = pd.read_excel(os.path.join(self.raw_path, 'productos.xlsx'))
-            self.df_ventas = pd.read_excel(os.path.join(self.raw_path, 'ventas.xlsx'))
-            self.df_detalle = pd.read_excel(os.path.join(self.raw_path, 'detalle_ventas.xlsx'))
+            # 0. Tamaño y hash de cada archivo antes de leerlo (ver cargar_incremental)
+            for nombre in self.TABLAS:
+                if (nombre != 'detalle_ventas' or incluir_detalle) and (tablas is None or nombre in tablas):
+                    self._recordar_prefijo(self._ruta(nombre))
+            
+            # 1. Tablas vigentes en caché
+            pendientes = []
+            with etapa('DataLoader.leer_cache'):
+                for nombre, atributo in self.TABLAS.items():
+                    if nombre == 'detalle_ventas' and not incluir_detalle:
+                        continue
+                    if tablas is not None and nombre not in tablas:
+                        continue
+                    df = self.cache.leer(self._nombre_cache(nombre), self._ruta(nombre)) if self.cache else None
+                    if df is None:
+                        pendientes.append(nombre)
+                    else:
+                        setattr(self, atributo, df)
+            
+            # 2. Leer de la fuente solo lo que falta
+            # La huella se toma antes de parsear para no cachear una versión intermedia
+            huellas = {n: self.cache.huella(self._ruta(n)) for n in pendientes} if self.cache else {}
+            with etapa('DataLoader.leer_fuente') as medicion:
+                if workers > 1 and pendientes:
+                    tablas = self._leer_paralelo(pendientes, workers)
+                else:
+                    tablas = {n: self.fuente.leer(n, self.columnas.get(n)) for n in pendientes}
+                medicion.filas_salida = sum(len(df) for df in tablas.values())
+            
+            for nombre, df in tablas.items():
+                setattr(self, self.TABLAS[nombre], df)
+                if self.cache:
+                    self.cache.guardar(self._nombre_cache(nombre), huellas[nombre], df)
+            self._indices = None
             return True
         except FileNotFoundError as e:
             print(f"❌ Error: No se encontró el archivo {e.filename}")
@@ -31,41 +170,288 @@ class DataLoader:
             print(f"❌ Error al cargar datos: {e}")
             return False
     
+    def _recordar_prefijo(self, ruta):
+        huella = _hash_prefijo(ruta)
+        if huella is not None:
+            self._prefijos[ruta] = huella[:2]
+    
+    def _prefijos_intactos(self):
+        """
+        True si lo ya leído de cada archivo sigue igual: el archivo no se achicó y sus
+        primeros bytes (hasta el tamaño leído) tienen el mismo hash. Si es así, lo
+        recuerda con su tamaño actual. Una fuente que no crece solo por el final
+        (SQLite, Parquet, Excel) siempre falla la comprobación.
+        """
+        actuales = {}
+        for ruta, (tamano, hash_leido) in self._prefijos.items():
+            huella = _hash_prefijo(ruta, tamano)
+            if huella is None or huella[2] != hash_leido:
+                return False
+            actuales[ruta] = huella[:2]
+        self._prefijos = actuales
+        return True
+    
+    def _leer_paralelo(self, nombres, workers):
+        """
+        Lee varias tablas en un pool de procesos, una por proceso. Una hoja no se
+        divide en rangos de filas: el XML de un .xlsx solo se recorre desde el
+        principio, así que cada rango volvería a parsear todas las filas previas.
+        """
+        with ProcessPoolExecutor(max_workers=min(workers, len(nombres))) as pool:
+            futuros = {n: pool.submit(self.fuente.leer, n, self.columnas.get(n)) for n in nombres}
+            return {nombre: futuro.result() for nombre, futuro in futuros.items()}
+    
+    def cargar_detalle(self):
+        """
+        Carga y normaliza solo detalle_ventas, con las dimensiones ya cargadas y
+        normalizadas (ver cargar_datos(incluir_detalle=False)).
+        """
+        if not self.cargar_datos(tablas=['detalle_ventas']):
+            return False
+        self.df_detalle = self._normalizar_detalle(self.df_detalle)
+        self._marcar()
+        return True
+    
+    def _raiz(self):
+        """Carpeta del dataset (raw_path, o la carpeta de la base si raw_path es un archivo)."""
+        return self.raw_path if os.path.isdir(self.raw_path) else os.path.dirname(self.raw_path)
+    
+    def particiones(self, desde=None, hasta=None):
+        """
+        Particiones del dataset bajo raw_path (ver src.particiones), sin las que
+        según su nombre quedan fuera de [desde, hasta].
+        """
+        return particiones.podar(particiones.descubrir(self._raiz(), self.fuente), desde, hasta)
+    
+    def particionado(self):
+        """True si raw_path es un árbol de particiones y no un único juego de tablas."""
+        encontradas = self.particiones()
+        return len(encontradas) > 1 or (
+            len(encontradas) == 1 and os.path.normpath(encontradas[0].ruta) != os.path.normpath(self._raiz())
+        )
+    
+    @instrumentar()
+    def agregar_particiones(self, desde=None, hasta=None, workers=1):
+        """
+        Análisis de un dataset particionado sin armar la tabla maestra completa:
+        cada partición en [desde, hasta] se agrega en un proceso (map) y los
+        parciales se combinan (reduce). Las particiones fuera del rango no se leen.
+        Retorna AgregadosVentas, con la misma interfaz de análisis que AnalizadorVentas.
+        """
+        opciones = {
+            'compacto': self.compacto,
+            'tipo_moneda': self.tipo_moneda,
+            'columnas': self.columnas or None
+        }
+        return particiones.agregar(
+            self.particiones(), self.fuente, self._raiz(), opciones, desde, hasta, workers
+        )
+    
+    def huella_fuentes(self):
+        """
+        Ruta, mtime y tamaño de cada archivo de origen (solo os.stat, sin leerlos).
+        Cambia cuando se modifica cualquier fuente.
+        """
+        return tuple(self._huella(nombre) for nombre in self.TABLAS)
+    
+    def _huella(self, nombre):
+        ruta = self.fuente.ruta(nombre)
+        try:
+            stat = os.stat(ruta)
+            return ruta, stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return ruta, None, None
+    
+    def contar_filas(self, nombre):
+        """
+        Filas de una tabla sin cargarla si se puede: la tabla en memoria, el conteo
+        de la fuente (ej. la dimensión declarada de la hoja Excel) o, si no, leyendo
+        solo su primera columna proyectada. El conteo de la fuente se guarda hasta
+        que cambie el archivo, así que pedirlo en cada rerun no vuelve a abrirlo.
+        """
+        df = getattr(self, self.TABLAS[nombre])
+        if df is not None:
+            return len(df)
+        huella = self._huella(nombre)
+        guardado = self._conteos.get(nombre)
+        if guardado is not None and guardado[0] == huella:
+            return guardado[1]
+        filas = self.fuente.contar_filas(nombre)
+        if filas is None:
+            columnas = self.columnas.get(nombre)
+            filas = len(self.fuente.leer(nombre, columnas[:1] if columnas else None))
+        self._conteos[nombre] = (huella, filas)
+        return filas
+    
+    @instrumentar(entrada=_filas_tablas, salida=_filas_tablas)
     def normalizar_datos(self):
         """Elimina columnas redundantes y normaliza las tablas."""
-        # Eliminar columnas redundantes en ventas
-        self.df_ventas = self.df_ventas.drop(columns=['nombre_cliente', 'email'], errors='ignore')
+        # Eliminar columnas redundantes en detalle (puede no estar cargado en modo por bloques)
+        if self.df_detalle is not None:
+            self.df_detalle = self._normalizar_detalle(self.df_detalle)
         
-        # Eliminar columnas redundantes en detalle
-        self.df_detalle = self.df_detalle.drop(columns=['nombre_producto'], errors='ignore')
+        self.df_ventas = self._normalizar_ventas(self.df_ventas)
+        # Tipos compactos: se aplican a las tablas chicas y la tabla maestra los hereda
+        if self.compacto:
+            self.df_clientes = aplicar_esquema(self.df_clientes, self.tipo_moneda)
+            self.df_productos = aplicar_esquema(self.df_productos, self.tipo_moneda)
+        self._indices = None
+        self._marcar()
+    
+    def _normalizar_ventas(self, df_ventas):
+        # Eliminar columnas redundantes y convertir fecha a datetime
+        df_ventas = df_ventas.drop(columns=['nombre_cliente', 'email'], errors='ignore')
+        df_ventas['fecha'] = pd.to_datetime(df_ventas['fecha'])
+        if self.compacto:
+            df_ventas = aplicar_esquema(df_ventas, self.tipo_moneda)
+        return df_ventas
+    
+    def _marcar(self):
+        """Marca de agua: última venta (id y fecha) y líneas de detalle ya leídas."""
+        self.marca_agua = {
+            'id_venta': self.df_ventas['id_venta'].max(),
+            'fecha': self.df_ventas['fecha'].max(),
+            'lineas': None if self.df_detalle is None else len(self.df_detalle)
+        }
         
-        # Convertir fecha a datetime
-        self.df_ventas['fecha'] = pd.to_datetime(self.df_ventas['fecha'])
+    def _normalizar_detalle(self, df_detalle):
+        df_detalle = df_detalle.drop(columns=['nombre_producto'], errors='ignore')
+        if self.compacto:
+            df_detalle = aplicar_esquema(df_detalle, self.tipo_moneda)
+        return df_detalle
         
-    def obtener_tabla_maestra(self):
+    @instrumentar(entrada=lambda loader: len(loader.df_detalle))
+    def obtener_tabla_maestra(self, validar=False):
         """
         Integra las 4 tablas en una tabla maestra para análisis.
         Retorna DataFrame con toda la información consolidada.
+        Con validar=True informa los ids sin correspondencia en su dimensión
+        (quedan en self.ids_huerfanos; en la tabla maestra aparecen como nulos).
         """
-        # 1. Merge ventas con detalle
-        df_master = self.df_detalle.merge(
-            self.df_ventas,
-            on='id_venta',
-            how='left'
-        )
+        return self._unir_dimensiones(self.df_detalle, validar=validar)
+    
+    @instrumentar()
+    def cargar_incremental(self):
+        """
+        Lee de las fuentes solo lo agregado desde la marca de agua y retorna las
+        líneas nuevas de la tabla maestra (ya unidas a sus dimensiones):
+        - ventas con id_venta o fecha posterior a la marca: el filtro se empuja a la
+          fuente (WHERE en SQLite, filters en Parquet; Excel y CSV filtran por bloque).
+        - detalle_ventas, clientes y productos: las filas agregadas al final desde la
+          última lectura, así que también entran líneas nuevas de ventas existentes.
+        Solo se lee lo nuevo si la parte de cada archivo ya leída no cambió (mismo
+        tamaño inicial y hash, ver _prefijos_intactos); si se editó una fila existente
+        retorna None y hay que recargar todo. Las tablas del loader crecen con lo nuevo
+        y la marca avanza. Sin marca (nada cargado) carga todo.
+        Retorna None si falla la lectura o la fuente cambió más allá de agregar filas.
+        """
+        marca = self.marca_agua
+        if marca is None or marca['lineas'] is None:
+            if not self.cargar_datos():
+                return None
+            self.normalizar_datos()
+            return self.obtener_tabla_maestra()
+        if not self._prefijos_intactos():
+            print("🔄 Las fuentes cambiaron más allá de agregar filas: hay que recargar todo")
+            return None
         
-        # 2. Agregar información de clientes (ciudad)
-        df_master = df_master.merge(
-            self.df_clientes[['id_cliente', 'ciudad']],
-            on='id_cliente',
-            how='left'
-        )
+        try:
+            with etapa('DataLoader.leer_nuevas') as medicion:
+                ventas = self.fuente.leer_mayores(
+                    'ventas', {'id_venta': marca['id_venta'], 'fecha': marca['fecha']}, self.columnas.get('ventas')
+                )
+                detalle = self.fuente.leer_cola('detalle_ventas', marca['lineas'], self.columnas.get('detalle_ventas'))
+                clientes = self.fuente.leer_cola('clientes', len(self.df_clientes), self.columnas.get('clientes'))
+                productos = self.fuente.leer_cola('productos', len(self.df_productos), self.columnas.get('productos'))
+                medicion.filas_salida = len(ventas) + len(detalle) + len(clientes) + len(productos)
+        except Exception as e:
+            print(f"❌ Error al leer los datos nuevos: {e}")
+            return None
         
-        # 3. Agregar información de productos (categoría)
-        df_master = df_master.merge(
-            self.df_productos[['id_producto', 'nombre_producto', 'categoria']],
-            on='id_producto',
-            how='left'
-        )
+        # Normalizar solo lo nuevo y sumarlo a las tablas (unificando categorías)
+        if len(clientes) > 0:
+            nuevos = aplicar_esquema(clientes, self.tipo_moneda) if self.compacto else clientes
+            self.df_clientes = concatenar(self.df_clientes, nuevos)
+        if len(productos) > 0:
+            nuevos = aplicar_esquema(productos, self.tipo_moneda) if self.compacto else productos
+            self.df_productos = concatenar(self.df_productos, nuevos)
+        if len(ventas) > 0:
+            self.df_ventas = concatenar(self.df_ventas, self._normalizar_ventas(ventas))
+        detalle = self._normalizar_detalle(detalle)
+        if len(detalle) > 0:
+            self.df_detalle = concatenar(self.df_detalle, detalle)
+        if len(clientes) + len(productos) + len(ventas) > 0:
+            self._indices = None
+        self._marcar()
+        
+        if len(detalle) > 0:
+            print(f"🔄 {len(detalle)} líneas nuevas ({len(ventas)} ventas posteriores a id "
+                  f"{marca['id_venta']} / {marca['fecha']:%Y-%m-%d})")
+        return self._unir_dimensiones(detalle)
+    
+    def _indices_dimensiones(self):
+        """Índices por id de cada dimensión; se construyen una vez y se reutilizan por bloque."""
+        if self._indices is None:
+            indices = {
+                'id_venta': pd.Index(self.df_ventas['id_venta']),
+                'id_cliente': pd.Index(self.df_clientes['id_cliente']),
+                'id_producto': pd.Index(self.df_productos['id_producto'])
+            }
+            for clave, indice in indices.items():
+                if not indice.is_unique:
+                    raise ValueError(f"{clave} duplicado en su tabla de dimensión")
+            self._indices = indices
+        return self._indices
+    
+    def _unir_dimensiones(self, df_detalle, validar=False):
+        """
+        Une un detalle de ventas (completo o un bloque) con ventas, clientes y productos.
+        Equivale a tres merges how='left', pero resuelve cada id a su posición en la
+        dimensión y arma todas las columnas con un único gather posicional.
+        """
+        indices = self._indices_dimensiones()
+        columnas = {c: df_detalle[c].array for c in df_detalle.columns}
+        
+        # 1. Ventas (fecha, cliente, medio de pago) por id_venta
+        pos_venta = indices['id_venta'].get_indexer(df_detalle['id_venta'])
+        for c in self.df_ventas.columns.drop('id_venta'):
+            columnas[c] = _tomar(self.df_ventas[c], pos_venta)
+        
+        # 2. Clientes (ciudad) por el id_cliente de cada venta
+        pos_cliente = indices['id_cliente'].get_indexer(columnas['id_cliente'])
+        columnas['ciudad'] = _tomar(self.df_clientes['ciudad'], pos_cliente)
         
-        return df_master
+        # 3. Productos (nombre y categoría) por id_producto
+        pos_producto = indices['id_producto'].get_indexer(df_detalle['id_producto'])
+        columnas['nombre_producto'] = _tomar(self.df_productos['nombre_producto'], pos_producto)
+        columnas['categoria'] = _tomar(self.df_productos['categoria'], pos_producto)
+        
+        if validar:
+            self.ids_huerfanos = {
+                'id_venta': _ids_sin_match(df_detalle['id_venta'], pos_venta),
+                'id_cliente': _ids_sin_match(pd.Series(columnas['id_cliente']), pos_cliente),
+                'id_producto': _ids_sin_match(df_detalle['id_producto'], pos_producto)
+            }
+            for clave, ids in self.ids_huerfanos.items():
+                if len(ids) > 0:
+                    muestra = ', '.join(str(i) for i in ids[:10]) + ('...' if len(ids) > 10 else '')
+                    print(f"⚠️ {len(ids)} {clave} sin correspondencia en su dimensión: {muestra}")
+        
+        return pd.DataFrame(columnas, index=pd.RangeIndex(len(df_detalle)))
+    
+    def iterar_detalle(self, tamano_bloque=100_000):
+        """
+        Lee detalle_ventas por bloques de tamano_bloque filas, ya normalizados, desde
+        la fuente del loader (para recorrer un CSV, crear el loader con fuente='csv').
+        """
+        for bloque in self.fuente.iterar('detalle_ventas', tamano_bloque, self.columnas.get('detalle_ventas')):
+            yield self._normalizar_detalle(bloque)
+    
+    def iterar_tabla_maestra(self, tamano_bloque=100_000):
+        """
+        Genera la tabla maestra por bloques con memoria acotada.
+        Requiere las dimensiones cargadas y normalizadas (cargar_datos(incluir_detalle=False)).
+        Uso: AgregadosVentas.desde_bloques(loader.iterar_tabla_maestra())
+        """
+        for bloque in self.iterar_detalle(tamano_bloque):
+            yield self._unir_dimensiones(bloque)
@@ -0,0 +1,81 @@
+"""
+Esquema de tipos compacto para las tablas de ventas.
+Textos repetidos como category, ids y cantidades en el entero más chico posible
+y montos en un dtype configurable.
+"""
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Columna → tipo lógico
+ESQUEMA = {
+    'id_venta': 'entero',
+    'id_cliente': 'entero',
+    'id_producto': 'entero',
+    'cantidad': 'entero',
+    'importe': 'moneda',
+    'precio_unitario': 'moneda',
+    'ciudad': 'categoria',
+    'categoria': 'categoria',
+    'medio_pago': 'categoria',
+    'nombre_producto': 'categoria'
+}
+
+
+def aplicar_esquema(df, tipo_moneda='float32'):
+    """
+    Retorna una copia de df con los tipos del ESQUEMA (solo columnas presentes).
+    Los enteros con nulos (ids huérfanos) se dejan como están.
+    Nota: float32 guarda ~7 dígitos por valor; las sumas se acumulan y devuelven
+    en float64 (ver tipo_suma), porque un total float32 mayor a ~16,7 millones
+    ya no representa los centavos.
+    """
+    resultado = df.copy()
+    for columna in df.columns:
+        tipo = ESQUEMA.get(columna)
+        serie = df[columna]
+        if tipo == 'categoria':
+            resultado[columna] = serie.astype('category')
+        elif tipo == 'entero' and serie.notna().all():
+            resultado[columna] = pd.to_numeric(serie, downcast='integer')
+        elif tipo == 'moneda':
+            resultado[columna] = serie.astype(tipo_moneda)
+    return resultado
+
+
+def tipo_suma(dtype):
+    """dtype de las sumas de una columna: int64 para enteros y float64 para montos."""
+    return 'int64' if dtype.kind in 'iu' else 'float64'
+
+
+def montos_para_sumar(df):
+    """df con las columnas de moneda en float64 (para agregar con groupby sin perder centavos)."""
+    return df.astype({c: 'float64' for c in df.columns if ESQUEMA.get(c) == 'moneda'})
+
+
+def concatenar(df, nuevas, ignore_index=True):
+    """
+    Concatena filas nuevas unificando categorías para no perder los dtypes category.
+    Las categorías quedan ordenadas, como si se hubiera aplicado el esquema a todo junto.
+    """
+    return concatenar_todos([df, nuevas], ignore_index)
+
+
+def concatenar_todos(partes, ignore_index=True):
+    """concatenar para varias partes a la vez: un solo pd.concat."""
+    partes = list(partes)
+    for columna in partes[0].columns:
+        if all(isinstance(p[columna].dtype, pd.CategoricalDtype) for p in partes):
+            categorias = union_categoricals([p[columna] for p in partes], sort_categories=True).categories
+            partes = [p.assign(**{columna: p[columna].cat.set_categories(categorias)}) for p in partes]
+    return pd.concat(partes, ignore_index=ignore_index)
+
+
+def reporte_memoria(df):
+    """Memoria por columna (bytes reales, incluyendo textos) ordenada de mayor a menor."""
+    memoria = df.memory_usage(deep=True, index=False)
+    reporte = pd.DataFrame({
+        'dtype': df.dtypes.astype(str),
+        'bytes': memoria
+    })
+    reporte['porcentaje'] = reporte['bytes'] / reporte['bytes'].sum() * 100
+    return reporte.sort_values('bytes', ascending=False)
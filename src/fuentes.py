@@ -0,0 +1,415 @@
+"""
+Fuentes de datos intercambiables para DataLoader: Excel, CSV, Parquet y SQLite.
+Todas leen las 4 tablas por nombre ('clientes', 'productos', 'ventas',
+'detalle_ventas') y admiten proyección de columnas para no leer lo que
+normalizar_datos descarta.
+"""
+import copy
+import io
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_DISPONIBLE = True
+except ImportError:
+    PYARROW_DISPONIBLE = False
+
+# Columnas de fecha por tabla (los formatos de texto no las tipan solos)
+FECHAS = {
+    'clientes': ['fecha_alta'],
+    'ventas': ['fecha']
+}
+
+
+FECHAS_COLUMNAS = {c for columnas in FECHAS.values() for c in columnas}
+
+
+def _fechas(nombre, columnas):
+    """Columnas de fecha de la tabla que están entre las leídas."""
+    return [c for c in FECHAS.get(nombre, []) if columnas is None or c in columnas]
+
+
+def _leer_excel(ruta, columnas=None):
+    """Lee una hoja completa; usecols deja afuera las columnas no proyectadas."""
+    return pd.read_excel(ruta, usecols=columnas)
+
+
+def _escalar(valor):
+    """Escalar de numpy o Timestamp como valor de Python (parámetros de SQLite y filtros de pyarrow)."""
+    if isinstance(valor, pd.Timestamp):
+        return valor.to_pydatetime()
+    return valor.item() if isinstance(valor, np.generic) else valor
+
+
+def _mayores(df, limites):
+    """Filas con algún valor posterior a su límite: OR de columna > valor."""
+    mascara = np.zeros(len(df), dtype=bool)
+    for columna, valor in limites.items():
+        if columna in FECHAS_COLUMNAS:
+            mascara |= (pd.to_datetime(df[columna]) > pd.Timestamp(valor)).to_numpy()
+        else:
+            mascara |= (df[columna] > valor).to_numpy()
+    return df[mascara]
+
+
+def _contar_filas(ruta):
+    """Cantidad de filas de datos según la dimensión declarada en la hoja (sin parsearla)."""
+    wb = load_workbook(ruta, read_only=True)
+    try:
+        max_row = wb.worksheets[0].max_row
+    finally:
+        wb.close()
+    return None if max_row is None else max_row - 1
+
+
+def _bloque_excel(filas, columnas):
+    """
+    Arma un DataFrame con filas crudas de openpyxl.
+    Igual que pd.read_excel, los números enteros guardados como float pasan a int.
+    """
+    df = pd.DataFrame(filas, columns=columnas)
+    for columna in df.columns[df.dtypes == 'float64']:
+        valores = df[columna]
+        if valores.notna().all() and (valores == valores.round()).all():
+            df[columna] = valores.astype('int64')
+    return df
+
+
+class Fuente(ABC):
+    """
+    Interfaz de una fuente de tablas.
+    - leer(nombre, columnas=None): tabla completa (solo las columnas pedidas).
+    - iterar(nombre, tamano_bloque, columnas=None): la tabla por bloques.
+    - ruta(nombre): archivo del que sale la tabla (huella de la caché columnar).
+    - contar_filas(nombre): filas sin leer la tabla (None si la fuente no lo sabe).
+    - leer_cola(nombre, desde_fila) / leer_mayores(nombre, limites): solo lo nuevo
+      de una tabla de solo agregado (ver DataLoader.cargar_incremental). Por defecto
+      recorren la tabla por bloques; las fuentes que pueden lo resuelven sin leer
+      lo anterior (SQLite con WHERE/OFFSET, Parquet por row group, CSV por offset).
+      CSV y Excel no tienen índices ni estadísticas: su leer_mayores recorre la
+      tabla entera (se usa con ventas, mucho más chica que el detalle).
+    - escribir(nombre, df): guarda una tabla en este formato.
+    - en(carpeta): la misma fuente sobre otra carpeta (particiones, src.particiones).
+    """
+    # Vale la pena convertirla a Feather (formatos lentos de parsear)
+    cacheable = True
+
+    @abstractmethod
+    def ruta(self, nombre):
+        pass
+
+    @abstractmethod
+    def leer(self, nombre, columnas=None):
+        pass
+
+    @abstractmethod
+    def iterar(self, nombre, tamano_bloque=100_000, columnas=None):
+        pass
+
+    @abstractmethod
+    def escribir(self, nombre, df):
+        pass
+
+    def contar_filas(self, nombre):
+        return None
+
+    def leer_cola(self, nombre, desde_fila, columnas=None):
+        """Filas agregadas al final de la tabla después de las primeras desde_fila."""
+        partes, vistas, vacio = [], 0, None
+        for bloque in self.iterar(nombre, columnas=columnas):
+            vacio = bloque.iloc[:0] if vacio is None else vacio
+            if vistas + len(bloque) > desde_fila:
+                partes.append(bloque.iloc[max(0, desde_fila - vistas):])
+            vistas += len(bloque)
+        if vistas < desde_fila:
+            raise ValueError(f"{nombre} tiene menos filas que las ya leídas: la fuente se reescribió")
+        if not partes:
+            return vacio if vacio is not None else pd.DataFrame(columns=columnas)
+        return pd.concat(partes, ignore_index=True)
+
+    def leer_mayores(self, nombre, limites, columnas=None):
+        """Filas con algún valor mayor a su límite ({columna: valor}, combinados con OR)."""
+        partes = [_mayores(bloque, limites) for bloque in self.iterar(nombre, columnas=columnas)]
+        if not partes:
+            return pd.DataFrame(columns=columnas)
+        return pd.concat(partes, ignore_index=True)
+
+    @abstractmethod
+    def en(self, carpeta):
+        pass
+
+
+class _FuenteArchivos(Fuente):
+    """Un archivo por tabla en una carpeta: {carpeta}/{nombre}{extension}."""
+    extension = None
+
+    def __init__(self, carpeta='data/raw/'):
+        self.carpeta = carpeta
+
+    def ruta(self, nombre):
+        return os.path.join(self.carpeta, f'{nombre}{self.extension}')
+
+    def en(self, carpeta):
+        otra = copy.copy(self)
+        otra.carpeta = carpeta
+        return otra
+
+
+class FuenteExcel(_FuenteArchivos):
+    """Hojas .xlsx (formato original del proyecto)."""
+    extension = '.xlsx'
+
+    def leer(self, nombre, columnas=None):
+        return _leer_excel(self.ruta(nombre), columnas=columnas)
+
+    def contar_filas(self, nombre):
+        return _contar_filas(self.ruta(nombre))
+
+    def leer_cola(self, nombre, desde_fila, columnas=None):
+        """
+        Filas posteriores a las primeras desde_fila, sin armar las anteriores. El XML
+        de la hoja igual se recorre desde el principio: para refrescos frecuentes
+        conviene una fuente CSV, Parquet o SQLite.
+        """
+        wb = load_workbook(self.ruta(nombre), read_only=True)
+        try:
+            hoja = wb.worksheets[0]
+            if hoja.max_row is not None and hoja.max_row - 1 < desde_fila:
+                raise ValueError(f"{nombre} tiene menos filas que las ya leídas: la fuente se reescribió")
+            encabezado = next(hoja.iter_rows(max_row=1, values_only=True))
+            filas = [
+                fila for fila in hoja.iter_rows(min_row=desde_fila + 2, values_only=True)
+                if any(valor is not None for valor in fila)
+            ]
+        finally:
+            wb.close()
+        return self._proyectar(_bloque_excel(filas, encabezado), columnas)
+
+    def iterar(self, nombre, tamano_bloque=100_000, columnas=None):
+        """Lee la hoja en modo streaming (openpyxl read_only) sin cargarla entera."""
+        wb = load_workbook(self.ruta(nombre), read_only=True)
+        try:
+            filas = wb.worksheets[0].iter_rows(values_only=True)
+            encabezado = next(filas)
+            bloque = []
+            for fila in filas:
+                if all(valor is None for valor in fila):
+                    continue
+                bloque.append(fila)
+                if len(bloque) == tamano_bloque:
+                    yield self._proyectar(_bloque_excel(bloque, encabezado), columnas)
+                    bloque = []
+            if bloque:
+                yield self._proyectar(_bloque_excel(bloque, encabezado), columnas)
+        finally:
+            wb.close()
+
+    @staticmethod
+    def _proyectar(df, columnas):
+        return df if columnas is None else df[[c for c in df.columns if c in columnas]]
+
+    def escribir(self, nombre, df):
+        os.makedirs(self.carpeta, exist_ok=True)
+        df.to_excel(self.ruta(nombre), index=False)
+
+
+class FuenteCSV(_FuenteArchivos):
+    """
+    Archivos .csv. Con pyarrow instalado la lectura completa usa su motor
+    multihilo; la lectura por bloques usa siempre el motor C de pandas.
+    """
+    extension = '.csv'
+
+    def __init__(self, carpeta='data/raw/', motor=None):
+        super().__init__(carpeta)
+        self.motor = motor or ('pyarrow' if PYARROW_DISPONIBLE else 'c')
+        # {nombre: (filas, offset en bytes)} de la última cola leída (ver leer_cola)
+        self._offsets = {}
+
+    def _offset_fila(self, nombre, fila):
+        """
+        Offset en bytes donde empieza la fila de datos `fila`. Se reutiliza el de la
+        última cola leída; si no, se cuentan saltos de línea sin parsear el CSV.
+        Eso vale solo si cada fila es una línea: si hay comillas antes de la fila
+        (un campo entre comillas puede tener saltos de línea) retorna None.
+        """
+        filas, offset = self._offsets.get(nombre, (None, None))
+        if filas == fila:
+            return offset
+        restantes, offset = fila + 1, 0  # +1: el encabezado
+        with open(self.ruta(nombre), 'rb') as archivo:
+            while restantes > 0:
+                bloque = archivo.read(1 << 24)
+                if not bloque:
+                    raise ValueError(f"{nombre} tiene menos filas que las ya leídas: la fuente se reescribió")
+                if b'"' in bloque:
+                    return None
+                saltos = bloque.count(b'\n')
+                if saltos < restantes:
+                    restantes -= saltos
+                    offset += len(bloque)
+                    continue
+                saltos = np.flatnonzero(np.frombuffer(bloque, dtype=np.uint8) == ord('\n'))
+                return offset + int(saltos[restantes - 1]) + 1
+        return offset
+
+    def leer_cola(self, nombre, desde_fila, columnas=None):
+        """
+        Lee solo los bytes agregados después de la fila desde_fila (costo proporcional
+        a lo nuevo). Con campos entre comillas no se puede ubicar una fila por sus
+        saltos de línea: se recorre la tabla parseándola (Fuente.leer_cola).
+        """
+        ruta = self.ruta(nombre)
+        offset = self._offset_fila(nombre, desde_fila)
+        if offset is None:
+            self._offsets.pop(nombre, None)
+            return super().leer_cola(nombre, desde_fila, columnas)
+        if os.path.getsize(ruta) < offset:
+            raise ValueError(f"{nombre} es más corto que lo ya leído: la fuente se reescribió")
+        with open(ruta, 'rb') as archivo:
+            encabezado = archivo.readline()
+            archivo.seek(offset)
+            nuevo = archivo.read()
+        if b'"' in nuevo:
+            self._offsets.pop(nombre, None)
+            return super().leer_cola(nombre, desde_fila, columnas)
+        # Una última línea sin salto puede estar a medio escribir: se deja para la próxima
+        completo = nuevo[:nuevo.rfind(b'\n') + 1]
+        df = pd.read_csv(
+            io.BytesIO(encabezado + completo), usecols=columnas, parse_dates=_fechas(nombre, columnas)
+        )
+        self._offsets[nombre] = (desde_fila + len(df), offset + len(completo))
+        return df
+
+    def leer(self, nombre, columnas=None):
+        return pd.read_csv(
+            self.ruta(nombre), usecols=columnas, engine=self.motor,
+            parse_dates=_fechas(nombre, columnas)
+        )
+
+    def iterar(self, nombre, tamano_bloque=100_000, columnas=None):
+        yield from pd.read_csv(
+            self.ruta(nombre), usecols=columnas, chunksize=tamano_bloque,
+            parse_dates=_fechas(nombre, columnas)
+        )
+
+    def escribir(self, nombre, df):
+        os.makedirs(self.carpeta, exist_ok=True)
+        df.to_csv(self.ruta(nombre), index=False)
+
+
+class FuenteParquet(_FuenteArchivos):
+    """Archivos .parquet (columnar y tipado: la proyección evita leer columnas enteras)."""
+    extension = '.parquet'
+    cacheable = False
+
+    def leer(self, nombre, columnas=None):
+        return pd.read_parquet(self.ruta(nombre), columns=columnas)
+
+    def leer_cola(self, nombre, desde_fila, columnas=None):
+        """Lee solo los row groups que contienen filas posteriores a desde_fila."""
+        from pyarrow import parquet
+        archivo = parquet.ParquetFile(self.ruta(nombre))
+        if archivo.metadata.num_rows < desde_fila:
+            raise ValueError(f"{nombre} tiene menos filas que las ya leídas: la fuente se reescribió")
+        grupos, inicio = [], 0
+        for grupo in range(archivo.num_row_groups):
+            filas = archivo.metadata.row_group(grupo).num_rows
+            if inicio + filas > desde_fila:
+                grupos.append(grupo)
+            elif not grupos:
+                inicio += filas
+        if not grupos:
+            return archivo.schema_arrow.empty_table().select(columnas or archivo.schema_arrow.names).to_pandas()
+        tabla = archivo.read_row_groups(grupos, columns=columnas).to_pandas()
+        return tabla.iloc[desde_fila - inicio:].reset_index(drop=True)
+
+    def leer_mayores(self, nombre, limites, columnas=None):
+        """Filtro empujado a pyarrow: se saltan los row groups cuyas estadísticas no pasan."""
+        filtros = [[(columna, '>', _escalar(valor))] for columna, valor in limites.items()]
+        return pd.read_parquet(self.ruta(nombre), columns=columnas, filters=filtros)
+
+    def iterar(self, nombre, tamano_bloque=100_000, columnas=None):
+        from pyarrow import parquet
+        archivo = parquet.ParquetFile(self.ruta(nombre))
+        for lote in archivo.iter_batches(batch_size=tamano_bloque, columns=columnas):
+            yield lote.to_pandas()
+
+    def escribir(self, nombre, df):
+        os.makedirs(self.carpeta, exist_ok=True)
+        df.to_parquet(self.ruta(nombre), index=False)
+
+
+class FuenteSQLite(Fuente):
+    """Una base SQLite local con una tabla por nombre."""
+    cacheable = False
+
+    def __init__(self, ruta_db='data/raw/aurelion.db'):
+        self.ruta_db = ruta_db
+
+    def ruta(self, nombre):
+        return self.ruta_db
+
+    def en(self, carpeta):
+        return FuenteSQLite(os.path.join(carpeta, os.path.basename(self.ruta_db)))
+
+    def _consulta(self, nombre, columnas):
+        lista = '*' if columnas is None else ', '.join(f'"{c}"' for c in columnas)
+        return f'SELECT {lista} FROM "{nombre}"'
+
+    def leer(self, nombre, columnas=None, condicion='', parametros=()):
+        if not os.path.exists(self.ruta_db):
+            raise FileNotFoundError(2, 'No existe la base', self.ruta_db)
+        with closing(sqlite3.connect(self.ruta_db)) as conexion:
+            return pd.read_sql_query(
+                self._consulta(nombre, columnas) + condicion, conexion, params=parametros,
+                parse_dates=_fechas(nombre, columnas)
+            )
+
+    def leer_cola(self, nombre, desde_fila, columnas=None):
+        return self.leer(nombre, columnas, ' ORDER BY rowid LIMIT -1 OFFSET ?', (desde_fila,))
+
+    def leer_mayores(self, nombre, limites, columnas=None):
+        condicion = ' WHERE ' + ' OR '.join(f'"{c}" > ?' for c in limites)
+        # Las fechas se guardan como texto ISO: se comparan como texto en el mismo formato
+        parametros = tuple(str(v) if isinstance(v, pd.Timestamp) else _escalar(v) for v in limites.values())
+        return self.leer(nombre, columnas, condicion, parametros)
+
+    def iterar(self, nombre, tamano_bloque=100_000, columnas=None):
+        with closing(sqlite3.connect(self.ruta_db)) as conexion:
+            yield from pd.read_sql_query(
+                self._consulta(nombre, columnas), conexion, chunksize=tamano_bloque,
+                parse_dates=_fechas(nombre, columnas)
+            )
+
+    def escribir(self, nombre, df):
+        carpeta = os.path.dirname(self.ruta_db)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        with closing(sqlite3.connect(self.ruta_db)) as conexion:
+            df.to_sql(nombre, conexion, if_exists='replace', index=False)
+
+
+# Nombre corto → clase (para elegir la fuente por configuración)
+FUENTES = {
+    'excel': FuenteExcel,
+    'csv': FuenteCSV,
+    'parquet': FuenteParquet,
+    'sqlite': FuenteSQLite
+}
+
+
+def crear_fuente(tipo, ruta):
+    """Crea una fuente por nombre ('excel', 'csv', 'parquet', 'sqlite') sobre una carpeta o base."""
+    if tipo not in FUENTES:
+        raise ValueError(f"Fuente desconocida: {tipo} (opciones: {', '.join(FUENTES)})")
+    if tipo == 'sqlite' and os.path.isdir(ruta):
+        ruta = os.path.join(ruta, 'aurelion.db')
+    return FUENTES[tipo](ruta)
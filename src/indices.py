@@ -0,0 +1,157 @@
+"""
+Filtros combinables sobre la tabla maestra respaldados por índices precalculados.
+Cada valor de una dimensión guarda sus posiciones de fila (ordenadas) y la fecha
+tiene un índice ordenado, así que un filtro compuesto se resuelve intersectando
+listas de filas en lugar de comparar columnas completas.
+"""
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+
+# Dimensiones categóricas indexadas
+DIMENSIONES = ('ciudad', 'categoria', 'medio_pago', 'id_cliente')
+
+
+def _tupla(valores):
+    """Normaliza un valor suelto o una colección a tupla."""
+    if valores is None:
+        return ()
+    if isinstance(valores, (str, int, np.integer)):
+        return (valores,)
+    return tuple(valores)
+
+
+@dataclass(frozen=True)
+class Filtro:
+    """
+    Filtro cruzado: dentro de cada dimensión los valores se combinan con OR y entre
+    dimensiones con AND. Una dimensión vacía no filtra. Fechas inclusive.
+    Ej: Filtro(ciudad='Cordoba', categoria='Limpieza', medio_pago='tarjeta')
+    """
+    ciudad: tuple = ()
+    categoria: tuple = ()
+    medio_pago: tuple = ()
+    id_cliente: tuple = ()
+    desde: object = None
+    hasta: object = None
+
+    def __post_init__(self):
+        # Hashable para poder usarse como clave de caché
+        for dimension in DIMENSIONES:
+            object.__setattr__(self, dimension, _tupla(getattr(self, dimension)))
+        for limite in ('desde', 'hasta'):
+            valor = getattr(self, limite)
+            if valor is not None:
+                object.__setattr__(self, limite, pd.Timestamp(valor))
+
+    def vacio(self):
+        """True si el filtro no restringe nada."""
+        return self.solo_fechas() and self.desde is None and self.hasta is None
+
+    def solo_fechas(self):
+        """True si el filtro solo restringe por fecha (se puede resolver con el cubo)."""
+        return not any(getattr(self, dimension) for dimension in DIMENSIONES)
+
+
+class IndiceFiltros:
+    """Índices por valor de cada dimensión y por fecha de una tabla maestra."""
+
+    def __init__(self, df_master):
+        self.filas = len(df_master)
+        self._dimensiones = {}
+        for dimension in DIMENSIONES:
+            codigos, valores = pd.factorize(df_master[dimension], sort=True)
+            # Filas agrupadas por valor: orden estable → posiciones crecientes dentro de cada valor
+            orden = np.argsort(codigos, kind='stable')
+            conteos = np.bincount(codigos[codigos >= 0], minlength=len(valores))
+            inicio_validos = int((codigos < 0).sum())  # los nulos (-1) quedan al principio
+            limites = inicio_validos + np.concatenate([[0], np.cumsum(conteos)])
+            self._dimensiones[dimension] = (pd.Index(valores), orden, limites)
+
+        fechas = df_master['fecha'].to_numpy()
+        self._orden_fecha = np.argsort(fechas, kind='stable')
+        self._fechas = fechas[self._orden_fecha]
+
+    def agregar(self, df_nuevas):
+        """
+        Suma filas agregadas al final de la tabla maestra: las posiciones nuevas se
+        insertan al final del tramo de su valor y en el orden de fecha por búsqueda
+        binaria, sin reordenar las existentes. Arma arreglos nuevos: una copia hecha
+        con copy.copy antes de agregar deja intacto el índice original.
+        """
+        desplazamiento = self.filas
+        dimensiones = {}
+        for dimension, (indice, orden, limites) in self._dimensiones.items():
+            columna = df_nuevas[dimension]
+            nulos = columna.isna().to_numpy()
+            conteos = np.diff(limites)
+            inicio_validos = int(limites[0])
+            nuevos_valores = pd.Index(pd.unique(columna[~nulos]))
+            faltantes = nuevos_valores.difference(indice) if len(indice) else nuevos_valores
+            if len(faltantes):
+                # Valor que no estaba: se une a los existentes y se reubican los conteos
+                union = pd.Index(np.asarray(indice)).union(pd.Index(np.asarray(faltantes)))
+                conteos_union = np.zeros(len(union), dtype=conteos.dtype)
+                conteos_union[union.get_indexer(np.asarray(indice))] = conteos
+                indice, conteos = union, conteos_union
+            codigos = np.where(nulos, -1, indice.get_indexer(columna))
+            limites = inicio_validos + np.concatenate([[0], np.cumsum(conteos)])
+
+            # Cada fila nueva va al final del tramo de su valor (los nulos, al final de los nulos)
+            orden_nuevas = np.argsort(codigos, kind='stable')
+            codigos_ordenados = codigos[orden_nuevas]
+            destino = np.where(codigos_ordenados >= 0, limites[codigos_ordenados + 1], inicio_validos)
+            orden = np.insert(orden, destino, desplazamiento + orden_nuevas)
+            conteos = conteos + np.bincount(codigos[codigos >= 0], minlength=len(indice))
+            inicio_validos += int(nulos.sum())
+            limites = inicio_validos + np.concatenate([[0], np.cumsum(conteos)])
+            dimensiones[dimension] = (indice, orden, limites)
+
+        fechas = df_nuevas['fecha'].to_numpy()
+        orden_nuevas = np.argsort(fechas, kind='stable')
+        fechas = fechas[orden_nuevas]
+        destino = self._fechas.searchsorted(fechas, 'right')
+        self._orden_fecha = np.insert(self._orden_fecha, destino, desplazamiento + orden_nuevas)
+        self._fechas = np.insert(self._fechas, destino, fechas)
+        self._dimensiones = dimensiones
+        self.filas += len(df_nuevas)
+        return self
+
+    def valores(self, dimension):
+        """Valores distintos (ordenados) de una dimensión indexada."""
+        return list(self._dimensiones[dimension][0])
+
+    def _filas_dimension(self, dimension, valores):
+        indice, orden, limites = self._dimensiones[dimension]
+        codigos = indice.get_indexer(list(valores))
+        partes = [orden[limites[c]:limites[c + 1]] for c in codigos if c >= 0]
+        if not partes:
+            return np.empty(0, dtype=np.intp)
+        if len(partes) == 1:
+            return partes[0]
+        return np.sort(np.concatenate(partes))
+
+    def _filas_fecha(self, desde, hasta):
+        inicio = 0 if desde is None else self._fechas.searchsorted(desde.to_datetime64(), 'left')
+        fin = len(self._fechas) if hasta is None else self._fechas.searchsorted(
+            (hasta + pd.Timedelta(days=1)).to_datetime64(), 'left'
+        )
+        return np.sort(self._orden_fecha[inicio:fin])
+
+    def resolver(self, filtro):
+        """Posiciones de fila (crecientes) que cumplen el filtro."""
+        conjuntos = [
+            self._filas_dimension(dimension, getattr(filtro, dimension))
+            for dimension in DIMENSIONES if getattr(filtro, dimension)
+        ]
+        if filtro.desde is not None or filtro.hasta is not None:
+            conjuntos.append(self._filas_fecha(filtro.desde, filtro.hasta))
+        if not conjuntos:
+            return np.arange(self.filas)
+
+        # Intersectar empezando por el conjunto más chico
+        conjuntos.sort(key=len)
+        filas = conjuntos[0]
+        for otro in conjuntos[1:]:
+            filas = np.intersect1d(filas, otro, assume_unique=True)
+        return filas
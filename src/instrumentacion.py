@@ -0,0 +1,219 @@
+"""
+Instrumentación por etapa del pipeline carga → normalización → unión → análisis.
+Registra tiempo de reloj, tiempo de CPU del hilo, filas de entrada/salida y
+variación de memoria residente (RSS) del proceso de cada etapa marcada con
+@instrumentar o `with etapa(...)`.
+- CPU: solo el hilo que ejecuta la etapa (time.thread_time), así no suma lo que
+  hacen en paralelo otras sesiones o el precálculo; el trabajo que la etapa
+  reparte en otros hilos o procesos (pools) no se cuenta.
+- RSS: es del proceso entero; con varias sesiones o hilos activos la variación
+  incluye lo que asignaron ellos, así que es orientativa.
+
+Desactivada por defecto: el decorador solo busca un destino de registros y llama
+a la función original. Hay dos formas de activarla:
+- activar() o AURELION_INSTRUMENTACION=1: para todo el proceso (scripts, benchmarks).
+- usar_registros(registros): solo para el contexto actual (hilo o tarea), con
+  registros propios. La app la usa por sesión, porque el proceso se comparte
+  entre todos los usuarios.
+"""
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import pandas as pd
+
+# Registros que se conservan (los más viejos se descartan)
+MAX_REGISTROS = 1000
+
+logger = logging.getLogger(__name__)
+
+_activa = os.environ.get('AURELION_INSTRUMENTACION') == '1'
+_registros = deque(maxlen=MAX_REGISTROS)
+_lock = threading.Lock()
+_local = threading.local()
+# Registros del contexto actual (ej. la sesión de la app); tienen prioridad sobre los globales
+_registros_contexto = contextvars.ContextVar('registros_instrumentacion', default=None)
+
+
+def activar():
+    """Empieza a registrar etapas en todo el proceso."""
+    global _activa
+    _activa = True
+
+
+def desactivar():
+    """Deja de registrar etapas en todo el proceso (los registros existentes se conservan)."""
+    global _activa
+    _activa = False
+
+
+def nuevos_registros():
+    """Contenedor de registros propio (ej. uno por sesión) para usar_registros."""
+    return deque(maxlen=MAX_REGISTROS)
+
+
+def usar_registros(registros):
+    """
+    Mide en el contexto actual guardando en `registros` (ver nuevos_registros);
+    None deja de medir en este contexto. No afecta a otros hilos ni sesiones.
+    """
+    _registros_contexto.set(registros)
+
+
+def _destino():
+    """Registros donde se guarda la medición actual (None si no se mide)."""
+    registros = _registros_contexto.get()
+    if registros is not None:
+        return registros
+    return _registros if _activa else None
+
+
+def activa():
+    return _destino() is not None
+
+
+def registros():
+    """Copia de los registros del contexto actual, del más viejo al más nuevo."""
+    destino = _destino()
+    if destino is None:
+        destino = _registros
+    with _lock:
+        return list(destino)
+
+
+def limpiar():
+    destino = _destino()
+    with _lock:
+        (_registros if destino is None else destino).clear()
+
+
+def _rss_mb():
+    """Memoria residente actual del proceso (None si el sistema no la expone)."""
+    try:
+        with open('/proc/self/statm') as archivo:
+            paginas = int(archivo.read().split()[1])
+        return paginas * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _filas(valor):
+    """Filas de un resultado: len de DataFrame/Series, suma para dicts de tablas."""
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return len(valor)
+    if isinstance(valor, dict):
+        filas = [_filas(v) for v in valor.values()]
+        if filas and all(f is not None for f in filas):
+            return sum(filas)
+    return None
+
+
+class _Medicion:
+    """Estado de una etapa en curso; filas_salida se puede fijar dentro del bloque with."""
+
+    def __init__(self, nombre, filas_entrada, destino):
+        self.nombre = nombre
+        self.destino = destino
+        self.filas_entrada = filas_entrada
+        self.filas_salida = None
+
+    def __enter__(self):
+        self.nivel = getattr(_local, 'nivel', 0)
+        _local.nivel = self.nivel + 1
+        self.inicio = datetime.now()
+        self.rss = _rss_mb()
+        self.cpu = time.thread_time()
+        self.reloj = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, error, traza):
+        segundos = time.perf_counter() - self.reloj
+        cpu = time.thread_time() - self.cpu
+        rss = _rss_mb()
+        _local.nivel = self.nivel
+        registro = {
+            'etapa': self.nombre,
+            'inicio': self.inicio.isoformat(timespec='milliseconds'),
+            'nivel': self.nivel,
+            'segundos': segundos,
+            'cpu_segundos': cpu,
+            'filas_entrada': self.filas_entrada,
+            'filas_salida': self.filas_salida,
+            'rss_proceso_mb': rss,
+            'rss_proceso_delta_mb': None if rss is None or self.rss is None else rss - self.rss,
+            'error': None if tipo is None else tipo.__name__
+        }
+        with _lock:
+            self.destino.append(registro)
+        logger.debug(json.dumps(registro))
+        return False
+
+
+class _SinMedicion:
+    """Contexto vacío que se usa con la instrumentación desactivada."""
+    filas_salida = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, error, traza):
+        return False
+
+
+_SIN_MEDICION = _SinMedicion()
+
+
+def etapa(nombre, filas_entrada=None):
+    """
+    Context manager para medir un bloque de código:
+        with etapa('lectura', filas_entrada=n) as medicion:
+            ...
+            medicion.filas_salida = len(df)
+    """
+    destino = _destino()
+    if destino is None:
+        return _SIN_MEDICION
+    return _Medicion(nombre, filas_entrada, destino)
+
+
+def instrumentar(nombre=None, entrada=None, salida=None):
+    """
+    Decorador de métodos. entrada(obj) da las filas de entrada a partir del objeto
+    (self); salida(obj, resultado) las de salida (por defecto, filas del resultado).
+    El nombre por defecto es Clase.metodo.
+    """
+    def decorador(funcion):
+        nombre_etapa = nombre or funcion.__qualname__
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            destino = _destino()
+            if destino is None:
+                return funcion(*args, **kwargs)
+            filas_entrada = entrada(args[0]) if entrada and args else None
+            with _Medicion(nombre_etapa, filas_entrada, destino) as medicion:
+                resultado = funcion(*args, **kwargs)
+                medicion.filas_salida = salida(args[0], resultado) if salida else _filas(resultado)
+            return resultado
+        return envoltura
+    return decorador
+
+
+def resumen():
+    """Registros del contexto actual como DataFrame (vacío si no hay)."""
+    return pd.DataFrame(registros())
+
+
+def exportar_json(ruta=None):
+    """Registros en JSON; si se indica ruta se escriben en ese archivo."""
+    texto = json.dumps(registros(), indent=2, ensure_ascii=False)
+    if ruta is not None:
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            archivo.write(texto)
+    return texto
@@ -0,0 +1,217 @@
+"""
+Datasets particionados: un árbol de carpetas (una por tienda, por mes, ...) en el
+que cada partición tiene su detalle_ventas. Las tablas que una partición no tenga
+(por ejemplo clientes y productos compartidos) se leen de la carpeta más cercana
+hacia la raíz. Se asume, como en el dataset original, que los ids son globales.
+
+Los análisis se resuelven como map-reduce: cada partición se agrega por separado
+(AgregadosVentas) en un proceso del pool y los parciales se combinan al final.
+Las particiones cuyo nombre indica un período fuera del rango pedido no se leen.
+"""
+import calendar
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import pandas as pd
+
+from src.agregados import AgregadosVentas
+from src.fuentes import Fuente
+
+# Carpeta que es entera una fecha: 2024, 2024-03, 2024_03, 2024-03-15
+_FECHA = re.compile(r'(\d{4})(?:[-_](\d{1,2})(?:[-_](\d{1,2}))?)?')
+# Claves explícitas de las rutas estilo clave=valor (anio=2024/mes=03)
+_CLAVES = {'anio': 'anio', 'año': 'anio', 'year': 'anio', 'mes': 'mes', 'month': 'mes', 'dia': 'dia', 'día': 'dia', 'day': 'dia'}
+# Años que se aceptan en una carpeta sin clave
+_ANIOS = range(1900, 2200)
+
+
+def _campos_periodo(ruta_relativa):
+    """Año, mes y día que indica la ruta ({} si ninguno; None si se contradicen)."""
+    campos = {}
+
+    def fijar(campo, valor):
+        if campos.setdefault(campo, valor) != valor:
+            raise ValueError(campo)
+
+    try:
+        for componente in ruta_relativa.replace(os.sep, '/').split('/'):
+            clave, _, valor = componente.rpartition('=')
+            if clave:
+                # Otras claves (tienda=1023) no indican período
+                if clave.lower() in _CLAVES and valor.isdigit():
+                    fijar(_CLAVES[clave.lower()], int(valor))
+                continue
+            fecha = _FECHA.fullmatch(valor)
+            if fecha and int(fecha.group(1)) in _ANIOS:
+                for campo, parte in zip(('anio', 'mes', 'dia'), fecha.groups()):
+                    if parte:
+                        fijar(campo, int(parte))
+            elif valor.isdigit() and len(valor) <= 2 and 'anio' in campos and 'dia' not in campos:
+                # Carpeta de mes (o de día) dentro de la del año: 2024/03/15
+                fijar('dia' if 'mes' in campos else 'mes', int(valor))
+    except ValueError:
+        return None
+    return campos
+
+
+def periodo(ruta_relativa):
+    """
+    (desde, hasta) que cubre una partición según su ruta, o (None, None) si no lo
+    indica sin ambigüedad. Solo cuentan las carpetas que son enteras una fecha con un
+    año plausible (2024, 2024-03), las de mes o día dentro de la del año (2024/03) y
+    las claves explícitas (anio=2024/mes=03). Un número dentro de otro nombre
+    (tienda_1023) no es un período, y una partición sin período nunca se poda.
+    """
+    campos = _campos_periodo(ruta_relativa)
+    if not campos or 'anio' not in campos or ('dia' in campos and 'mes' not in campos):
+        return None, None
+    anio, mes, dia = campos['anio'], campos.get('mes'), campos.get('dia')
+    try:
+        if mes is None:
+            return pd.Timestamp(anio, 1, 1), pd.Timestamp(anio, 12, 31)
+        if dia is None:
+            return pd.Timestamp(anio, mes, 1), pd.Timestamp(anio, mes, calendar.monthrange(anio, mes)[1])
+        return pd.Timestamp(anio, mes, dia), pd.Timestamp(anio, mes, dia)
+    except ValueError:
+        # Mes o día fuera de rango: no es una fecha
+        return None, None
+
+
+@dataclass(frozen=True)
+class Particion:
+    """Carpeta de una partición y el período que cubre (None si no se conoce)."""
+    ruta: str
+    desde: pd.Timestamp = None
+    hasta: pd.Timestamp = None
+
+    def solapa(self, desde=None, hasta=None):
+        """False solo si se sabe que la partición queda fuera de [desde, hasta]."""
+        if desde is not None and self.hasta is not None and self.hasta < pd.Timestamp(desde):
+            return False
+        if hasta is not None and self.desde is not None and self.desde > pd.Timestamp(hasta):
+            return False
+        return True
+
+    def contenida(self, desde=None, hasta=None):
+        """True si todo el período de la partición está dentro de [desde, hasta]."""
+        if desde is not None and (self.desde is None or self.desde < pd.Timestamp(desde)):
+            return False
+        if hasta is not None and (self.hasta is None or self.hasta > pd.Timestamp(hasta)):
+            return False
+        return True
+
+
+class FuenteParticion(Fuente):
+    """Lee cada tabla de la partición o, si no la tiene, de la carpeta más cercana hacia la raíz."""
+    cacheable = False
+
+    def __init__(self, fuente, carpeta, raiz):
+        self.fuente = fuente
+        self.raiz = raiz
+        carpetas = [carpeta]
+        while os.path.normpath(carpeta) != os.path.normpath(raiz):
+            superior = os.path.dirname(os.path.normpath(carpeta))
+            if superior == carpeta:
+                break
+            carpeta = superior
+            carpetas.append(carpeta)
+        self.fuentes = [fuente.en(c) for c in carpetas]
+
+    def _fuente(self, nombre):
+        for fuente in self.fuentes:
+            if os.path.exists(fuente.ruta(nombre)):
+                return fuente
+        return self.fuentes[0]
+
+    def ruta(self, nombre):
+        return self._fuente(nombre).ruta(nombre)
+
+    def leer(self, nombre, columnas=None):
+        return self._fuente(nombre).leer(nombre, columnas)
+
+    def iterar(self, nombre, tamano_bloque=100_000, columnas=None):
+        return self._fuente(nombre).iterar(nombre, tamano_bloque, columnas)
+
+    def contar_filas(self, nombre):
+        return self._fuente(nombre).contar_filas(nombre)
+
+    def leer_cola(self, nombre, desde_fila, columnas=None):
+        return self._fuente(nombre).leer_cola(nombre, desde_fila, columnas)
+
+    def leer_mayores(self, nombre, limites, columnas=None):
+        return self._fuente(nombre).leer_mayores(nombre, limites, columnas)
+
+    def escribir(self, nombre, df):
+        """Escribe en la carpeta de la partición (no en la compartida de la que leía)."""
+        self.fuentes[0].escribir(nombre, df)
+
+    def en(self, carpeta):
+        return FuenteParticion(self.fuente, carpeta, self.raiz)
+
+
+def descubrir(raiz, fuente):
+    """Particiones bajo `raiz`: cada carpeta (incluida la raíz) que tiene detalle_ventas."""
+    particiones = []
+    for carpeta, subcarpetas, _ in os.walk(raiz):
+        # Orden estable y sin carpetas ocultas
+        subcarpetas[:] = sorted(s for s in subcarpetas if not s.startswith('.'))
+        if os.path.exists(fuente.en(carpeta).ruta('detalle_ventas')):
+            desde, hasta = periodo(os.path.relpath(carpeta, raiz))
+            particiones.append(Particion(carpeta, desde, hasta))
+    return particiones
+
+
+def podar(particiones, desde=None, hasta=None):
+    """Descarta (sin leerlas) las particiones que quedan fuera de [desde, hasta]."""
+    return [p for p in particiones if p.solapa(desde, hasta)]
+
+
+def agregar_particion(particion, fuente, raiz, opciones, desde=None, hasta=None):
+    """
+    Paso map: carga una partición, filtra [desde, hasta] si la partición no está
+    contenida en el rango y devuelve sus AgregadosVentas (None si no quedan filas).
+    Corre en un worker: recibe la configuración del loader en `opciones`.
+    """
+    from src.data_loader import DataLoader
+    loader = DataLoader(particion.ruta, fuente=FuenteParticion(fuente, particion.ruta, raiz), **opciones)
+    if not loader.cargar_datos():
+        raise RuntimeError(f"No se pudo cargar la partición {particion.ruta}")
+    loader.normalizar_datos()
+    df_master = loader.obtener_tabla_maestra()
+
+    if not particion.contenida(desde, hasta):
+        fechas = df_master['fecha']
+        en_rango = fechas.notna()
+        if desde is not None:
+            en_rango &= fechas >= pd.Timestamp(desde)
+        if hasta is not None:
+            en_rango &= fechas < pd.Timestamp(hasta) + pd.Timedelta(days=1)
+        df_master = df_master[en_rango.to_numpy()]
+    if len(df_master) == 0:
+        return None
+    return AgregadosVentas().actualizar(df_master)
+
+
+def agregar(particiones, fuente, raiz, opciones, desde=None, hasta=None, workers=1):
+    """
+    Map-reduce sobre las particiones: agrega cada una (en paralelo con workers > 1)
+    y combina los parciales con AgregadosVentas.combinar_todos.
+    """
+    particiones = podar(particiones, desde, hasta)
+    if not particiones:
+        raise ValueError("No hay particiones con datos en el rango pedido")
+
+    argumentos = (fuente, raiz, opciones, desde, hasta)
+    if workers > 1 and len(particiones) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(particiones))) as pool:
+            futuros = [pool.submit(agregar_particion, p, *argumentos) for p in particiones]
+            parciales = [futuro.result() for futuro in futuros]
+    else:
+        parciales = [agregar_particion(p, *argumentos) for p in particiones]
+
+    parciales = [p for p in parciales if p is not None]
+    if not parciales:
+        raise ValueError("No hay ventas en el rango pedido")
+    return AgregadosVentas.combinar_todos(parciales)
@@ -0,0 +1,93 @@
+"""
+Precálculo en segundo plano de los análisis del dashboard.
+Las tareas corren en un pool de hilos en orden de prioridad; sus resultados quedan
+en la caché del analizador compartido (ver _memoizar), así que una vista que llega
+después los encuentra listos. Se usan hilos y no procesos porque los resultados
+tienen que quedar en la memoria del proceso de la app.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Estados de una tarea
+PENDIENTE = 'pendiente'
+EN_CURSO = 'en curso'
+LISTA = 'lista'
+ERROR = 'error'
+CANCELADA = 'cancelada'
+
+
+class Precalculo:
+    """
+    Ejecuta tareas [(nombre, funcion)] en segundo plano, en el orden recibido.
+    - esperar(nombre): bloquea solo si la tarea está en curso; si todavía no
+      empezó, la corre en el hilo que la pide.
+    - progreso() / estados(): avance para mostrar en la interfaz.
+    - cancelar(): descarta lo pendiente (ej. al recargar los datos).
+    """
+
+    def __init__(self, tareas, workers=1):
+        self._lock = threading.Lock()
+        self._cancelado = threading.Event()
+        self._funciones = dict(tareas)
+        self._estados = {nombre: PENDIENTE for nombre in self._funciones}
+        self._terminadas = {nombre: threading.Event() for nombre in self._funciones}
+        self.segundos = {}
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='precalculo')
+        # La cola del pool es FIFO: el orden de envío es el de prioridad
+        self._futuros = {
+            nombre: self._pool.submit(self._ejecutar, nombre) for nombre in self._funciones
+        }
+        self._pool.shutdown(wait=False)
+
+    def _ejecutar(self, nombre):
+        with self._lock:
+            if self._cancelado.is_set() or self._estados[nombre] != PENDIENTE:
+                return
+            self._estados[nombre] = EN_CURSO
+        inicio = time.perf_counter()
+        try:
+            self._funciones[nombre]()
+            estado = LISTA
+        except Exception as e:
+            # La vista lo vuelve a calcular y muestra el error
+            print(f"⚠️ Falló el precálculo de {nombre}: {e}")
+            estado = ERROR
+        with self._lock:
+            self._estados[nombre] = estado
+            self.segundos[nombre] = time.perf_counter() - inicio
+        self._terminadas[nombre].set()
+
+    def esperar(self, nombre, timeout=None):
+        """Deja lista la tarea `nombre` (sin efecto si no existe o se canceló)."""
+        if nombre not in self._funciones:
+            return
+        # Si no empezó se corre acá; si está en curso se espera a que termine
+        self._ejecutar(nombre)
+        self._terminadas[nombre].wait(timeout)
+
+    def cancelar(self):
+        """Cancela las tareas que no empezaron; la que está en curso termina sola."""
+        self._cancelado.set()
+        with self._lock:
+            for nombre, futuro in self._futuros.items():
+                futuro.cancel()
+                if self._estados[nombre] == PENDIENTE:
+                    self._estados[nombre] = CANCELADA
+                    self._terminadas[nombre].set()
+
+    def cancelado(self):
+        return self._cancelado.is_set()
+
+    def estados(self):
+        """{nombre: estado} de cada tarea."""
+        with self._lock:
+            return dict(self._estados)
+
+    def progreso(self):
+        """(tareas terminadas, total); las fallidas cuentan como terminadas."""
+        estados = self.estados()
+        return sum(1 for e in estados.values() if e in (LISTA, ERROR)), len(estados)
+
+    def terminado(self):
+        return all(e in (LISTA, ERROR, CANCELADA) for e in self.estados().values())
@@ -3,13 +3,21 @@ Componente de vista: Ranking de Categorías
 """
 import streamlit as st
 import pandas as pd
+from src.ui import formato
+from src.ui.contexto import Requisitos
 
+# Datos que usa la vista (ver src.ui.contexto)
+REQUIERE = Requisitos(analisis=True)
 
-def render(loader, analizador):
+
+def render(loader, analizador, filtro=None):
     """Renderiza la vista de Ranking de Categorías."""
     st.header("Análisis de Categorías")
     
-    resultado = analizador.ranking_categorias()
+    resultado = analizador.ranking_categorias(filtro=filtro)
+    if len(resultado['por_importe']) == 0:
+        st.warning("⚠️ No hay ventas para los filtros seleccionados")
+        return
     
     col1, col2 = st.columns(2)
     
@@ -21,8 +29,7 @@ def render(loader, analizador):
             'Categoría': resultado['por_importe'].index,
             'Importe': resultado['por_importe'].values
         })
-        df_importe['Importe'] = df_importe['Importe'].apply(lambda x: f"${x:,.0f}")
-        st.dataframe(df_importe, width='stretch')
+        st.dataframe(df_importe, width='stretch', column_config={'Importe': formato.moneda()})
     
     with col2:
         st.subheader("Por Cantidad (Rotación)")
@@ -32,10 +39,14 @@ def render(loader, analizador):
             'Categoría': resultado['por_cantidad'].index,
             'Cantidad': resultado['por_cantidad'].values
         })
-        df_cantidad['Cantidad'] = df_cantidad['Cantidad'].apply(lambda x: f"{x:,.0f} unidades")
-        st.dataframe(df_cantidad, width='stretch')
+        st.dataframe(df_cantidad, width='stretch', column_config={'Cantidad': formato.unidades()})
     
     # Insights
     cat_top_importe = resultado['por_importe'].index[0]
     cat_top_cantidad = resultado['por_cantidad'].index[0]
     st.info(f"💡 **Insights:**\n- '{cat_top_importe}' genera más ingresos\n- '{cat_top_cantidad}' tiene mayor rotación")
+
+
+def precalcular(analizador):
+    """Ranking sin filtros."""
+    analizador.ranking_categorias()
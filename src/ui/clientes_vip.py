@@ -3,17 +3,30 @@ Componente de vista: Segmentación de Clientes VIP
 """
 import streamlit as st
 import pandas as pd
+from src.analizador import top_k
+from src.ui import formato
+from src.ui.contexto import Requisitos
 
+# Datos que usa la vista (ver src.ui.contexto)
+REQUIERE = Requisitos(tablas=('clientes',), columnas={'clientes': ('id_cliente', 'nombre_cliente', 'ciudad')}, analisis=True)
 
-def render(loader, analizador):
+# Valor inicial del slider (también lo usa precalcular)
+PERCENTIL_INICIAL = 90
+
+
+def render(loader, analizador, filtro=None):
     """Renderiza la vista de Segmentación de Clientes VIP."""
     st.header("Segmentación de Clientes por Valor (AOV)")
     
     # Leyenda de AOV
     st.info("📖 **AOV (Average Order Value):** Valor promedio de compra por cliente. Se calcula dividiendo el gasto total entre el número de transacciones.")
     
-    percentil = st.slider("Percentil para clientes VIP", 50, 99, 90)
-    resultado = analizador.segmentacion_clientes(percentil=percentil)
+    percentil = st.slider("Percentil para clientes VIP", 50, 99, PERCENTIL_INICIAL)
+    # Sin ordenar: solo se muestran los primeros, que se seleccionan con top_k
+    resultado = analizador.segmentacion_clientes(percentil=percentil, filtro=filtro, ordenar=False)
+    if len(resultado) == 0:
+        st.warning("⚠️ No hay ventas para los filtros seleccionados")
+        return
     
     # Agregar información de clientes (nombre y ciudad)
     resultado = resultado.merge(
@@ -22,14 +35,6 @@ def render(loader, analizador):
         how='left'
     )
     
-    # Obtener productos comprados por cada cliente (usando df ya cargado)
-    productos_por_cliente = analizador.df.groupby('id_cliente')['nombre_producto'].apply(
-        lambda x: ', '.join(x.unique()[:3]) + ('...' if len(x.unique()) > 3 else '')
-    ).reset_index()
-    productos_por_cliente.columns = ['id_cliente', 'productos_comprados']
-    
-    resultado = resultado.merge(productos_por_cliente, on='id_cliente', how='left')
-    
     # Métricas generales
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -43,7 +48,11 @@ def render(loader, analizador):
     
     # Top 10 clientes
     st.subheader("Top 10 Clientes por AOV")
-    top_10 = resultado.head(10).copy()
+    top_10 = top_k(resultado, 10, 'aov')
+    
+    # Productos comprados: solo para los clientes que se muestran
+    productos_por_cliente = analizador.productos_por_cliente(ids_cliente=top_10['id_cliente'], filtro=filtro)
+    top_10 = top_10.merge(productos_por_cliente, on='id_cliente', how='left')
     
     # Formatear para mostrar
     top_10_display = pd.DataFrame({
@@ -51,12 +60,20 @@ def render(loader, analizador):
         'Nombre': top_10['nombre_cliente'],
         'Ciudad': top_10['ciudad'],
         'Productos Comprados': top_10['productos_comprados'],
-        'Total Gasto': top_10['total_gasto'].apply(lambda x: f"${x:,.0f}"),
+        'Total Gasto': top_10['total_gasto'],
         'Transacciones': top_10['total_transacciones'].astype(int),
-        'AOV (Valor Promedio)': top_10['aov'].apply(lambda x: f"${x:,.0f}")
+        'AOV (Valor Promedio)': top_10['aov']
     })
     
-    st.dataframe(top_10_display, width='stretch', hide_index=True)
+    st.dataframe(
+        top_10_display,
+        width='stretch',
+        hide_index=True,
+        column_config={
+            'Total Gasto': formato.moneda(),
+            'AOV (Valor Promedio)': formato.moneda()
+        }
+    )
     
     # Mostrar cuántos son VIP
     num_vip_top10 = top_10['es_vip'].sum()
@@ -68,12 +85,18 @@ def render(loader, analizador):
     with col1:
         st.subheader("Distribución de AOV (Top 20)")
         # Usar ID en lugar de nombre para evitar solapamiento
-        chart_data = resultado.head(20).copy()
+        chart_data = top_k(resultado, 20, 'aov').copy()
         chart_data['cliente_label'] = 'ID ' + chart_data['id_cliente'].astype(str)
         chart_data = chart_data.set_index('cliente_label')['aov']
         st.bar_chart(chart_data)
     
     with col2:
         st.subheader("Clientes VIP por Ciudad")
-        vip_por_ciudad = resultado[resultado['es_vip']].groupby('ciudad').size().sort_values(ascending=False)
+        vip_por_ciudad = resultado[resultado['es_vip']].groupby('ciudad', observed=True).size().sort_values(ascending=False)
         st.bar_chart(vip_por_ciudad)
+
+
+def precalcular(analizador):
+    """Segmentación con el percentil inicial y productos de su top 10."""
+    resultado = analizador.segmentacion_clientes(percentil=PERCENTIL_INICIAL, ordenar=False)
+    analizador.productos_por_cliente(ids_cliente=top_k(resultado, 10, 'aov')['id_cliente'])
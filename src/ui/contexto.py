@@ -0,0 +1,172 @@
+"""
+Contexto de datos perezoso para las vistas.
+Cada vista declara en REQUIERE qué necesita y el contexto carga o calcula solo
+eso, la primera vez que se pide: las páginas de documentación no cargan el
+detalle de ventas ni arman la tabla maestra. Las columnas que declaran las
+vistas definen además qué columnas lee el loader (ver proyeccion).
+"""
+import functools
+import threading
+from dataclasses import dataclass, field
+from src.analizador import crear_analizador
+from src.data_loader import DataLoader
+from src.precalculo import Precalculo
+
+
+@dataclass(frozen=True)
+class Requisitos:
+    """
+    Datos que usa una vista:
+    - tablas: dimensiones que lee directamente ('clientes', 'productos', 'ventas').
+    - columnas: {tabla: columnas} que lee de esas tablas (sin entrada, todas).
+    - conteos: solo la cantidad de filas de cada tabla.
+    - analisis: usa el analizador (carga el detalle y arma la tabla maestra).
+    """
+    tablas: tuple = ()
+    columnas: dict = field(default_factory=dict)
+    conteos: bool = False
+    analisis: bool = False
+
+    def columnas_por_tabla(self):
+        """{tabla: [columnas]} que lee la vista (None: la tabla completa)."""
+        leidas = {tabla: None for tabla in self.tablas}
+        leidas.update({tabla: list(columnas) for tabla, columnas in self.columnas.items()})
+        if self.analisis:
+            leidas = _unir(leidas, DataLoader.COLUMNAS_MAESTRA)
+        return leidas
+
+
+def _unir(columnas, otras):
+    """Unión de dos proyecciones {tabla: [columnas] o None}; None absorbe (tabla completa)."""
+    union = dict(columnas)
+    for tabla, lista in otras.items():
+        if tabla not in union:
+            union[tabla] = None if lista is None else list(lista)
+        elif union[tabla] is None or lista is None:
+            union[tabla] = None
+        else:
+            union[tabla] = list(dict.fromkeys(union[tabla] + list(lista)))
+    return union
+
+
+def proyeccion(requisitos):
+    """
+    Columnas que tiene que leer un loader compartido por varias vistas: la unión de
+    lo que declara cada una (ver Requisitos). Las tablas que ninguna vista lee no se
+    proyectan.
+    """
+    columnas = {}
+    for requisito in requisitos:
+        columnas = _unir(columnas, requisito.columnas_por_tabla())
+    return columnas
+
+
+class ContextoDatos:
+    """
+    Carga perezosa y por etapas sobre un DataLoader configurado.
+    Es seguro compartirlo entre sesiones: cada etapa se carga una sola vez y las
+    vistas solo leen (los resultados del analizador se entregan como copias).
+    precalculo: [(nombre, funcion(analizador))] que se calculan en segundo plano,
+    en ese orden, apenas el analizador está listo (ver src.precalculo).
+    """
+
+    def __init__(self, loader, motor='pandas', precalculo=()):
+        self.loader = loader
+        self.motor = motor
+        self.tareas = list(precalculo)
+        self.precalculo = None
+        # Huella de las fuentes al crear el contexto (ver desactualizado)
+        self.huella = loader.huella_fuentes()
+        self._dimensiones = False
+        self._analizador = None
+        # Reentrante: el analizador pide primero las dimensiones
+        self._lock = threading.RLock()
+
+    def desactualizado(self):
+        """True si alguna fuente cambió desde que se creó el contexto."""
+        return self.loader.huella_fuentes() != self.huella
+
+    def conteos(self):
+        """
+        Filas de cada tabla (sin cargarlas si la fuente sabe contarlas). El loader
+        guarda los conteos hasta que cambie el archivo (ver DataLoader.contar_filas).
+        """
+        return {nombre: self.loader.contar_filas(nombre) for nombre in self.loader.TABLAS}
+
+    def dimensiones(self):
+        """Carga y normaliza clientes, productos y ventas (una sola vez)."""
+        with self._lock:
+            if not self._dimensiones:
+                if not self.loader.cargar_datos(incluir_detalle=False):
+                    return False
+                self.loader.normalizar_datos()
+                self._dimensiones = True
+            return True
+
+    def actualizar(self):
+        """
+        Incorpora lo agregado a las fuentes sin recargar todo: el loader lee solo lo
+        posterior a su marca de agua y el analizador suma esas líneas (ver
+        DataLoader.cargar_incremental y AnalizadorVentas.agregar_ventas).
+        Retorna False si no se puede (motor sin modo incremental, nada cargado
+        todavía o filas ya leídas que cambiaron): el llamador debe descartar el contexto.
+        """
+        with self._lock:
+            if self._analizador is None or not hasattr(self._analizador, 'agregar_ventas'):
+                return False
+            huella = self.loader.huella_fuentes()
+            nuevas = self.loader.cargar_incremental()
+            if nuevas is None:
+                return False
+            self._analizador.agregar_ventas(nuevas)
+            if len(nuevas) > 0:
+                # Lo precalculado era de los datos anteriores
+                self.cerrar()
+                self._iniciar_precalculo()
+            self.huella = huella
+            return True
+
+    def analizador(self):
+        """Analizador sobre la tabla maestra, construido al primer uso (None si falla la carga)."""
+        with self._lock:
+            if self._analizador is None:
+                if not self.dimensiones() or not self.loader.cargar_detalle():
+                    return None
+                self._analizador = crear_analizador(self.loader, self.motor)
+                self._iniciar_precalculo()
+            return self._analizador
+
+    def _iniciar_precalculo(self):
+        if self.tareas:
+            self.precalculo = Precalculo(
+                [(nombre, functools.partial(funcion, self._analizador)) for nombre, funcion in self.tareas]
+            )
+
+    def esperar(self, nombre):
+        """Espera el precálculo de `nombre` solo si todavía no terminó."""
+        if self.precalculo is not None:
+            self.precalculo.esperar(nombre)
+
+    def cerrar(self):
+        """Cancela el precálculo pendiente (al descartar el contexto)."""
+        if self.precalculo is not None:
+            self.precalculo.cancelar()
+
+    def preparar(self, requisitos):
+        """
+        Deja listo lo que declara la vista. Retorna (loader, analizador), con
+        analizador None si la vista no lo usa, o None si falló la carga.
+        """
+        if requisitos.tablas and not self.dimensiones():
+            return None
+        if requisitos.conteos:
+            try:
+                self.conteos()
+            except Exception:
+                return None
+        analizador = None
+        if requisitos.analisis:
+            analizador = self.analizador()
+            if analizador is None:
+                return None
+        return self.loader, analizador
@@ -3,6 +3,10 @@ Componente de vista: Documentación del Proyecto
 """
 import streamlit as st
 import pandas as pd
+from src.ui.contexto import Requisitos
+
+# Datos que usa la vista (ver src.ui.contexto)
+REQUIERE = Requisitos(conteos=True)
 
 
 def render(loader, analizador):
@@ -47,10 +51,10 @@ def render(loader, analizador):
     
     st.subheader("📂 Resumen de Datos")
     datos_resumen = pd.DataFrame([
-        {"Tabla": "Clientes", "Registros": len(loader.df_clientes), "Descripción": "Datos de clientes con ciudad"},
-        {"Tabla": "Productos", "Registros": len(loader.df_productos), "Descripción": "Catálogo con categoría"},
-        {"Tabla": "Ventas", "Registros": len(loader.df_ventas), "Descripción": "Transacciones con fecha y medio de pago"},
-        {"Tabla": "Detalle", "Registros": len(loader.df_detalle), "Descripción": "Detalle por ítem con cantidad y precio"}
+        {"Tabla": "Clientes", "Registros": loader.contar_filas('clientes'), "Descripción": "Datos de clientes con ciudad"},
+        {"Tabla": "Productos", "Registros": loader.contar_filas('productos'), "Descripción": "Catálogo con categoría"},
+        {"Tabla": "Ventas", "Registros": loader.contar_filas('ventas'), "Descripción": "Transacciones con fecha y medio de pago"},
+        {"Tabla": "Detalle", "Registros": loader.contar_filas('detalle_ventas'), "Descripción": "Detalle por ítem con cantidad y precio"}
     ])
     st.table(datos_resumen)
     
@@ -0,0 +1,35 @@
+"""
+Componente de barra lateral: filtros cruzados por fecha, ciudad, categoría y medio de pago.
+Se resuelven con los índices del analizador (o el cubo si solo se filtra por fecha).
+"""
+import streamlit as st
+from src.indices import Filtro
+
+
+def filtro_sidebar(analizador):
+    """
+    Muestra los filtros en la barra lateral.
+    Retorna un Filtro, o None si no se restringe nada.
+    """
+    st.sidebar.subheader("🔎 Filtros")
+    fecha_min, fecha_max = (f.date() for f in analizador.rango_fechas())
+    seleccion = st.sidebar.date_input(
+        "📅 Rango de fechas",
+        value=(fecha_min, fecha_max),
+        min_value=fecha_min,
+        max_value=fecha_max
+    )
+    
+    # Mientras se elige el rango el widget devuelve una sola fecha
+    desde, hasta = None, None
+    if len(seleccion) == 2 and tuple(seleccion) != (fecha_min, fecha_max):
+        desde, hasta = seleccion
+    
+    filtro = Filtro(
+        ciudad=st.sidebar.multiselect("🏙️ Ciudad", analizador.valores('ciudad')),
+        categoria=st.sidebar.multiselect("📦 Categoría", analizador.valores('categoria')),
+        medio_pago=st.sidebar.multiselect("💳 Medio de pago", analizador.valores('medio_pago')),
+        desde=desde,
+        hasta=hasta
+    )
+    return None if filtro.vacio() else filtro
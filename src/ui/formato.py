@@ -0,0 +1,26 @@
+"""
+Formatos de visualización compartidos por las vistas.
+Se aplican con column_config: el navegador formatea los números y las columnas
+siguen siendo numéricas (ordenables) en lugar de textos armados celda por celda.
+"""
+import streamlit as st
+
+
+def moneda(etiqueta=None, decimales=0):
+    """Importe con signo $ y separador de miles (ej. $12,345)."""
+    return st.column_config.NumberColumn(etiqueta, format=f"$%,.{decimales}f")
+
+
+def porcentaje(etiqueta=None, decimales=1):
+    """Porcentaje expresado en escala 0-100 (ej. 12.5%)."""
+    return st.column_config.NumberColumn(etiqueta, format=f"%.{decimales}f%%")
+
+
+def unidades(etiqueta=None):
+    """Cantidad entera seguida de 'unidades' (ej. 1,234 unidades)."""
+    return st.column_config.NumberColumn(etiqueta, format="%,d unidades")
+
+
+def entero(etiqueta=None):
+    """Número entero con separador de miles."""
+    return st.column_config.NumberColumn(etiqueta, format="%,d")
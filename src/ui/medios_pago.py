@@ -2,14 +2,21 @@
 Componente de vista: Medios de Pago
 """
 import streamlit as st
-import pandas as pd
+from src.ui import formato
+from src.ui.contexto import Requisitos
 
+# Datos que usa la vista (ver src.ui.contexto)
+REQUIERE = Requisitos(analisis=True)
 
-def render(loader, analizador):
+
+def render(loader, analizador, filtro=None):
     """Renderiza la vista de Medios de Pago."""
     st.header("Análisis de Medios de Pago")
     
-    resultado = analizador.medios_de_pago()
+    resultado = analizador.medios_de_pago(filtro=filtro)
+    if len(resultado) == 0:
+        st.warning("⚠️ No hay ventas para los filtros seleccionados")
+        return
     
     # Gráfico de barras
     st.bar_chart(resultado['total_importe'])
@@ -18,12 +25,23 @@ def render(loader, analizador):
     st.subheader("Detalle por Medio de Pago")
     df_display = resultado.copy()
     total_importe = df_display['total_importe'].sum()
-    df_display['porcentaje'] = (df_display['total_importe'] / total_importe * 100).apply(lambda x: f"{x:.1f}%")
-    df_display['total_importe'] = df_display['total_importe'].apply(lambda x: f"${x:,.0f}")
-    df_display['num_transacciones'] = df_display['num_transacciones'].apply(lambda x: f"{x:.0f}")
+    df_display['porcentaje'] = df_display['total_importe'] / total_importe * 100
     
-    st.dataframe(df_display, width='stretch')
+    st.dataframe(
+        df_display,
+        width='stretch',
+        column_config={
+            'total_importe': formato.moneda(),
+            'num_transacciones': formato.entero(),
+            'porcentaje': formato.porcentaje()
+        }
+    )
     
     # Insight
     medio_top = resultado.index[0]
     st.info(f"💡 **Insight:** '{medio_top}' es el medio de pago dominante")
+
+
+def precalcular(analizador):
+    """Distribución sin filtros."""
+    analizador.medios_de_pago()
@@ -3,6 +3,10 @@ Componente de vista: Prompts Utilizados
 """
 import streamlit as st
 import pandas as pd
+from src.ui.contexto import Requisitos
+
+# Datos que usa la vista (ver src.ui.contexto)
+REQUIERE = Requisitos()
 
 
 def render(loader, analizador):
@@ -0,0 +1,51 @@
+"""
+Componente de panel: Rendimiento por etapa (ver src.instrumentacion).
+"""
+import streamlit as st
+from src import instrumentacion
+from src.ui import formato
+
+
+def render():
+    """Renderiza la tabla de etapas medidas con opción de descarga en JSON."""
+    with st.expander("⏱️ Rendimiento", expanded=True):
+        df = instrumentacion.resumen()
+        if df.empty:
+            st.info("Sin mediciones todavía: las etapas se registran a partir de la próxima interacción.")
+            return
+        
+        # Más recientes primero; la sangría muestra las etapas anidadas
+        df = df.sort_values('inicio', ascending=False, kind='stable')
+        df['etapa'] = ['↳ ' * nivel + etapa for nivel, etapa in zip(df['nivel'], df['etapa'])]
+        st.dataframe(
+            df[['inicio', 'etapa', 'segundos', 'cpu_segundos', 'filas_entrada', 'filas_salida', 'rss_proceso_delta_mb', 'error']],
+            column_config={
+                'inicio': 'Inicio',
+                'etapa': 'Etapa',
+                'segundos': st.column_config.NumberColumn('Tiempo (s)', format="%.4f"),
+                'cpu_segundos': st.column_config.NumberColumn(
+                    'CPU del hilo (s)', format="%.4f", help="Sin el trabajo repartido en otros hilos o procesos"
+                ),
+                'filas_entrada': formato.entero('Filas entrada'),
+                'filas_salida': formato.entero('Filas salida'),
+                'rss_proceso_delta_mb': st.column_config.NumberColumn(
+                    'Δ RSS proceso (MB)', format="%.1f", help="De todo el proceso: incluye otras sesiones e hilos"
+                ),
+                'error': 'Error'
+            },
+            hide_index=True,
+            width='stretch'
+        )
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button(
+                "📥 Descargar JSON",
+                instrumentacion.exportar_json(),
+                file_name="rendimiento.json",
+                mime="application/json"
+            )
+        with col2:
+            if st.button("🗑️ Limpiar mediciones"):
+                instrumentacion.limpiar()
+                st.rerun()
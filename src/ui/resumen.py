@@ -2,12 +2,26 @@
 Componente de vista: Resumen General
 """
 import streamlit as st
+from src.ui.contexto import Requisitos
 
+# Datos que usa la vista (ver src.ui.contexto)
+# (de las dimensiones solo cuenta filas: le alcanza con los ids)
+REQUIERE = Requisitos(
+    tablas=('clientes', 'productos', 'ventas'),
+    columnas={'clientes': ('id_cliente',), 'productos': ('id_producto',), 'ventas': ('id_venta',)},
+    analisis=True
+)
 
-def render(loader, analizador):
+
+def render(loader, analizador, filtro=None):
     """Renderiza la vista de Resumen General."""
     st.header("Resumen General del Negocio")
     
+    # Una sola pasada sobre la tabla maestra para todas las métricas de la vista
+    metricas = analizador.calcular_metricas(['ventas_por_ciudad', 'ranking_categorias'], filtro=filtro)
+    ventas_ciudad = metricas['ventas_por_ciudad']
+    ranking = metricas['ranking_categorias']
+    
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
@@ -17,7 +31,6 @@ def render(loader, analizador):
     with col3:
         st.metric("Total Ventas", len(loader.df_ventas))
     with col4:
-        ventas_ciudad = analizador.ventas_por_ciudad()
         st.metric("Ventas Totales", f"${ventas_ciudad.sum():,.0f}")
     
     st.divider()
@@ -33,6 +46,10 @@ def render(loader, analizador):
     
     with col2:
         st.subheader("📦 Top 3 Categorías")
-        ranking = analizador.ranking_categorias()
         for cat, monto in ranking['por_importe'].head(3).items():
             st.write(f"**{cat}:** ${monto:,.0f}")
+
+
+def precalcular(analizador):
+    """Métricas de la vista sin filtros."""
+    analizador.calcular_metricas(['ventas_por_ciudad', 'ranking_categorias'])
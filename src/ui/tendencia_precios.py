@@ -2,29 +2,53 @@
 Componente de vista: Tendencia de Precios
 """
 import streamlit as st
-import pandas as pd
+from src.ui import formato
+from src.ui.contexto import Requisitos
 
+# Datos que usa la vista (ver src.ui.contexto)
+REQUIERE = Requisitos(analisis=True)
 
-def render(loader, analizador):
+
+def render(loader, analizador, filtro=None):
     """Renderiza la vista de Tendencia de Precios."""
     st.header("Tendencia de Precios Promedio por Categoría")
     
-    resultado = analizador.tendencia_precios()
+    col1, col2 = st.columns(2)
+    with col1:
+        ponderado = st.checkbox(
+            "Ponderar por cantidad vendida",
+            help="Precio promedio por unidad vendida: Σ importe / Σ cantidad"
+        )
+    with col2:
+        ventana = st.slider("Media móvil (meses)", 1, 6, 1, help="1 = sin suavizar")
     
-    # Selector de categoría
-    categorias = resultado['categoria'].unique()
-    categoria_seleccionada = st.selectbox("Selecciona una categoría:", categorias)
+    # Una fila por mes y una columna por categoría
+    tendencia = analizador.tendencia_por_categoria(filtro=filtro, ponderado=ponderado, ventana=ventana)
+    if len(tendencia) == 0:
+        st.warning("⚠️ No hay ventas para los filtros seleccionados")
+        return
     
-    # Filtrar por categoría
-    datos_cat = resultado[resultado['categoria'] == categoria_seleccionada]
+    # Selector de categorías
+    categorias = st.multiselect("Categorías:", list(tendencia.columns), default=list(tendencia.columns))
+    if not categorias:
+        st.warning("⚠️ Selecciona al menos una categoría")
+        return
+    datos_cat = tendencia[categorias]
     
-    # Gráfico de línea
-    st.line_chart(datos_cat.set_index('mes')['precio_unitario'])
+    # Gráfico de línea (una serie por categoría)
+    st.line_chart(datos_cat)
     
     # Tabla
     st.subheader("Detalle de Precios")
-    df_display = datos_cat.copy()
-    df_display['precio_unitario'] = df_display['precio_unitario'].apply(lambda x: f"${x:,.2f}")
-    st.dataframe(df_display[['mes', 'precio_unitario']], width='stretch')
+    st.dataframe(
+        datos_cat,
+        width='stretch',
+        column_config={categoria: formato.moneda(decimales=2) for categoria in categorias}
+    )
     
     st.info("💡 **Insight:** Analiza la volatilidad para ajustar estrategias de precios")
+
+
+def precalcular(analizador):
+    """Tendencia con los controles en su valor inicial."""
+    analizador.tendencia_por_categoria(ponderado=False, ventana=1)
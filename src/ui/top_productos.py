@@ -3,13 +3,32 @@ Componente de vista: Top 10 Productos
 """
 import streamlit as st
 import pandas as pd
+from src.ui import formato
+from src.ui.contexto import Requisitos
 
+# Datos que usa la vista (ver src.ui.contexto)
+REQUIERE = Requisitos(analisis=True)
 
-def render(loader, analizador):
+
+def render(loader, analizador, filtro=None):
     """Renderiza la vista de Top 10 Productos."""
     st.header("Top 10 Productos por Cantidad Vendida")
     
-    resultado = analizador.top_productos_cantidad(top_n=10)
+    por_categoria = st.checkbox("Top 10 dentro de cada categoría")
+    if por_categoria:
+        render_por_categoria(analizador, filtro)
+    else:
+        render_general(analizador, filtro)
+    
+    st.info("💡 **Insight:** Prioriza el inventario de estos productos de alta rotación")
+
+
+def render_general(analizador, filtro):
+    """Top 10 de todos los productos."""
+    resultado = analizador.top_productos_cantidad(top_n=10, filtro=filtro)
+    if len(resultado) == 0:
+        st.warning("⚠️ No hay ventas para los filtros seleccionados")
+        return
     
     # Gráfico de barras
     st.bar_chart(resultado)
@@ -21,11 +40,33 @@ def render(loader, analizador):
         'Cantidad Vendida': resultado.values
     })
     df_display['Ranking'] = range(1, len(df_display) + 1)
-    df_display['Cantidad Vendida'] = df_display['Cantidad Vendida'].apply(lambda x: f"{x:,.0f} unidades")
     
     st.dataframe(
         df_display[['Ranking', 'Producto', 'Cantidad Vendida']],
-        width='stretch'
+        width='stretch',
+        column_config={'Cantidad Vendida': formato.unidades()}
     )
+
+
+def render_por_categoria(analizador, filtro):
+    """Top 10 de cada categoría (una sola consulta vectorizada)."""
+    resultado = analizador.top('cantidad', 10, 'nombre_producto', por='categoria', filtro=filtro)
+    if len(resultado) == 0:
+        st.warning("⚠️ No hay ventas para los filtros seleccionados")
+        return
     
-    st.info("💡 **Insight:** Prioriza el inventario de estos productos de alta rotación")
+    resultado['Ranking'] = resultado.groupby('categoria', observed=True).cumcount() + 1
+    st.dataframe(
+        resultado.rename(columns={
+            'categoria': 'Categoría', 'nombre_producto': 'Producto', 'cantidad': 'Cantidad Vendida'
+        })[['Categoría', 'Ranking', 'Producto', 'Cantidad Vendida']],
+        width='stretch',
+        hide_index=True,
+        column_config={'Cantidad Vendida': formato.unidades()}
+    )
+
+
+def precalcular(analizador):
+    """Top general y por categoría sin filtros."""
+    analizador.top_productos_cantidad(top_n=10)
+    analizador.top('cantidad', 10, 'nombre_producto', por='categoria')
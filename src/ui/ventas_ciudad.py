@@ -3,17 +3,24 @@ Componente de vista: Ventas por Ciudad
 """
 import streamlit as st
 import pandas as pd
+from src.ui import formato
+from src.ui.contexto import Requisitos
 
+# Datos que usa la vista (ver src.ui.contexto)
+REQUIERE = Requisitos(analisis=True)
 
-def render(loader, analizador):
+
+def render(loader, analizador, filtro=None):
     """Renderiza la vista de Ventas por Ciudad."""
     st.header("Ventas Totales por Ciudad")
     
-    resultado = analizador.ventas_por_ciudad()
+    resultado = analizador.ventas_por_ciudad(filtro=filtro)
+    if len(resultado) == 0:
+        st.warning("⚠️ No hay ventas para los filtros seleccionados")
+        return
     
-    # Calcular ticket promedio por ciudad (usando df ya cargado)
-    ventas_agregadas = analizador.df.groupby(['ciudad', 'id_venta'])['importe'].sum().reset_index()
-    ticket_promedio = ventas_agregadas.groupby('ciudad')['importe'].mean().sort_values(ascending=False)
+    # Ticket promedio por ciudad (desde la tabla a nivel venta del analizador)
+    ticket_promedio = analizador.ticket_promedio_por_ciudad(filtro=filtro)
     
     # Gráficos lado a lado
     col1, col2 = st.columns(2)
@@ -33,9 +40,14 @@ def render(loader, analizador):
         'Ventas Totales': resultado.values,
         'Ticket Promedio': [ticket_promedio.get(c, 0) for c in resultado.index]
     })
-    df_display['Ventas Totales'] = df_display['Ventas Totales'].apply(lambda x: f"${x:,.0f}")
-    df_display['Ticket Promedio'] = df_display['Ticket Promedio'].apply(lambda x: f"${x:,.0f}")
-    st.dataframe(df_display, width='stretch')
+    st.dataframe(
+        df_display,
+        width='stretch',
+        column_config={
+            'Ventas Totales': formato.moneda(),
+            'Ticket Promedio': formato.moneda()
+        }
+    )
     
     # Insights
     ciudad_top = resultado.index[0]
@@ -44,3 +56,9 @@ def render(loader, analizador):
     ticket_top = ticket_promedio.iloc[0]
     
     st.info(f"💡 **Insights:**\n- {ciudad_top} lidera en ventas totales con ${monto_top:,.0f}\n- {ciudad_mejor_ticket} tiene el mejor ticket promedio: ${ticket_top:,.0f}")
+
+
+def precalcular(analizador):
+    """Ventas y ticket promedio por ciudad sin filtros."""
+    analizador.ventas_por_ciudad()
+    analizador.ticket_promedio_por_ciudad()